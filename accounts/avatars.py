@@ -0,0 +1,150 @@
+"""
+Avatar processing pipeline.
+
+Uploaded avatars are re-encoded without metadata and resized to a fixed set of
+square WebP renditions by a background worker. Templates pick a rendition
+through the `avatar_src` tag and fall back to the original until it is ready.
+"""
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from media_files.storage import file_exists
+
+logger = logging.getLogger(__name__)
+
+# Rendition name -> square edge in pixels (2x the CSS size for HiDPI screens)
+RENDITIONS = {
+    'sidebar': 112,   # .sidebar .profile is 55px
+    'profile': 300,   # .profile-avatar is 150px
+}
+WEBP_QUALITY = 80
+RENDITION_DIR = 'avatars/renditions'
+# Renditions named by rendition_name(); anything else in RENDITION_DIR is left over from the old scheme
+_RENDITION_FILE = re.compile(r'.+_[0-9a-f]{12}_(%s)\.webp' % '|'.join(RENDITIONS))
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='avatar')
+
+
+def rendition_name(name, rendition):
+    """
+    Storage name of a rendition, e.g. avatars/me.png -> avatars/renditions/me_<hash>_sidebar.webp.
+    The hash covers the full original name, so avatars/me.png and avatars/me.jpg do not share renditions.
+    """
+    stem = os.path.splitext(os.path.basename(name))[0]
+    digest = hashlib.sha1(name.encode()).hexdigest()[:12]
+    return f'{RENDITION_DIR}/{stem}_{digest}_{rendition}.webp'
+
+
+def _legacy_rendition_name(name, rendition):
+    """Rendition name used before the hash was added (avatars/renditions/me_sidebar.webp)"""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'{RENDITION_DIR}/{stem}_{rendition}.webp'
+
+
+def renditions_ready(name):
+    """True once every rendition of the avatar has been written (storage metadata, no disk access)"""
+    return all(file_exists(rendition_name(name, r)) for r in RENDITIONS)
+
+
+def process_avatar(name):
+    """
+    Write a metadata-free copy of the original and every rendition of that copy.
+    Returns the storage name of the copy; the original is left untouched so the
+    caller can switch the model over in one UPDATE and then delete it.
+    """
+    with default_storage.open(name, 'rb') as f:
+        image = Image.open(f)
+        image.load()
+    original_format = image.format or 'PNG'
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'P') else 'RGB')
+
+    # Re-encode the original without EXIF/ICC/XMP (GPS coordinates, camera serials...)
+    buffer = BytesIO()
+    clean = image.convert('RGB') if original_format == 'JPEG' else image
+    clean.save(buffer, format=original_format)
+    clean_name = default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    for rendition, size in RENDITIONS.items():
+        buffer = BytesIO()
+        ImageOps.fit(image, (size, size), Image.LANCZOS).save(
+            buffer, format='WEBP', quality=WEBP_QUALITY, method=6
+        )
+        target = rendition_name(clean_name, rendition)
+        if default_storage.exists(target):
+            default_storage.delete(target)
+        default_storage.save(target, ContentFile(buffer.getvalue()))
+    return clean_name
+
+
+def replace_avatar(model, pk, name, field='avatar'):
+    """
+    Process the avatar `name` of one row and point the row at the clean copy.
+    The row keeps referencing a complete file at every moment; if it got another
+    avatar meanwhile, the copy is discarded. Returns the name now in use, or None.
+    """
+    clean_name = process_avatar(name)
+    if model._default_manager.filter(pk=pk, **{field: name}).update(**{field: clean_name}):
+        delete_avatar(name)
+        return clean_name
+    delete_avatar(clean_name)
+    return None
+
+
+def delete_avatar(name):
+    """Remove an avatar and its renditions (including ones written under the old naming scheme)"""
+    targets = [name]
+    for rendition in RENDITIONS:
+        targets += [rendition_name(name, rendition), _legacy_rendition_name(name, rendition)]
+    for target in targets:
+        if default_storage.exists(target):
+            default_storage.delete(target)
+
+
+def prune_legacy_renditions():
+    """Delete renditions written under the old naming scheme (never read any more). Returns how many."""
+    if not default_storage.exists(RENDITION_DIR):
+        return 0
+    deleted = 0
+    for filename in default_storage.listdir(RENDITION_DIR)[1]:
+        if not _RENDITION_FILE.fullmatch(filename):
+            default_storage.delete(f'{RENDITION_DIR}/{filename}')
+            deleted += 1
+    return deleted
+
+
+def _run(model, pk, field, name, old_name):
+    try:
+        if old_name and old_name != name:
+            delete_avatar(old_name)
+        replace_avatar(model, pk, name, field)
+    except Exception:
+        logger.exception('Could not process avatar %s', name)
+
+
+def schedule_avatar_processing(avatar, old_name=None):
+    """
+    Process an uploaded avatar (the FieldFile of a saved instance) after the
+    surrounding transaction commits.
+    Runs on the background worker unless settings.AVATAR_PROCESSING_ASYNC is False.
+    """
+    args = (type(avatar.instance), avatar.instance.pk, avatar.field.attname, avatar.name, old_name)
+
+    def submit():
+        if getattr(settings, 'AVATAR_PROCESSING_ASYNC', True):
+            _executor.submit(_run, *args)
+        else:
+            _run(*args)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from accounts.avatars import prune_legacy_renditions, replace_avatar
+from students.models import Student
+from tutors.models import Tutor
+
+
+class Command(BaseCommand):
+    help = (
+        "Strip metadata and (re)build the WebP renditions of every existing avatar, "
+        "then delete renditions left over from the old naming scheme"
+    )
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        for model in (Student, Tutor):
+            rows = model.objects.exclude(avatar='').exclude(avatar__isnull=True).values_list('pk', 'avatar')
+            for pk, name in rows.iterator():
+                try:
+                    replace_avatar(model, pk, name)
+                    processed += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'{name}: {e}')
+        pruned = prune_legacy_renditions()
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} avatar(s), {failed} failed, removed {pruned} outdated rendition(s).'
+        ))
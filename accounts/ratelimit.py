@@ -0,0 +1,98 @@
+"""
+Cache-backed rate limiting for write endpoints.
+
+Each (endpoint, user or IP) pair gets a counter per fixed time window in
+Django's cache. A request increments it with one atomic `incr` (one round
+trip; the first request of a window also `add`s the key) and is answered
+with 429 Too Many Requests and Retry-After once the counter passes the
+limit. Counters expire by themselves at the end of their window.
+
+Limits are given per endpoint group in `settings.RATE_LIMITS` (overriding
+the rate passed to the decorator), e.g. {'request_session': '10/m'}; None
+turns a limit off. Use a shared cache backend (Redis, Memcached) when the
+site runs in several processes, otherwise each process counts on its own.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+KEY_PREFIX = 'ratelimit'
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60); '100/15m' -> (100, 900)"""
+    count, _, period = rate.partition('/')
+    multiplier, unit = period[:-1] or '1', period[-1:]
+    if not count.isdigit() or not multiplier.isdigit() or unit not in PERIODS:
+        raise ValueError(f'Invalid rate "{rate}" (expected e.g. "10/m" or "100/15m")')
+    return int(count), int(multiplier) * PERIODS[unit]
+
+
+def client_ip(request):
+    """REMOTE_ADDR, or the first X-Forwarded-For address behind a trusted proxy"""
+    if getattr(settings, 'RATE_LIMIT_TRUST_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def client_key(request, key):
+    """'user': the logged-in user (IP for anonymous requests); 'ip': always the IP"""
+    if key == 'user' and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+def hit(group, client, limit, period, now=None):
+    """Count one request. Returns 0 if it is allowed, else the seconds until the window resets."""
+    now = time.time() if now is None else now
+    window = int(now // period)
+    cache_key = f'{KEY_PREFIX}:{group}:{client}:{window}'
+    try:
+        count = cache.incr(cache_key)
+    except ValueError:
+        # First request of the window (or the counter was evicted)
+        if cache.add(cache_key, 1, period + 1):
+            count = 1
+        else:
+            count = cache.incr(cache_key)
+    if count <= limit:
+        return 0
+    return max(1, math.ceil((window + 1) * period - now))
+
+
+def too_many_requests(retry_after, json=False):
+    message = f'Too many requests. Please try again in {retry_after} seconds.'
+    if json:
+        response = JsonResponse({'success': False, 'error': message}, status=429)
+    else:
+        response = HttpResponse(message, status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(group, rate, key='user', methods=('POST',), json=False):
+    """
+    Limit a view to `rate` requests ('10/m') per client for the `methods` given
+    (other methods, like the GET showing a form, are not counted).
+    json=True answers 429 in the {'success': False, 'error': ...} shape of AJAX views.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            configured = getattr(settings, 'RATE_LIMITS', {}).get(group, rate)
+            if configured and request.method in methods:
+                limit, period = parse_rate(configured)
+                retry_after = hit(group, client_key(request, key), limit, period)
+                if retry_after:
+                    return too_many_requests(retry_after, json)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,30 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from accounts.avatars import RENDITIONS, rendition_name, renditions_ready
+from media_files.storage import file_exists
+
+register = template.Library()
+
+@register.filter
+def valid_avatar(avatar_field):
+    """
+    Trả về True nếu file avatar thực sự tồn tại (tra metadata, không stat ổ đĩa).
+    """
+    if not avatar_field:
+        return False
+    return file_exists(avatar_field.name)
+
+@register.simple_tag
+def avatar_src(avatar_field, rendition='sidebar'):
+    """
+    URL của ảnh đại diện ở kích thước `rendition` (sidebar/profile).
+    Dùng ảnh gốc khi rendition chưa xử lý xong, ảnh mặc định khi không có avatar.
+    """
+    if rendition not in RENDITIONS:
+        raise template.TemplateSyntaxError(f"Unknown avatar rendition '{rendition}'")
+    if avatar_field and renditions_ready(avatar_field.name):
+        return default_storage.url(rendition_name(avatar_field.name, rendition))
+    if valid_avatar(avatar_field):
+        return avatar_field.url
+    return static('images/avatar.svg')
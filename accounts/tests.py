@@ -1,3 +1,205 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.models import User
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from accounts import ratelimit
+from accounts.avatars import RENDITIONS, rendition_name
+from accounts.models import UserProfile
+from students.models import Student
+from tutors.models import Tutor
+
+
+def make_jpeg_with_exif(size=(1200, 900)):
+    image = Image.new('RGB', size, 'blue')
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera maker'  # Make
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class AvatarPipelineTests(TestCase):
+    """Test the avatar upload pipeline"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root, AVATAR_PROCESSING_ASYNC=False)
+        self.override.enable()
+        self.user = User.objects.create_user(username='student1', password='testpass123')
+        UserProfile.objects.create(user=self.user, role='student')
+        self.student = Student.objects.create(user=self.user, full_name='Student', student_id='ST001')
+        self.client.login(username='student1', password='testpass123')
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def upload(self):
+        upload = SimpleUploadedFile('me.jpg', make_jpeg_with_exif(), content_type='image/jpeg')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('students:update_avatar'), {'avatar': upload})
+        self.assertEqual(response.status_code, 200)
+        self.student.refresh_from_db()
+        return self.student.avatar.name
+
+    def test_upload_builds_renditions_and_strips_metadata(self):
+        """Test renditions are written and metadata removed"""
+        name = self.upload()
+
+        for rendition, size in RENDITIONS.items():
+            with default_storage.open(rendition_name(name, rendition)) as f:
+                image = Image.open(f)
+                self.assertEqual(image.format, 'WEBP')
+                self.assertEqual(image.size, (size, size))
+
+        with default_storage.open(name) as f:
+            self.assertEqual(len(Image.open(f).getexif()), 0)
+
+    def test_avatar_src_picks_rendition(self):
+        """Test the template tag serves the requested rendition"""
+        name = self.upload()
+        html = Template("{% load avatar_tags %}{% avatar_src avatar 'sidebar' %}").render(
+            Context({'avatar': self.student.avatar})
+        )
+        self.assertEqual(html, default_storage.url(rendition_name(name, 'sidebar')))
+
+    def test_replacing_avatar_removes_old_renditions(self):
+        """Test old files are cleaned up when a new avatar is uploaded"""
+        old_name = self.upload()
+        self.upload()
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertFalse(default_storage.exists(rendition_name(old_name, 'sidebar')))
+
+    def test_rendition_names_do_not_collide(self):
+        """Test avatars differing only by extension get their own renditions"""
+        self.assertNotEqual(
+            rendition_name('avatars/me.png', 'sidebar'), rendition_name('avatars/me.jpg', 'sidebar')
+        )
+
+    def test_old_scheme_renditions_are_removed(self):
+        """Test renditions named before the hash was added are deleted with their avatar or by the command"""
+        name = self.upload()
+        legacy = [
+            default_storage.save(f'avatars/renditions/{stem}_sidebar.webp', ContentFile(b'old'))
+            for stem in (os.path.splitext(os.path.basename(name))[0], 'someone_else')
+        ]
+        self.upload()
+        self.assertFalse(default_storage.exists(legacy[0]))
+        self.assertTrue(default_storage.exists(legacy[1]))
+
+        out = StringIO()
+        call_command('process_avatars', stdout=out)
+        self.assertIn('removed 1 outdated rendition(s)', out.getvalue())
+        self.assertFalse(default_storage.exists(legacy[1]))
+        self.student.refresh_from_db()
+        self.assertTrue(default_storage.exists(rendition_name(self.student.avatar.name, 'sidebar')))
+
+    def test_processed_copy_replaces_original(self):
+        """Test the row is switched to the clean copy and the uploaded file removed"""
+        upload = SimpleUploadedFile('me.jpg', make_jpeg_with_exif(), content_type='image/jpeg')
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.client.post(reverse('students:update_avatar'), {'avatar': upload})
+        self.student.refresh_from_db()
+        uploaded = self.student.avatar.name
+        for callback in callbacks:
+            callback()
+
+        self.student.refresh_from_db()
+        self.assertNotEqual(self.student.avatar.name, uploaded)
+        self.assertTrue(default_storage.exists(self.student.avatar.name))
+        self.assertFalse(default_storage.exists(uploaded))
+
+
+class RateLimitTests(TestCase):
+    """Cache-backed rate limiting of write endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student1', password='testpass123')
+        UserProfile.objects.create(user=self.user, role='student')
+        Student.objects.create(user=self.user, full_name='Student', student_id='ST001')
+        self.client.login(username='student1', password='testpass123')
+
+    def test_parse_rate(self):
+        self.assertEqual(ratelimit.parse_rate('10/m'), (10, 60))
+        self.assertEqual(ratelimit.parse_rate('100/15m'), (100, 900))
+        self.assertEqual(ratelimit.parse_rate('1/d'), (1, 86400))
+        with self.assertRaises(ValueError):
+            ratelimit.parse_rate('ten per minute')
+
+    def test_fixed_window_counter(self):
+        now = 1_000_040.0  # 20 s into a minute window
+        self.assertEqual([ratelimit.hit('test', 'ip:1', 3, 60, now=now) for _ in range(3)], [0, 0, 0])
+        self.assertEqual(ratelimit.hit('test', 'ip:1', 3, 60, now=now), 40)
+        # Other clients and the next window start from zero
+        self.assertEqual(ratelimit.hit('test', 'ip:2', 3, 60, now=now), 0)
+        self.assertEqual(ratelimit.hit('test', 'ip:1', 3, 60, now=now + 40), 0)
+
+    def test_one_cache_round_trip_per_request(self):
+        calls = []
+        incr, add = cache.incr, cache.add
+        cache.incr = lambda *args, **kwargs: calls.append('incr') or incr(*args, **kwargs)
+        cache.add = lambda *args, **kwargs: calls.append('add') or add(*args, **kwargs)
+        try:
+            for _ in range(3):
+                ratelimit.hit('test', 'ip:1', 10, 60, now=1_000_000.0)
+        finally:
+            del cache.incr, cache.add
+        # Only the first request of the window also creates the counter
+        self.assertEqual(calls, ['incr', 'add', 'incr', 'incr'])
+
+    @override_settings(RATE_LIMITS={'technical_report': '2/m'})
+    def test_technical_report_returns_429(self):
+        url = reverse('feedback:technical_report')
+        for i in range(2):
+            response = self.client.post(url, {'problem_description': f'Cannot open the library page ({i})'})
+            self.assertEqual(response.status_code, 302)
+        response = self.client.post(url, {'problem_description': 'Cannot open the library page (again)'})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+        # Showing the form is not counted
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(RATE_LIMITS={'set_availability': '1/m'})
+    def test_json_endpoints_get_json_429(self):
+        tutor_user = User.objects.create_user(username='tutor1', password='tutorpass123')
+        UserProfile.objects.create(user=tutor_user, role='tutor')
+        Tutor.objects.create(user=tutor_user, full_name='Tutor', tutor_id='TU001')
+        self.client.login(username='tutor1', password='tutorpass123')
+        url = reverse('tutors:set_availability')
+        data = {'weekday': 0, 'start_time': '09:00', 'end_time': '10:00', 'status': 'available'}
+        self.assertEqual(self.client.post(url, data).status_code, 200)
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(response.json()['success'])
+        self.assertIn('Retry-After', response)
+
+    @override_settings(RATE_LIMITS={'cas_login': '2/m'})
+    def test_login_is_limited_per_ip(self):
+        url = reverse('cas_login')
+        for _ in range(2):
+            self.client.post(url, {'username': 'nobody', 'password': 'wrong'}, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(
+            self.client.post(url, {'username': 'nobody', 'password': 'wrong'}, REMOTE_ADDR='10.0.0.1').status_code, 429
+        )
+        self.assertEqual(
+            self.client.post(url, {'username': 'nobody', 'password': 'wrong'}, REMOTE_ADDR='10.0.0.2').status_code, 200
+        )
+
+    @override_settings(RATE_LIMITS={'request_session': None})
+    def test_limit_can_be_disabled(self):
+        url = reverse('feedback:request_session')
+        for _ in range(15):
+            self.assertNotEqual(self.client.post(url, {}).status_code, 429)
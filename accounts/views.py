@@ -5,6 +5,7 @@ from django.contrib.auth import login
 from django.views.decorators.csrf import csrf_exempt
 import xml.etree.ElementTree as ET, uuid
 from .models import UserProfile
+from .ratelimit import rate_limit
 from django.test import RequestFactory
 from django.urls import resolve
 
@@ -82,6 +83,7 @@ def sso_callback(request):
 
 # --------------------  CAS LOGIN PAGE --------------------
 @csrf_exempt
+@rate_limit('cas_login', '10/m', key='ip')
 def cas_login(request):
     service = request.GET.get("service", SERVICE_URL)
     context = {}
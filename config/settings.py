@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'feedback',
     'notification',
     'library',
+    'media_files',
 ]
 
 MIDDLEWARE = [
@@ -76,6 +77,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 
 # Database
@@ -137,4 +139,96 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # Đảm bảo thư mục media tồn tại
-os.makedirs(MEDIA_ROOT, exist_ok=True)
\ No newline at end of file
+os.makedirs(MEDIA_ROOT, exist_ok=True)
+
+# Uploaded files go through a storage that records existence/size/hash,
+# so templates never stat() MEDIA_ROOT
+STORAGES = {
+    'default': {
+        'BACKEND': 'media_files.storage.MetadataFileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+# Seconds file metadata stays cached (found / not found). Without a shared cache
+# backend each process caches on its own, so a file saved by another process can
+# look missing for up to FILE_METADATA_MISS_TIMEOUT.
+FILE_METADATA_CACHE_TIMEOUT = 3600
+FILE_METADATA_MISS_TIMEOUT = 30
+# Avatar renditions are built by a background worker thread after upload.
+# Set to False to process them inline (e.g. in tests).
+AVATAR_PROCESSING_ASYNC = True
+
+
+# Notifications are fanned out with bulk_create in batches of this size
+NOTIFICATION_BATCH_SIZE = 500
+
+# Seconds the timetable version stays cached. Changes invalidate cached timetables
+# at once only with a shared cache backend; otherwise other processes may serve
+# the previous timetable (and its ETag) for up to this delay.
+TIMETABLE_VERSION_TIMEOUT = 60
+
+# Seconds a user's inbox summary (unread count, dropdown previews) stays cached.
+# Notifications created by another process (dispatch_outbox, other workers) show
+# up at once only with a shared cache backend; otherwise after this delay.
+NOTIFICATION_INBOX_CACHE_TIMEOUT = 60
+
+# Seconds the subscribers of an event stay cached. Subscription changes clear the
+# entry at once only with a shared cache backend (Redis, Memcached); with the
+# default per-process cache, other processes see them after this delay.
+NOTIFICATION_SUBSCRIBERS_CACHE_TIMEOUT = 60
+
+# Repeated events of these types (same recipient, type, session and target object)
+# within NOTIFICATION_COALESCE_WINDOW seconds are merged into one row with a counter
+NOTIFICATION_COALESCE_TYPES = ['feedback_received', 'session_request', 'technical_report']
+NOTIFICATION_COALESCE_WINDOW = 10 * 60
+
+# Low-priority types listed here skip the inbox and are batched per user into one
+# notification by `python manage.py send_notification_digests` (run e.g. daily)
+NOTIFICATION_DIGEST_TYPES = []
+
+# Days each notification type stays in the inbox before `purge_notifications`
+# archives it ('default' covers unlisted types, None keeps a type forever)
+NOTIFICATION_RETENTION_DAYS = {
+    'default': 180,
+    'announcement': 90,
+    'session_request': 60,
+    'technical_report': 365,
+}
+
+# Types also delivered by email (through the outbox dispatcher)
+NOTIFICATION_EMAIL_TYPES = ['session_confirmed', 'session_cancelled', 'session_rescheduled']
+
+# Deliver outbox rows on a background thread of the web process right after
+# commit; `python manage.py dispatch_outbox` picks up retries and anything left.
+NOTIFICATION_OUTBOX_AUTODISPATCH = True
+
+# Console backend for local development; configure SMTP in production
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'Tutor Support System <no-reply@tutor-support.local>'
+# Prefix of absolute links in emails
+SITE_URL = 'http://127.0.0.1:8000'
+# Outgoing emails per minute for each destination domain ('default' applies to the others;
+# None disables the limit). Messages over the limit wait in the outbox.
+NOTIFICATION_EMAIL_RATE_LIMITS = {
+    'default': 600,
+}
+
+# Per-client limits of write endpoints ('10/m', '100/15m'), overriding the rates
+# given to @rate_limit in the views; None disables a limit. Counters live in the
+# default cache, which must be shared (Redis, Memcached) across worker processes.
+RATE_LIMITS = {
+    # 'request_session': '10/m',
+}
+# Count clients by the first X-Forwarded-For address (only behind a trusted proxy)
+RATE_LIMIT_TRUST_FORWARDED_FOR = False
+
+# Set to True only when the site is served through ASGI (config.asgi): the SSE
+# stream holds its connection open, which would tie up a WSGI worker per tab.
+# When False the pages do not open the stream and it answers once and closes.
+NOTIFICATION_SSE_ENABLED = False
+
+# Pub/sub hub feeding the notification SSE stream. The in-process backend only
+# reaches clients connected to the same worker process.
+NOTIFICATION_PUBSUB_BACKEND = 'notification.realtime.InProcessBackend'
@@ -19,6 +19,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
+from tutoring_sessions import views as tutoring_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -29,6 +30,7 @@ urlpatterns = [
     path('feedback/', include('feedback.urls')),
     path('notifications/', include('notification.urls')),
     path('library/', include('library.urls')),
+    path('api/timetable/', tutoring_views.timetable_api, name='timetable_api'),
 ]
 
 
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import Feedback
-from .models import SessionRequest, TechnicalReport, StudentProgress
+from .models import SessionRequest, TechnicalReport, StudentProgress, SessionRatingSummary, TutorRatingSummary, TutorLeaderboardEntry, FeedbackThemes, SessionDemand, ReportCluster
+from . import triage
 
 # Register your models here.
 @admin.register(Feedback)
@@ -17,8 +18,10 @@ class SessionRequestAdmin(admin.ModelAdmin):
 
 @admin.register(TechnicalReport)
 class TechnicalReportAdmin(admin.ModelAdmin):
-    list_display = ['id', 'user', 'status', 'priority', 'created_at', 'is_resolved']
+    list_display = ['id', 'user', 'status', 'priority', 'cluster', 'created_at', 'is_resolved']
     list_filter = ['status', 'priority', 'created_at']
+    list_select_related = ['user', 'cluster']
+    raw_id_fields = ['cluster']
     search_fields = ['user__username', 'problem_description', 'admin_notes']
     readonly_fields = ['created_at', 'updated_at', 'resolved_at']
     
@@ -27,7 +30,7 @@ class TechnicalReportAdmin(admin.ModelAdmin):
             'fields': ('user', 'problem_description', 'created_at')
         }),
         ('Status & Priority', {
-            'fields': ('status', 'priority', 'resolved_at')
+            'fields': ('status', 'priority', 'cluster', 'resolved_at')
         }),
         ('Admin Notes', {
             'fields': ('admin_notes',),
@@ -39,7 +42,7 @@ class TechnicalReportAdmin(admin.ModelAdmin):
         }),
     )
     
-    actions = ['mark_as_resolved', 'mark_as_pending']
+    actions = ['mark_as_resolved', 'mark_as_pending', 'resolve_clusters']
     
     def mark_as_resolved(self, request, queryset):
         from django.utils import timezone
@@ -52,6 +55,12 @@ class TechnicalReportAdmin(admin.ModelAdmin):
         self.message_user(request, f'{updated} report(s) marked as pending.')
     mark_as_pending.short_description = "Mark selected reports as pending"
 
+    def resolve_clusters(self, request, queryset):
+        clusters = ReportCluster.objects.filter(reports__in=queryset).distinct()
+        resolved = triage.resolve_clusters(clusters)
+        self.message_user(request, f'{resolved} report(s) in the same cluster(s) marked as resolved.')
+    resolve_clusters.short_description = "Resolve every report in the clusters of the selected reports"
+
 @admin.register(StudentProgress)
 class StudentProgressAdmin(admin.ModelAdmin):
     list_display = [
@@ -68,4 +77,55 @@ class StudentProgressAdmin(admin.ModelAdmin):
     search_fields = ['student__full_name', 'session__class_code', 'tutor__full_name']
 
     # 🔥 Remove enrollment, keep only these as autocomplete
-    autocomplete_fields = ['student', 'session', 'tutor']
\ No newline at end of file
+    autocomplete_fields = ['student', 'session', 'tutor']
+
+
+@admin.register(SessionRatingSummary)
+class SessionRatingSummaryAdmin(admin.ModelAdmin):
+    list_display = ['session', 'tutor', 'count', 'total', 'updated_at']
+    search_fields = ['session__class_code', 'tutor__full_name']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(TutorRatingSummary)
+class TutorRatingSummaryAdmin(admin.ModelAdmin):
+    list_display = ['tutor', 'count', 'total', 'updated_at']
+    search_fields = ['tutor__full_name']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(TutorLeaderboardEntry)
+class TutorLeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = ['tutor', 'subject', 'score', 'count', 'updated_at']
+    list_filter = ['subject']
+    search_fields = ['tutor__full_name', 'subject__name']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(FeedbackThemes)
+class FeedbackThemesAdmin(admin.ModelAdmin):
+    list_display = ['scope', 'session', 'tutor', 'comment_count', 'sentiment', 'computed_at']
+    list_filter = ['scope']
+    search_fields = ['session__class_code', 'tutor__full_name']
+    readonly_fields = ['computed_at']
+
+
+@admin.register(SessionDemand)
+class SessionDemandAdmin(admin.ModelAdmin):
+    list_display = ['semester', 'subject', 'subject_key', 'weekday', 'hour', 'delivery_mode', 'count']
+    list_filter = ['semester', 'delivery_mode', 'weekday']
+    search_fields = ['subject_key', 'subject__name', 'subject__code']
+
+
+@admin.register(ReportCluster)
+class ReportClusterAdmin(admin.ModelAdmin):
+    list_display = ['id', 'representative', 'size', 'priority', 'status', 'window_count', 'last_report_at']
+    list_filter = ['status', 'priority']
+    search_fields = ['representative']
+    readonly_fields = ['signature', 'created_at', 'window_start', 'window_count', 'last_report_at']
+    actions = ['resolve_clusters']
+
+    def resolve_clusters(self, request, queryset):
+        resolved = triage.resolve_clusters(queryset)
+        self.message_user(request, f'{resolved} report(s) marked as resolved.')
+    resolve_clusters.short_description = "Resolve all reports in selected clusters"
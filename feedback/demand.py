@@ -0,0 +1,267 @@
+"""
+Demand heatmap of SessionRequests and suggestions of sections to open.
+
+Every request is matched against Subject (by code or name, accents and case
+ignored) and counted once in each hour of the week its time window covers,
+per semester and delivery mode, in SessionDemand. Buckets are updated in the
+transaction of every request insert, edit or delete (see signals.py), so the
+office reads precomputed rows instead of scanning the requests. The matched
+bucket key is stored on the request (`demand_key`) when it is saved, and edits
+and deletes decrement that key, so renaming or adding subjects later never
+moves a decrement to another bucket.
+
+`suggestions()` compares the demand of each subject/hour with the sections
+already running then and with the tutors whose TutorAvailability is free, and
+lists the slots where students are waiting.
+"""
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import SessionDemand, SessionRequest
+
+logger = logging.getLogger(__name__)
+
+SUBJECTS_CACHE_KEY = 'demand:subjects'
+# Subject edits clear the index at once only in the process (or shared cache) that made them
+SUBJECTS_CACHE_TIMEOUT = 60
+# A slot is suggested once this many requests are not covered by a running section
+MIN_REQUESTS = 3
+# Requests one running section is assumed to absorb
+REQUESTS_PER_SECTION = 10
+
+
+def semester_of(day):
+    """Term of a date: 1 = Sep-Jan, 2 = Feb-Jun, 3 = summer, labelled by the academic year start"""
+    if day.month >= 9:
+        return f'{day.year}-1'
+    if day.month == 1:
+        return f'{day.year - 1}-1'
+    if day.month <= 6:
+        return f'{day.year - 1}-2'
+    return f'{day.year - 1}-3'
+
+
+def normalize(text):
+    """Lower-case ASCII words: "Giải tích 1" -> "giai tich 1" """
+    text = unicodedata.normalize('NFD', text.replace('đ', 'd').replace('Đ', 'D'))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(re.findall(r'[a-z0-9]+', text))
+
+
+def build_index(subjects):
+    """Lookup tables of (id, code, name) subject rows"""
+    codes, names = {}, {}
+    for subject_id, code, name in subjects:
+        codes[normalize(code).replace(' ', '')] = subject_id
+        names[normalize(name)] = subject_id
+    return {'codes': codes, 'names': names}
+
+
+def _subject_index():
+    index = cache.get(SUBJECTS_CACHE_KEY)
+    if index is None:
+        from tutoring_sessions.models import Subject
+        index = build_index(Subject.objects.values_list('id', 'code', 'name'))
+        cache.set(SUBJECTS_CACHE_KEY, index, SUBJECTS_CACHE_TIMEOUT)
+    return index
+
+
+def forget_subjects():
+    cache.delete(SUBJECTS_CACHE_KEY)
+
+
+def match_subject(text, index=None):
+    """(bucket key, Subject id or None) of the free-text subject of a request"""
+    key = normalize(text)
+    compact = key.replace(' ', '')
+    index = index or _subject_index()
+    subject_id = index['codes'].get(compact) or index['names'].get(key)
+    if subject_id is None:
+        # "MATH101 - Calculus", "on thi giai tich 1": longest code or name mentioned
+        padded = f' {key} '
+        candidates = [(len(code), sid) for code, sid in index['codes'].items() if code and code in compact]
+        candidates += [(len(name), sid) for name, sid in index['names'].items() if name and f' {name} ' in padded]
+        if candidates:
+            subject_id = max(candidates)[1]
+    if subject_id is not None:
+        return f'subject:{subject_id}', subject_id
+    return key[:200], None
+
+
+def hours_covered(start_time, end_time):
+    start = start_time.hour * 60 + start_time.minute
+    end = end_time.hour * 60 + end_time.minute
+    return range(start // 60, -(-end // 60))
+
+
+def subject_of(key):
+    """Subject id of a bucket key ("subject:12" -> 12), None for unmatched text"""
+    return int(key[8:]) if key.startswith('subject:') else None
+
+
+def buckets(key, delivery_mode, day, start_time, end_time):
+    """Buckets (semester, subject_key, subject_id, weekday, hour, delivery_mode) of one request"""
+    semester = semester_of(day)
+    return [
+        (semester, key, subject_of(key), day.weekday(), hour, delivery_mode)
+        for hour in hours_covered(start_time, end_time)
+    ]
+
+
+def snapshot(request):
+    """Fields of a request that decide its buckets (demand_key as matched when it was saved)"""
+    return (request.demand_key, request.delivery_mode, request.date, request.start_time, request.end_time)
+
+
+def _apply(bucket, sign):
+    semester, key, subject_id, weekday, hour, delivery_mode = bucket
+    rows = SessionDemand.objects.filter(
+        semester=semester, subject_key=key, weekday=weekday, hour=hour, delivery_mode=delivery_mode
+    )
+    if rows.update(count=F('count') + sign):
+        if sign < 0:
+            rows.filter(count=0).delete()
+        return
+    if sign < 0:
+        # The bucket the request was counted in is gone (e.g. rebuilt meanwhile)
+        logger.warning('No demand bucket to decrement: %s', bucket)
+        return
+    try:
+        with transaction.atomic():
+            SessionDemand.objects.create(
+                semester=semester, subject_key=key, subject_id=subject_id,
+                weekday=weekday, hour=hour, delivery_mode=delivery_mode, count=1
+            )
+    except IntegrityError:
+        # Created concurrently by another request
+        rows.update(count=F('count') + sign)
+
+
+def request_added(fields):
+    for bucket in buckets(*fields):
+        _apply(bucket, 1)
+
+
+def request_removed(fields):
+    for bucket in buckets(*fields):
+        _apply(bucket, -1)
+
+
+def rebuild():
+    """Rematch every request and recount every bucket. Returns the number of buckets."""
+    counts = defaultdict(int)
+    subjects = {}
+    moved = []
+    index = _subject_index()
+
+    with transaction.atomic():
+        rows = SessionRequest.objects.values_list(
+            'id', 'subject', 'demand_key', 'delivery_mode', 'date', 'start_time', 'end_time'
+        ).iterator(chunk_size=2000)
+        for request_id, subject, stored_key, *fields in rows:
+            key = match_subject(subject, index)[0]
+            if key != stored_key:
+                moved.append(SessionRequest(id=request_id, demand_key=key))
+            for semester, key, subject_id, weekday, hour, mode in buckets(key, *fields):
+                counts[(semester, key, weekday, hour, mode)] += 1
+                subjects[key] = subject_id
+        SessionRequest.objects.bulk_update(moved, ['demand_key'], batch_size=500)
+
+        SessionDemand.objects.all().delete()
+        SessionDemand.objects.bulk_create([
+            SessionDemand(
+                semester=semester, subject_key=key, subject_id=subjects[key],
+                weekday=weekday, hour=hour, delivery_mode=mode, count=count
+            )
+            for (semester, key, weekday, hour, mode), count in counts.items()
+        ], batch_size=500)
+    return len(counts)
+
+
+def heatmap(semester, subject_id=None, delivery_mode=None):
+    """Demand cells of a semester: [{'subject_id', 'subject_key', 'weekday', 'hour', 'count'}] busiest first"""
+    cells = SessionDemand.objects.filter(semester=semester)
+    if subject_id is not None:
+        cells = cells.filter(subject_id=subject_id)
+    if delivery_mode:
+        cells = cells.filter(delivery_mode=delivery_mode)
+    return list(
+        cells.values('subject_id', 'subject_key', 'weekday', 'hour')
+        .annotate(count=Sum('count'))
+        .order_by('-count', 'weekday', 'hour')
+    )
+
+
+def _free_tutors():
+    """{(subject_id, weekday, hour): {tutor ids}} from free TutorAvailability slots"""
+    from tutors.models import Tutor, TutorAvailability
+    expertise = defaultdict(set)
+    for tutor_id, subject_id in Tutor.expertise.through.objects.values_list('tutor_id', 'subject_id'):
+        expertise[tutor_id].add(subject_id)
+
+    free = defaultdict(set)
+    slots = TutorAvailability.objects.filter(status='available').values_list(
+        'tutor_id', 'subject_id', 'weekday', 'start_time', 'end_time'
+    )
+    for tutor_id, subject_id, weekday, start_time, end_time in slots:
+        # A slot without subject is open to every subject of the tutor's expertise
+        for subject in ([subject_id] if subject_id else expertise[tutor_id]):
+            for hour in hours_covered(start_time, end_time):
+                free[(subject, weekday, hour)].add(tutor_id)
+    return free
+
+
+def _running_sections():
+    """{(subject_id, weekday, hour): number of scheduled or ongoing sections}"""
+    from tutoring_sessions.models import Session
+    running = defaultdict(int)
+    for session in Session.objects.filter(status__in=['scheduled', 'ongoing']).only(
+        'subject_id', 'days', 'start_time', 'end_time'
+    ):
+        for weekday in session.get_weekdays():
+            for hour in hours_covered(session.start_time, session.end_time):
+                running[(session.subject_id, weekday, hour)] += 1
+    return running
+
+
+def suggestions(semester, min_requests=MIN_REQUESTS, limit=20):
+    """
+    Slots where matched demand is not covered by running sections, best first:
+    [{'subject_id', 'weekday', 'hour', 'requests', 'sections', 'unmet', 'tutor_ids', 'modes'}].
+    An empty tutor_ids means no tutor is free then (recruit or move availability).
+    """
+    cells = SessionDemand.objects.filter(
+        semester=semester, subject__isnull=False, count__gt=0
+    ).values_list('subject_id', 'weekday', 'hour', 'delivery_mode', 'count')
+
+    demand = defaultdict(lambda: {'requests': 0, 'modes': {}})
+    for subject_id, weekday, hour, mode, count in cells:
+        slot = demand[(subject_id, weekday, hour)]
+        slot['requests'] += count
+        slot['modes'][mode] = slot['modes'].get(mode, 0) + count
+
+    running = _running_sections()
+    free = _free_tutors()
+    result = []
+    for (subject_id, weekday, hour), slot in demand.items():
+        sections = running.get((subject_id, weekday, hour), 0)
+        unmet = slot['requests'] - sections * REQUESTS_PER_SECTION
+        if unmet >= min_requests:
+            result.append({
+                'subject_id': subject_id,
+                'weekday': weekday,
+                'hour': hour,
+                'requests': slot['requests'],
+                'sections': sections,
+                'unmet': unmet,
+                'tutor_ids': sorted(free.get((subject_id, weekday, hour), ())),
+                'modes': slot['modes'],
+            })
+    result.sort(key=lambda s: (-s['unmet'], s['weekday'], s['hour'], s['subject_id']))
+    return result[:limit]
@@ -0,0 +1,322 @@
+"""
+Streaming exports of feedback, progress, enrollment and session request data.
+
+Rows are read with `values_list(...).iterator(chunk_size=...)` and written out
+as they arrive, so memory use does not depend on the number of rows and the
+first bytes reach the client before the query is exhausted. The same
+generators serve the HTTP endpoint (StreamingHttpResponse) and the
+`export_data` management command.
+
+XLSX is written as a minimal SpreadsheetML package streamed through zipfile
+(no openpyxl dependency): one sheet, inline strings, no styles.
+"""
+import csv
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from tutoring_sessions.models import Enrollment
+
+from .models import Feedback, SessionRequest, StudentProgress
+
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'xlsx')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _id(value):
+    if not str(value).isdigit():
+        raise ValueError(f'Expected an id, got "{value}"')
+    return int(value)
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Expected a YYYY-MM-DD date, got "{value}"')
+
+
+def _bool(value):
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f'Expected true or false, got "{value}"')
+
+
+@dataclass(frozen=True)
+class Dataset:
+    model: type
+    # Column name -> ORM lookup, in export order
+    columns: dict
+    # Filter name -> (ORM lookup, parser)
+    filters: dict = field(default_factory=dict)
+
+
+def _with_dates(lookup, filters):
+    return {'date_from': (f'{lookup}__gte', _date), 'date_to': (f'{lookup}__lte', _date), **filters}
+
+
+DATASETS = {
+    'feedback': Dataset(
+        Feedback,
+        {
+            'id': 'id',
+            'session': 'enrollment__session__class_code',
+            'subject': 'enrollment__session__subject__name',
+            'tutor': 'enrollment__session__tutor__full_name',
+            'student_id': 'enrollment__student__student_id',
+            'student': 'enrollment__student__full_name',
+            'rating': 'rating',
+            'comment': 'comment',
+            'created_at': 'created_at',
+        },
+        _with_dates('created_at__date', {
+            'session': ('enrollment__session_id', _id),
+            'subject': ('enrollment__session__subject_id', _id),
+            'tutor': ('enrollment__session__tutor_id', _id),
+            'rating': ('rating', _id),
+        }),
+    ),
+    'progress': Dataset(
+        StudentProgress,
+        {
+            'id': 'id',
+            'session': 'session__class_code',
+            'subject': 'session__subject__name',
+            'tutor': 'tutor__full_name',
+            'student_id': 'student__student_id',
+            'student': 'student__full_name',
+            'attendance': 'attendance',
+            'topics_covered': 'topics_covered',
+            'comprehension_level': 'comprehension_level',
+            'goals_achieved': 'goals_achieved',
+            'area_for_improvement': 'area_for_improvement',
+            'notes': 'notes',
+            'created_at': 'created_at',
+            'updated_at': 'updated_at',
+        },
+        _with_dates('created_at__date', {
+            'session': ('session_id', _id),
+            'subject': ('session__subject_id', _id),
+            'tutor': ('tutor_id', _id),
+            'student': ('student_id', _id),
+        }),
+    ),
+    'enrollments': Dataset(
+        Enrollment,
+        {
+            'id': 'id',
+            'session': 'session__class_code',
+            'subject': 'session__subject__name',
+            'tutor': 'session__tutor__full_name',
+            'session_status': 'session__status',
+            'student_id': 'student__student_id',
+            'student': 'student__full_name',
+            'enrolled_at': 'enrolled_at',
+            'is_active': 'is_active',
+        },
+        _with_dates('enrolled_at__date', {
+            'session': ('session_id', _id),
+            'subject': ('session__subject_id', _id),
+            'tutor': ('session__tutor_id', _id),
+            'session_status': ('session__status', str),
+            'is_active': ('is_active', _bool),
+        }),
+    ),
+    'session_requests': Dataset(
+        SessionRequest,
+        {
+            'id': 'id',
+            'student_id': 'student__student_id',
+            'student': 'student__full_name',
+            'subject': 'subject',
+            'delivery_mode': 'delivery_mode',
+            'date': 'date',
+            'start_time': 'start_time',
+            'end_time': 'end_time',
+            'created_at': 'created_at',
+        },
+        # Requests are filtered by the requested date, not by when they were made
+        _with_dates('date', {
+            'delivery_mode': ('delivery_mode', str),
+            'student': ('student_id', _id),
+        }),
+    ),
+}
+
+
+def build(name, columns=None, filters=None):
+    """
+    (column names, row iterator) of a dataset. `columns` is a list of column
+    names (default: all), `filters` a {filter name: raw string value} dict.
+    Raises ValueError on unknown datasets, columns or filters and bad values.
+    """
+    if name not in DATASETS:
+        raise ValueError(f'Unknown dataset "{name}" (choose from {", ".join(DATASETS)})')
+    dataset = DATASETS[name]
+
+    columns = list(columns or dataset.columns)
+    unknown = [column for column in columns if column not in dataset.columns]
+    if unknown:
+        raise ValueError(f'Unknown column(s) {", ".join(unknown)} (choose from {", ".join(dataset.columns)})')
+
+    lookups = {}
+    for key, value in (filters or {}).items():
+        if key not in dataset.filters:
+            raise ValueError(f'Unknown filter "{key}" (choose from {", ".join(dataset.filters)})')
+        lookup, parse = dataset.filters[key]
+        lookups[lookup] = parse(value)
+
+    rows = (
+        dataset.model.objects.filter(**lookups)
+        .order_by('pk')
+        .values_list(*(dataset.columns[column] for column in columns))
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    return columns, rows
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+# Leading characters that make spreadsheet apps read a cell as a formula
+_FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+
+def _csv_text(value):
+    """_text() with formula-looking text quoted, so a comment like "=HYPERLINK(...)" is not run on open"""
+    text = _text(value)
+    if isinstance(value, str) and text.startswith(_FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+class _Buffer:
+    """Write target that hands back what was written since the last call"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = self.parts
+        self.parts = []
+        return data
+
+
+def stream_csv(columns, rows, flush_every=500):
+    """CSV content (str chunks) for a header and rows. Starts with a BOM so Excel reads UTF-8 accents."""
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield '\ufeff' + ''.join(buffer.take())
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_text(value) for value in row])
+        if count % flush_every == 0:
+            yield ''.join(buffer.take())
+    yield ''.join(buffer.take())
+
+
+# XML 1.0 does not allow most control characters, even escaped
+_XML_ILLEGAL = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _cell(value):
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_text(value).translate(_XML_ILLEGAL))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row(values):
+    return '<row>' + ''.join(_cell(value) for value in values) + '</row>'
+
+
+def stream_xlsx(columns, rows, flush_every=CHUNK_SIZE):
+    """XLSX file content (bytes chunks) for a header and rows"""
+    buffer = _Buffer()
+    # The buffer cannot seek: zipfile writes data descriptors after each member
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as package:
+        for name, content in _XLSX_PARTS.items():
+            package.writestr(name, content)
+        with package.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _row(columns)
+            ).encode())
+            for count, row in enumerate(rows, 1):
+                sheet.write(_row(row).encode())
+                if count % flush_every == 0:
+                    yield b''.join(buffer.take())
+            sheet.write(b'</sheetData></worksheet>')
+    yield b''.join(buffer.take())
+
+
+def stream(name, file_format='csv', columns=None, filters=None):
+    """Validate the export and return its content iterator (str for CSV, bytes for XLSX)"""
+    if file_format not in FORMATS:
+        raise ValueError(f'Unknown format "{file_format}" (choose from {", ".join(FORMATS)})')
+    columns, rows = build(name, columns, filters)
+    if file_format == 'xlsx':
+        return stream_xlsx(columns, rows)
+    return stream_csv(columns, rows)
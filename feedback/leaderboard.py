@@ -0,0 +1,112 @@
+"""
+Tutor leaderboard with Bayesian-smoothed scores, per subject and overall.
+
+    score = (PRIOR_WEIGHT * prior_mean + sum of ratings) / (PRIOR_WEIGHT + number of ratings)
+
+A tutor with few ratings stays close to the mean rating of all tutors and only
+moves away from it as ratings accumulate, so a single 5-star feedback does not
+top the board. Rows are updated in the transaction of every Feedback insert or
+delete, with the prior mean of that moment; `rebuild()` (nightly:
+`python manage.py rebuild_tutor_leaderboard`) rescores every row with the
+current prior.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Sum, Value
+
+from .models import Feedback, TutorLeaderboardEntry, TutorRatingSummary
+
+
+# Weight of the prior, in number of ratings
+PRIOR_WEIGHT = 5
+# Prior used before anyone has been rated (middle of the 1-5 scale)
+DEFAULT_PRIOR_MEAN = 3.0
+
+
+def prior_mean():
+    """Mean rating over all tutors"""
+    totals = TutorRatingSummary.objects.aggregate(count=Sum('count'), total=Sum('total'))
+    return totals['total'] / totals['count'] if totals['count'] else DEFAULT_PRIOR_MEAN
+
+
+def bayesian_score(count, total, mean):
+    return (PRIOR_WEIGHT * mean + total) / (PRIOR_WEIGHT + count)
+
+
+def _apply(tutor_id, subject_id, rating, sign, mean):
+    entries = TutorLeaderboardEntry.objects.filter(tutor_id=tutor_id, subject_id=subject_id)
+    # The right-hand sides read the values before the update
+    changes = {
+        'count': F('count') + sign,
+        'total': F('total') + sign * rating,
+        'score': ExpressionWrapper(
+            (Value(PRIOR_WEIGHT * mean + sign * rating) + F('total')) / (Value(PRIOR_WEIGHT + sign) + F('count')),
+            output_field=FloatField()
+        ),
+    }
+    if entries.update(**changes):
+        if sign < 0:
+            entries.filter(count=0).delete()
+        return
+    if sign < 0:
+        return
+    try:
+        with transaction.atomic():
+            TutorLeaderboardEntry.objects.create(
+                tutor_id=tutor_id, subject_id=subject_id,
+                count=1, total=rating, score=bayesian_score(1, rating, mean)
+            )
+    except IntegrityError:
+        # Created concurrently by another request
+        entries.update(**changes)
+
+
+def _change(tutor_id, subject_id, rating, sign):
+    rating = int(rating)
+    mean = prior_mean()
+    _apply(tutor_id, subject_id, rating, sign, mean)
+    _apply(tutor_id, None, rating, sign, mean)
+
+
+def feedback_added(tutor_id, subject_id, rating):
+    _change(tutor_id, subject_id, rating, 1)
+
+
+def feedback_removed(tutor_id, subject_id, rating):
+    _change(tutor_id, subject_id, rating, -1)
+
+
+def rebuild(tutor_ids=None):
+    """Recompute the entries of the given tutors (all by default). Returns the number of rows written."""
+    feedbacks = Feedback.objects.all()
+    entries = TutorLeaderboardEntry.objects.all()
+    if tutor_ids is not None:
+        feedbacks = feedbacks.filter(enrollment__session__tutor_id__in=tutor_ids)
+        entries = entries.filter(tutor_id__in=tutor_ids)
+
+    rows = feedbacks.values(
+        'enrollment__session__tutor_id', 'enrollment__session__subject_id'
+    ).annotate(count=Count('id'), total=Sum('rating')).order_by()
+
+    totals = {}
+    for row in rows:
+        tutor_id = row['enrollment__session__tutor_id']
+        for subject_id in (row['enrollment__session__subject_id'], None):
+            count, total = totals.get((tutor_id, subject_id), (0, 0))
+            totals[(tutor_id, subject_id)] = (count + row['count'], total + row['total'])
+
+    mean = prior_mean()
+    with transaction.atomic():
+        entries.delete()
+        TutorLeaderboardEntry.objects.bulk_create([
+            TutorLeaderboardEntry(
+                tutor_id=tutor_id, subject_id=subject_id,
+                count=count, total=total, score=bayesian_score(count, total, mean)
+            )
+            for (tutor_id, subject_id), (count, total) in totals.items()
+        ])
+    return len(totals)
+
+
+def top(subject=None, limit=10):
+    """Best tutors of a subject (or overall), best first"""
+    return TutorLeaderboardEntry.objects.filter(subject=subject).select_related('tutor').order_by('-score')[:limit]
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from feedback.text_analytics import CHUNK_SIZE, TOP_KEYWORDS, analyze_feedback
+
+
+class Command(BaseCommand):
+    help = (
+        "Extract keywords and sentiment from feedback comments per session and tutor "
+        "(schedule nightly, e.g. cron: 0 3 * * * python manage.py analyze_feedback)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count, 1 = in-process)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Comments per worker task')
+        parser.add_argument('--top', type=int, default=TOP_KEYWORDS, help='Keywords kept per session and tutor')
+
+    def handle(self, *args, **options):
+        stats = analyze_feedback(workers=options['workers'], chunk_size=options['chunk_size'], top=options['top'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Analyzed {stats['comments']} comments ({stats['terms']} terms): "
+            f"themes for {stats['sessions']} sessions and {stats['tutors']} tutors."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from feedback.triage import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recluster every TechnicalReport from scratch "
+        "(run once after deploying triage; new reports are clustered as they arrive)"
+    )
+
+    def handle(self, *args, **options):
+        clusters = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Grouped technical reports into {clusters} clusters.'))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from feedback import exports
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a dataset (feedback, progress, enrollments, session_requests) to CSV or XLSX, "
+        "e.g. export_data feedback --filter date_from=2025-09-01 --columns session,rating,comment"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(exports.DATASETS))
+        parser.add_argument('--format', choices=exports.FORMATS, default='csv')
+        parser.add_argument('--columns', default='', help='Comma-separated column names (default: all)')
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='NAME=VALUE',
+            help='Filter rows, may be repeated (e.g. subject=3, date_to=2026-01-31)'
+        )
+        parser.add_argument('--output', '-o', help='Output file (default: standard output, CSV only)')
+
+    def handle(self, *args, **options):
+        filters = {}
+        for item in options['filter']:
+            name, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'Filters are NAME=VALUE, got "{item}"')
+            filters[name] = value
+        columns = [c for c in options['columns'].split(',') if c]
+        file_format = options['format']
+        if file_format == 'xlsx' and not options['output']:
+            raise CommandError('XLSX exports need --output')
+
+        try:
+            content = exports.stream(options['dataset'], file_format, columns, filters)
+            if options['output'] is None:
+                for chunk in content:
+                    self.stdout.write(chunk, ending='')
+                return
+            if file_format == 'xlsx':
+                out = open(options['output'], 'wb')
+            else:
+                out = open(options['output'], 'w', encoding='utf-8', newline='')
+            with out:
+                for chunk in content:
+                    out.write(chunk)
+        except ValueError as error:
+            raise CommandError(error)
+        self.stderr.write(self.style.SUCCESS(f"Exported {options['dataset']} to {options['output']}."))
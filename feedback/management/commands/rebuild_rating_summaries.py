@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from feedback.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute session and tutor rating rollups from Feedback "
+        "(run once after deploying them; they are maintained incrementally afterwards)"
+    )
+
+    def handle(self, *args, **options):
+        written = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} session rating summaries.'))
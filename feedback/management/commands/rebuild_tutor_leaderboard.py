@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from feedback.leaderboard import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Rescore the tutor leaderboard with the current mean rating "
+        "(schedule nightly, e.g. cron: 30 2 * * * python manage.py rebuild_tutor_leaderboard)"
+    )
+
+    def handle(self, *args, **options):
+        written = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Stored {written} leaderboard entries.'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from feedback import demand
+from tutoring_sessions.models import Subject
+from tutors.models import Tutor, TutorAvailability
+
+
+class Command(BaseCommand):
+    help = "Print suggested sections to open from session request demand (--rebuild recounts the heatmap first)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semester', help='e.g. 2025-1 (default: current semester)')
+        parser.add_argument('--rebuild', action='store_true', help='Recount the demand buckets from every request')
+        parser.add_argument('--min-requests', type=int, default=demand.MIN_REQUESTS)
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.stdout.write(f'Rebuilt {demand.rebuild()} demand buckets.')
+
+        semester = options['semester'] or demand.semester_of(timezone.localdate())
+        suggestions = demand.suggestions(semester, min_requests=options['min_requests'])
+        subjects = dict(Subject.objects.values_list('id', 'name'))
+        tutors = dict(Tutor.objects.values_list('id', 'full_name'))
+        days = dict(TutorAvailability.WEEKDAY_CHOICES)
+
+        for s in suggestions:
+            names = ', '.join(tutors[t] for t in s['tutor_ids']) or 'no tutor available'
+            self.stdout.write(
+                f"{subjects[s['subject_id']]}: {days[s['weekday']]} {s['hour']:02}:00 - "
+                f"{s['unmet']} unmet of {s['requests']} requests, {s['sections']} section(s) running; {names}"
+            )
+        self.stdout.write(self.style.SUCCESS(f'{len(suggestions)} suggestion(s) for semester {semester}.'))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0004_tutorratingsummary_sessionratingsummary'),
+        ('tutoring_sessions', '0005_sessionrecommendation'),
+        ('tutors', '0002_tutoravailability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TutorLeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('score', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='tutoring_sessions.subject')),
+                ('tutor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='tutors.tutor')),
+            ],
+            options={
+                'verbose_name_plural': 'Tutor leaderboard entries',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['subject', '-score'], name='leaderboard_subject_score')],
+                'constraints': [models.UniqueConstraint(fields=('tutor', 'subject'), name='unique_leaderboard_tutor_subject'), models.UniqueConstraint(condition=models.Q(('subject__isnull', True)), fields=('tutor',), name='unique_leaderboard_tutor_overall')],
+            },
+        ),
+    ]
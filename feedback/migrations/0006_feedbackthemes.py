@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0005_tutorleaderboardentry'),
+        ('tutoring_sessions', '0005_sessionrecommendation'),
+        ('tutors', '0002_tutoravailability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackThemes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('session', 'Session'), ('tutor', 'Tutor')], max_length=10)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('keywords', models.JSONField(default=list)),
+                ('sentiment', models.FloatField(default=0)),
+                ('positive', models.PositiveIntegerField(default=0)),
+                ('neutral', models.PositiveIntegerField(default=0)),
+                ('negative', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='feedback_themes', to='tutoring_sessions.session')),
+                ('tutor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feedback_themes', to='tutors.tutor')),
+            ],
+            options={
+                'verbose_name_plural': 'Feedback themes',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('scope', 'session')), fields=('session',), name='unique_themes_session'), models.UniqueConstraint(condition=models.Q(('scope', 'tutor')), fields=('tutor',), name='unique_themes_tutor')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0006_feedbackthemes'),
+        ('tutoring_sessions', '0005_sessionrecommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionDemand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semester', models.CharField(max_length=10)),
+                ('subject_key', models.CharField(max_length=200)),
+                ('weekday', models.PositiveSmallIntegerField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('delivery_mode', models.CharField(choices=[('online', 'Online'), ('offline', 'Offline'), ('hybrid', 'Hybrid')], max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='demand', to='tutoring_sessions.subject')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['semester', '-count'], name='demand_semester_count'), models.Index(fields=['semester', 'subject', 'weekday', 'hour'], name='demand_semester_subject')],
+                'constraints': [models.UniqueConstraint(fields=('semester', 'subject_key', 'weekday', 'hour', 'delivery_mode'), name='unique_demand_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0007_sessiondemand'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('representative', models.TextField(help_text='First report of the cluster', max_length=150)),
+                ('signature', models.JSONField(help_text='MinHash signature of the representative')),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('resolved', 'Resolved')], default='open', max_length=20)),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('urgent', 'Urgent')], default='medium', max_length=10)),
+                ('window_start', models.DateTimeField(default=django.utils.timezone.now)),
+                ('window_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_report_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-last_report_at'],
+                'indexes': [models.Index(fields=['status', '-last_report_at'], name='feedback_re_status_328899_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='technicalreport',
+            name='cluster',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reports', to='feedback.reportcluster'),
+        ),
+        migrations.CreateModel(
+            name='ReportClusterBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True)),
+                ('cluster', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='feedback.reportcluster')),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:14
+
+from django.db import migrations, models
+
+
+def backfill_demand_keys(apps, schema_editor):
+    """Store the bucket key existing requests are counted in (matched against the current subjects)"""
+    from feedback.demand import build_index, match_subject
+    SessionRequest = apps.get_model('feedback', 'SessionRequest')
+    Subject = apps.get_model('tutoring_sessions', 'Subject')
+    index = build_index(Subject.objects.values_list('id', 'code', 'name'))
+    batch = []
+    for request_id, subject in SessionRequest.objects.values_list('id', 'subject').iterator(chunk_size=2000):
+        batch.append(SessionRequest(id=request_id, demand_key=match_subject(subject, index)[0]))
+        if len(batch) >= 500:
+            SessionRequest.objects.bulk_update(batch, ['demand_key'])
+            batch = []
+    SessionRequest.objects.bulk_update(batch, ['demand_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0008_reportcluster_technicalreport_cluster_and_more'),
+        ('tutoring_sessions', '0005_sessionrecommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessionrequest',
+            name='demand_key',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.RunPython(backfill_demand_keys, migrations.RunPython.noop),
+    ]
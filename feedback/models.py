@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from tutoring_sessions.models import Enrollment
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
@@ -30,6 +31,8 @@ class SessionRequest(models.Model):
     date = models.DateField()
     start_time = models.TimeField()
     end_time = models.TimeField()
+    # Demand bucket the request is counted in (set on save, see feedback/demand.py)
+    demand_key = models.CharField(max_length=200, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -95,6 +98,15 @@ class TechnicalReport(models.Model):
         help_text="Internal notes from admin/support team"
     )
     
+    # Group of near-identical reports (feedback/triage.py)
+    cluster = models.ForeignKey(
+        'ReportCluster',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reports'
+    )
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Technical Report'
@@ -118,6 +130,45 @@ class TechnicalReport(models.Model):
         self.resolved_at = timezone.now()
         self.save()
 
+class ReportCluster(models.Model):
+    """
+    Near-identical technical reports (same outage) grouped by MinHash similarity.
+    `window_*` count the reports of the current growth window used to raise priority.
+    """
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('resolved', 'Resolved'),
+    ]
+    
+    representative = models.TextField(max_length=150, help_text="First report of the cluster")
+    signature = models.JSONField(help_text="MinHash signature of the representative")
+    size = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    priority = models.CharField(max_length=10, choices=TechnicalReport.PRIORITY_CHOICES, default='medium')
+    window_start = models.DateTimeField(default=timezone.now)
+    window_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_report_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-last_report_at']
+        indexes = [
+            models.Index(fields=['status', '-last_report_at']),
+        ]
+    
+    def __str__(self):
+        return f"Cluster #{self.id} ({self.size}) - {self.representative[:40]}"
+
+
+class ReportClusterBand(models.Model):
+    """LSH bucket: one row per band of a cluster signature; clusters sharing a key are candidates"""
+    key = models.BigIntegerField(db_index=True)
+    cluster = models.ForeignKey(ReportCluster, on_delete=models.CASCADE, related_name='bands')
+    
+    def __str__(self):
+        return f"{self.key} -> {self.cluster_id}"
+
+
 # tutoring_sessions/models.py hoặc feedback/models.py
 
 class StudentProgress(models.Model):
@@ -143,4 +194,161 @@ class StudentProgress(models.Model):
         unique_together = ('student', 'session')
     
     def __str__(self):
-        return f"{self.student.full_name} - {self.session.class_code}"
\ No newline at end of file
+        return f"{self.student.full_name} - {self.session.class_code}"
+
+class RatingRollup(models.Model):
+    """Running count, sum and per-star histogram of feedback ratings"""
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        abstract = True
+    
+    @property
+    def average(self):
+        return self.total / self.count if self.count else 0
+    
+    @property
+    def distribution(self):
+        """{5: n, 4: n, ..., 1: n} like the feedback page shows it"""
+        return {stars: getattr(self, f'stars_{stars}') for stars in range(5, 0, -1)}
+
+
+class SessionRatingSummary(RatingRollup):
+    """Ratings of one session, maintained by feedback/rollups.py on every Feedback change"""
+    session = models.OneToOneField(
+        'tutoring_sessions.Session', on_delete=models.CASCADE,
+        primary_key=True, related_name='rating_summary'
+    )
+    tutor = models.ForeignKey('tutors.Tutor', on_delete=models.CASCADE, related_name='session_rating_summaries')
+    
+    def __str__(self):
+        return f"{self.session.class_code}: {self.average:.2f} ({self.count})"
+
+
+class TutorRatingSummary(RatingRollup):
+    """Ratings of all sessions of a tutor (sum of their SessionRatingSummary rows)"""
+    tutor = models.OneToOneField(
+        'tutors.Tutor', on_delete=models.CASCADE,
+        primary_key=True, related_name='rating_summary'
+    )
+    
+    def __str__(self):
+        return f"{self.tutor.full_name}: {self.average:.2f} ({self.count})"
+
+
+class TutorLeaderboardEntry(models.Model):
+    """
+    Bayesian-smoothed rating of a tutor, per subject and overall (subject=None).
+    Maintained by feedback/leaderboard.py on every Feedback change.
+    """
+    tutor = models.ForeignKey('tutors.Tutor', on_delete=models.CASCADE, related_name='leaderboard_entries')
+    subject = models.ForeignKey(
+        'tutoring_sessions.Subject', on_delete=models.CASCADE,
+        null=True, blank=True, related_name='leaderboard_entries'
+    )
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    score = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-score']
+        verbose_name_plural = 'Tutor leaderboard entries'
+        constraints = [
+            models.UniqueConstraint(fields=['tutor', 'subject'], name='unique_leaderboard_tutor_subject'),
+            models.UniqueConstraint(
+                fields=['tutor'], condition=models.Q(subject__isnull=True), name='unique_leaderboard_tutor_overall'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['subject', '-score'], name='leaderboard_subject_score'),
+        ]
+    
+    @property
+    def average(self):
+        return self.total / self.count if self.count else 0
+    
+    def __str__(self):
+        return f"{self.tutor.full_name} ({self.subject or 'overall'}): {self.score:.2f}"
+
+
+class FeedbackThemes(models.Model):
+    """
+    Keywords and sentiment of the feedback comments of a session or of a tutor.
+    Computed offline by `python manage.py analyze_feedback` (feedback/text_analytics.py).
+    """
+    SCOPE_CHOICES = [
+        ('session', 'Session'),
+        ('tutor', 'Tutor'),
+    ]
+    
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    session = models.ForeignKey(
+        'tutoring_sessions.Session', on_delete=models.CASCADE,
+        null=True, blank=True, related_name='feedback_themes'
+    )
+    tutor = models.ForeignKey('tutors.Tutor', on_delete=models.CASCADE, related_name='feedback_themes')
+    comment_count = models.PositiveIntegerField(default=0)
+    # [{"term": "dễ hiểu", "count": 12, "weight": 20.4}, ...] best first
+    keywords = models.JSONField(default=list)
+    # Mean lexicon score of the comments, from -1 (negative) to 1 (positive)
+    sentiment = models.FloatField(default=0)
+    positive = models.PositiveIntegerField(default=0)
+    neutral = models.PositiveIntegerField(default=0)
+    negative = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'Feedback themes'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['session'], condition=models.Q(scope='session'), name='unique_themes_session'
+            ),
+            models.UniqueConstraint(
+                fields=['tutor'], condition=models.Q(scope='tutor'), name='unique_themes_tutor'
+            ),
+        ]
+    
+    def __str__(self):
+        target = self.session.class_code if self.scope == 'session' else self.tutor.full_name
+        return f"Themes of {target} ({self.comment_count} comments)"
+
+
+class SessionDemand(models.Model):
+    """
+    Number of SessionRequests covering one hour of the week, per subject, delivery
+    mode and semester. Maintained by feedback/demand.py as requests arrive.
+    """
+    semester = models.CharField(max_length=10)  # e.g. "2025-1"
+    # Normalized subject text; subject is set when it matches a Subject
+    subject_key = models.CharField(max_length=200)
+    subject = models.ForeignKey(
+        'tutoring_sessions.Subject', on_delete=models.SET_NULL,
+        null=True, blank=True, related_name='demand'
+    )
+    weekday = models.PositiveSmallIntegerField()  # 0 = Monday
+    hour = models.PositiveSmallIntegerField()
+    delivery_mode = models.CharField(max_length=10, choices=SessionRequest.DELIVERY_MODE_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['semester', 'subject_key', 'weekday', 'hour', 'delivery_mode'],
+                name='unique_demand_bucket'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['semester', '-count'], name='demand_semester_count'),
+            models.Index(fields=['semester', 'subject', 'weekday', 'hour'], name='demand_semester_subject'),
+        ]
+    
+    def __str__(self):
+        return f"{self.semester} {self.subject_key} {self.weekday}@{self.hour}h {self.delivery_mode}: {self.count}"
@@ -0,0 +1,97 @@
+"""
+Incrementally maintained rating rollups.
+
+Every Feedback insert or delete adds or removes one rating from the
+SessionRatingSummary of its session and from the TutorRatingSummary of the
+session's tutor, inside the transaction of the change (see signals.py). The
+feedback page and tutor listings then read one row instead of aggregating
+Feedback. `rebuild()` recomputes the rollups from scratch (backfill, edited
+ratings); tutor rows are derived from the session rows.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Feedback, SessionRatingSummary, TutorRatingSummary
+
+
+STARS = range(1, 6)
+
+
+def _apply(model, lookup, rating, sign, defaults=None):
+    changes = {
+        'count': F('count') + sign,
+        'total': F('total') + sign * rating,
+        f'stars_{rating}': F(f'stars_{rating}') + sign,
+    }
+    if model.objects.filter(**lookup).update(**changes) or sign < 0:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **(defaults or {}), count=1, total=rating, **{f'stars_{rating}': 1})
+    except IntegrityError:
+        # Created concurrently by another request
+        model.objects.filter(**lookup).update(**changes)
+
+
+def _change(session_id, tutor_id, rating, sign):
+    rating = int(rating)
+    _apply(SessionRatingSummary, {'session_id': session_id}, rating, sign, {'tutor_id': tutor_id})
+    _apply(TutorRatingSummary, {'tutor_id': tutor_id}, rating, sign)
+
+
+def feedback_added(session_id, tutor_id, rating):
+    _change(session_id, tutor_id, rating, 1)
+
+
+def feedback_removed(session_id, tutor_id, rating):
+    _change(session_id, tutor_id, rating, -1)
+
+
+def rebuild(session_ids=None):
+    """
+    Recompute the rollups of the given sessions (all of them by default) and
+    of their tutors. Returns the number of session rows written.
+    """
+    feedbacks = Feedback.objects.all()
+    sessions = SessionRatingSummary.objects.all()
+    if session_ids is not None:
+        session_ids = list(session_ids)
+        feedbacks = feedbacks.filter(enrollment__session_id__in=session_ids)
+        sessions = sessions.filter(session_id__in=session_ids)
+
+    rows = feedbacks.values('enrollment__session_id', 'enrollment__session__tutor_id').annotate(
+        count=Count('id'), total=Sum('rating'), **{
+            f'stars_{stars}': Count('id', filter=Q(rating=stars)) for stars in STARS
+        }
+    ).order_by()
+
+    with transaction.atomic():
+        tutor_ids = set(sessions.values_list('tutor_id', flat=True))
+        sessions.delete()
+        summaries = SessionRatingSummary.objects.bulk_create([
+            SessionRatingSummary(
+                session_id=row.pop('enrollment__session_id'),
+                tutor_id=row.pop('enrollment__session__tutor_id'),
+                **row
+            )
+            for row in rows
+        ])
+        tutor_ids.update(summary.tutor_id for summary in summaries)
+        rebuild_tutors(tutor_ids if session_ids is not None else None)
+    return len(summaries)
+
+
+def rebuild_tutors(tutor_ids=None):
+    """Derive TutorRatingSummary rows from the session rollups"""
+    sessions = SessionRatingSummary.objects.all()
+    tutors = TutorRatingSummary.objects.all()
+    if tutor_ids is not None:
+        sessions = sessions.filter(tutor_id__in=tutor_ids)
+        tutors = tutors.filter(tutor_id__in=tutor_ids)
+    rows = sessions.values('tutor_id').annotate(
+        count=Sum('count'), total=Sum('total'),
+        **{f'stars_{stars}': Sum(f'stars_{stars}') for stars in STARS}
+    ).order_by()
+    with transaction.atomic():
+        tutors.delete()
+        TutorRatingSummary.objects.bulk_create([TutorRatingSummary(**row) for row in rows])
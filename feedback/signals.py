@@ -0,0 +1,65 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from tutoring_sessions.models import Subject
+
+from . import demand, leaderboard, rollups, triage
+from .models import Feedback, SessionRequest, TechnicalReport
+
+
+@receiver(post_save, sender=Feedback)
+def feedback_saved(sender, instance, created, **kwargs):
+    """New ratings are added to the rollups and leaderboard; an edited rating rebuilds them"""
+    session = instance.enrollment.session
+    if created:
+        rollups.feedback_added(session.id, session.tutor_id, instance.rating)
+        leaderboard.feedback_added(session.tutor_id, session.subject_id, instance.rating)
+    else:
+        rollups.rebuild([session.id])
+        leaderboard.rebuild([session.tutor_id])
+
+
+@receiver(post_delete, sender=Feedback)
+def feedback_deleted(sender, instance, **kwargs):
+    session = instance.enrollment.session
+    rollups.feedback_removed(session.id, session.tutor_id, instance.rating)
+    leaderboard.feedback_removed(session.tutor_id, session.subject_id, instance.rating)
+
+
+@receiver(pre_save, sender=SessionRequest)
+def session_request_changing(sender, instance, **kwargs):
+    """Match the subject and remember the stored fields of an edited request to move its demand buckets"""
+    instance._demand_previous = None
+    if instance.pk:
+        previous = SessionRequest.objects.filter(pk=instance.pk).first()
+        instance._demand_previous = demand.snapshot(previous) if previous else None
+    instance.demand_key = demand.match_subject(instance.subject)[0]
+
+
+@receiver(post_save, sender=SessionRequest)
+def session_request_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_demand_previous', None)
+    current = demand.snapshot(instance)
+    if previous == current:
+        return
+    if previous is not None:
+        demand.request_removed(previous)
+    demand.request_added(current)
+
+
+@receiver(post_delete, sender=SessionRequest)
+def session_request_deleted(sender, instance, **kwargs):
+    demand.request_removed(demand.snapshot(instance))
+
+
+@receiver([post_save, post_delete], sender=Subject)
+def subject_changed(sender, **kwargs):
+    """Requests are matched against a cached subject index"""
+    demand.forget_subjects()
+
+
+@receiver(post_save, sender=TechnicalReport)
+def technical_report_saved(sender, instance, created, **kwargs):
+    """New reports join their near-duplicate cluster"""
+    if created:
+        triage.assign(instance)
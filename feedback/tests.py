@@ -1,3 +1,609 @@
+import csv
+import os
+import tempfile
+import zipfile
+from datetime import date, time
+from io import BytesIO, StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from students.models import Student
+from tutoring_sessions.models import Enrollment, Session, Subject
+from tutors.models import Tutor, TutorAvailability
+
+from . import demand, exports, leaderboard, rollups, text_analytics, triage
+from .models import Feedback, FeedbackThemes, ReportCluster, SessionDemand, SessionRatingSummary, SessionRequest, StudentProgress, TechnicalReport, TutorLeaderboardEntry, TutorRatingSummary
+
+
+class RatingRollupTests(TestCase):
+    """Session and tutor rating rollups maintained on every Feedback change"""
+
+    def setUp(self):
+        self.tutor_user = User.objects.create_user(username='tutor1', password='tutorpass123')
+        self.tutor = Tutor.objects.create(user=self.tutor_user, full_name='Test Tutor', tutor_id='TU001')
+        subject = Subject.objects.create(name='Mathematics', code='MATH101')
+        self.sessions = [
+            Session.objects.create(
+                class_code=f'MATH101-{code}', subject=subject, tutor=self.tutor,
+                days='0-2', start_time=time(9, 0), end_time=time(11, 0), status='completed'
+            )
+            for code in 'AB'
+        ]
+        self.students = []
+        for i in range(4):
+            user = User.objects.create_user(username=f'student{i}', password='testpass123')
+            self.students.append(Student.objects.create(user=user, full_name=f'Student {i}', student_id=f'ST00{i}'))
+
+    def rate(self, session, student, rating, comment=''):
+        enrollment = Enrollment.objects.create(student=student, session=session)
+        return Feedback.objects.create(enrollment=enrollment, rating=rating, comment=comment)
+
+    def test_feedback_updates_session_and_tutor_rollups(self):
+        self.rate(self.sessions[0], self.students[0], 5)
+        self.rate(self.sessions[0], self.students[1], 4)
+        self.rate(self.sessions[1], self.students[2], 2)
+
+        summary = SessionRatingSummary.objects.get(session=self.sessions[0])
+        self.assertEqual((summary.count, summary.total, summary.average), (2, 9, 4.5))
+        self.assertEqual(summary.distribution, {5: 1, 4: 1, 3: 0, 2: 0, 1: 0})
+
+        tutor_summary = TutorRatingSummary.objects.get(tutor=self.tutor)
+        self.assertEqual((tutor_summary.count, tutor_summary.total, tutor_summary.stars_2), (3, 11, 1))
+
+    def test_delete_and_edit_keep_rollups_exact(self):
+        feedback = self.rate(self.sessions[0], self.students[0], 5)
+        self.rate(self.sessions[0], self.students[1], 3)
+
+        feedback.rating = 1
+        feedback.save()
+        summary = SessionRatingSummary.objects.get(session=self.sessions[0])
+        self.assertEqual((summary.count, summary.total, summary.stars_5, summary.stars_1), (2, 4, 0, 1))
+
+        feedback.delete()
+        summary.refresh_from_db()
+        self.assertEqual((summary.count, summary.total, summary.stars_1), (1, 3, 0))
+        self.assertEqual(TutorRatingSummary.objects.get(tutor=self.tutor).count, 1)
+
+    def test_rebuild_matches_incremental(self):
+        for i, rating in enumerate([5, 4, 4, 1]):
+            self.rate(self.sessions[i % 2], self.students[i], rating)
+        expected = list(SessionRatingSummary.objects.order_by('pk').values('count', 'total', 'stars_4'))
+
+        SessionRatingSummary.objects.all().delete()
+        TutorRatingSummary.objects.all().delete()
+        self.assertEqual(rollups.rebuild(), 2)
+
+        self.assertEqual(list(SessionRatingSummary.objects.order_by('pk').values('count', 'total', 'stars_4')), expected)
+        self.assertEqual(TutorRatingSummary.objects.get(tutor=self.tutor).total, 14)
+
+    def test_view_feedback_query_count_is_constant(self):
+        for i, rating in enumerate([5, 4, 3]):
+            self.rate(self.sessions[0], self.students[i], rating, comment='Good' if i else '')
+        Enrollment.objects.create(student=self.students[3], session=self.sessions[0])
+        self.client.login(username='tutor1', password='tutorpass123')
+        url = reverse('feedback:view_feedback', args=[self.sessions[0].id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        stats = response.context['stats']
+        self.assertEqual((stats['total_feedbacks'], stats['total_students'], stats['average_rating']), (3, 4, 4))
+        self.assertEqual(stats['rating_distribution'][5], 1)
+        self.assertEqual(len(response.context['feedbacks_with_comments']), 2)
+
+        before = self.count_queries(url)
+        for i in range(10):
+            user = User.objects.create_user(username=f'extra{i}')
+            student = Student.objects.create(user=user, full_name=f'Extra {i}', student_id=f'EX{i:03}')
+            self.rate(self.sessions[0], student, 5, comment='Great')
+        # One rollup row plus one list query, whatever the number of feedbacks
+        self.assertEqual(self.count_queries(url), before)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return len(queries)
+
+
+class TutorLeaderboardTests(TestCase):
+    """Bayesian tutor leaderboard, per subject and overall"""
+
+    def setUp(self):
+        self.math = Subject.objects.create(name='Mathematics', code='MATH101')
+        self.physics = Subject.objects.create(name='Physics', code='PHYS101')
+        self.tutors = []
+        for i in range(2):
+            user = User.objects.create_user(username=f'tutor{i}', password='tutorpass123')
+            self.tutors.append(Tutor.objects.create(user=user, full_name=f'Tutor {i}', tutor_id=f'TU00{i}'))
+        self.student_count = 0
+
+    def session(self, tutor, subject, status='completed'):
+        return Session.objects.create(
+            class_code=f'{subject.code}-{Session.objects.count()}', subject=subject, tutor=tutor,
+            days='0', start_time=time(9, 0), end_time=time(11, 0), status=status
+        )
+
+    def rate(self, session, *ratings):
+        for rating in ratings:
+            self.student_count += 1
+            user = User.objects.create_user(username=f'student{self.student_count}', password='testpass123')
+            student = Student.objects.create(user=user, full_name=f'Student {self.student_count}', student_id=f'ST{self.student_count:04}')
+            Feedback.objects.create(enrollment=Enrollment.objects.create(student=student, session=session), rating=rating)
+        return student
+
+    def test_few_ratings_are_pulled_towards_the_mean(self):
+        self.rate(self.session(self.tutors[1], self.physics), *[3] * 20)
+        self.rate(self.session(self.tutors[1], self.math), *[5] * 18 + [4] * 2)
+        self.rate(self.session(self.tutors[0], self.math), 5)
+
+        board = list(leaderboard.top(self.math))
+        self.assertEqual([entry.tutor for entry in board], [self.tutors[1], self.tutors[0]])
+
+        # Same order once rescored with the final prior mean
+        leaderboard.rebuild()
+        board = list(leaderboard.top(self.math))
+        self.assertEqual([entry.tutor for entry in board], [self.tutors[1], self.tutors[0]])
+        self.assertEqual(board[1].average, 5)
+        self.assertLess(board[1].score, board[0].score)
+
+    def test_incremental_scores_match_rebuild(self):
+        self.rate(self.session(self.tutors[0], self.math), 4, 5)
+        self.rate(self.session(self.tutors[0], self.physics), 2)
+        self.rate(self.session(self.tutors[1], self.physics), 3, 3, 3)
+        leaderboard.rebuild()
+        expected = {
+            (e.tutor_id, e.subject_id): (e.count, e.total, round(e.score, 6))
+            for e in TutorLeaderboardEntry.objects.all()
+        }
+        # One entry per (tutor, subject) plus one overall entry per tutor
+        self.assertEqual(len(expected), 5)
+        self.assertEqual(expected[(self.tutors[0].id, None)][:2], (3, 11))
+
+        mean = leaderboard.prior_mean()
+        entry = TutorLeaderboardEntry.objects.get(tutor=self.tutors[1], subject=self.physics)
+        self.assertAlmostEqual(entry.score, leaderboard.bayesian_score(3, 9, mean))
+
+    def test_delete_removes_empty_entries(self):
+        session = self.session(self.tutors[0], self.math)
+        self.rate(session, 5)
+        Feedback.objects.get().delete()
+        self.assertFalse(TutorLeaderboardEntry.objects.exists())
+
+    def test_find_sessions_shows_subject_rating(self):
+        self.rate(self.session(self.tutors[0], self.math), 5, 4)
+        open_session = self.session(self.tutors[0], self.math, status='scheduled')
+        self.session(self.tutors[1], self.physics, status='scheduled')
+        student = self.rate(self.session(self.tutors[1], self.math), 1)
+        self.client.login(username=student.user.username, password='testpass123')
+
+        response = self.client.get(reverse('tutoring_sessions:available_sessions'))
+        sessions = {s.id: s for s in response.context['sessions']}
+        entry = TutorLeaderboardEntry.objects.get(tutor=self.tutors[0], subject=self.math)
+        self.assertEqual(sessions[open_session.id].tutor_score, entry.score)
+        self.assertEqual(sessions[open_session.id].tutor_rating_count, 2)
+        self.assertContains(response, '&#9733; {:.1f}'.format(entry.score))
+
+
+class FeedbackTextAnalyticsTests(TestCase):
+    """Offline keyword and sentiment extraction over feedback comments"""
+
+    COMMENTS = [
+        'Thầy giảng rất dễ hiểu, nhiệt tình.',
+        'Giảng dễ hiểu và ví dụ chi tiết',
+        'Bài tập hơi khó hiểu, thầy nói lan man',
+        'Very clear explanations, great examples!',
+        'Not clear at all, boring session',
+        'Lớp học bình thường',
+    ]
+
+    def setUp(self):
+        user = User.objects.create_user(username='tutor1', password='tutorpass123')
+        self.tutor = Tutor.objects.create(user=user, full_name='Test Tutor', tutor_id='TU001')
+        subject = Subject.objects.create(name='Mathematics', code='MATH101')
+        self.session = Session.objects.create(
+            class_code='MATH101-A', subject=subject, tutor=self.tutor,
+            days='0', start_time=time(9, 0), end_time=time(11, 0), status='completed'
+        )
+        for i, comment in enumerate(self.COMMENTS + ['']):
+            student_user = User.objects.create_user(username=f'student{i}')
+            student = Student.objects.create(user=student_user, full_name=f'Student {i}', student_id=f'ST{i:03}')
+            enrollment = Enrollment.objects.create(student=student, session=self.session)
+            Feedback.objects.create(enrollment=enrollment, rating=4, comment=comment)
+
+    def test_tokenizer_and_sentiment(self):
+        tokens = text_analytics.tokenize('Thầy giảng DỄ HIỂU!')
+        self.assertEqual(tokens, ['thầy', 'giảng', 'dễ', 'hiểu'])
+        self.assertIn('dễ hiểu', text_analytics.terms(tokens))
+        self.assertNotIn('thầy', text_analytics.terms(tokens))
+
+        self.assertEqual(text_analytics.sentiment(text_analytics.tokenize('rất dễ hiểu')), 1)
+        self.assertEqual(text_analytics.sentiment(text_analytics.tokenize('không dễ hiểu')), -1)
+        self.assertEqual(text_analytics.sentiment(text_analytics.tokenize('not very clear')), -1)
+        self.assertEqual(text_analytics.sentiment(text_analytics.tokenize('bình thường')), 0)
+
+    def test_chunked_result_matches_single_chunk(self):
+        single = text_analytics.merge_chunks([text_analytics.analyze_chunk(self.COMMENTS)])
+        chunked = text_analytics.merge_chunks([
+            text_analytics.analyze_chunk(self.COMMENTS[:2]),
+            text_analytics.analyze_chunk(self.COMMENTS[2:]),
+        ])
+        self.assertEqual(single[0], chunked[0])
+        for expected, actual in zip(single[1:], chunked[1:]):
+            self.assertTrue((expected == actual).all())
+
+    def test_analyze_feedback_stores_themes(self):
+        stats = text_analytics.analyze_feedback(workers=1, chunk_size=4)
+        self.assertEqual((stats['comments'], stats['sessions'], stats['tutors']), (6, 1, 1))
+
+        themes = FeedbackThemes.objects.get(scope='session', session=self.session)
+        self.assertEqual(themes.comment_count, 6)
+        self.assertEqual(themes.keywords[0]['term'], 'dễ hiểu')
+        self.assertEqual(themes.keywords[0]['count'], 2)
+        self.assertEqual((themes.positive, themes.neutral, themes.negative), (3, 1, 2))
+        self.assertEqual(FeedbackThemes.objects.get(scope='tutor').tutor, self.tutor)
+
+        # Re-running replaces the previous results
+        call_command('analyze_feedback', '--workers', '1', stdout=StringIO())
+        self.assertEqual(FeedbackThemes.objects.count(), 2)
+
+    def test_view_feedback_shows_themes(self):
+        text_analytics.analyze_feedback(workers=1)
+        self.client.login(username='tutor1', password='tutorpass123')
+        response = self.client.get(reverse('feedback:view_feedback', args=[self.session.id]))
+        self.assertContains(response, 'Common Themes')
+        self.assertContains(response, 'dễ hiểu')
+
+
+class SessionDemandTests(TestCase):
+    """Demand heatmap maintained from SessionRequests and section suggestions"""
+
+    def setUp(self):
+        cache.clear()
+        self.calculus = Subject.objects.create(name='Giải Tích 1', code='MT1003')
+        user = User.objects.create_user(username='student1', password='testpass123')
+        self.student = Student.objects.create(user=user, full_name='Student 1', student_id='ST001')
+        tutor_user = User.objects.create_user(username='tutor1', password='tutorpass123')
+        self.tutor = Tutor.objects.create(user=tutor_user, full_name='Test Tutor', tutor_id='TU001')
+        self.tutor.expertise.add(self.calculus)
+        self.monday = date(2026, 10, 19)
+
+    def request(self, subject='giai tich 1', start=time(9, 30), end=time(11, 0), mode='online', day=None):
+        return SessionRequest.objects.create(
+            student=self.student, subject=subject, delivery_mode=mode,
+            date=day or self.monday, start_time=start, end_time=end
+        )
+
+    def cells(self):
+        return sorted(SessionDemand.objects.values_list('subject_key', 'weekday', 'hour', 'count'))
+
+    def test_subject_matching(self):
+        self.assertEqual(demand.normalize('Giải Tích 1 (Đại cương)'), 'giai tich 1 dai cuong')
+        key = f'subject:{self.calculus.id}'
+        self.assertEqual(demand.match_subject('GIẢI TÍCH 1'), (key, self.calculus.id))
+        self.assertEqual(demand.match_subject('mt 1003'), (key, self.calculus.id))
+        self.assertEqual(demand.match_subject('Ôn thi giải tích 1 cuối kỳ'), (key, self.calculus.id))
+        self.assertEqual(demand.match_subject('Vật lý'), ('vat ly', None))
+
+    def test_semester_of(self):
+        self.assertEqual(demand.semester_of(date(2026, 10, 19)), '2026-1')
+        self.assertEqual(demand.semester_of(date(2027, 1, 5)), '2026-1')
+        self.assertEqual(demand.semester_of(date(2027, 3, 1)), '2026-2')
+        self.assertEqual(demand.semester_of(date(2027, 7, 1)), '2026-3')
+
+    def test_buckets_follow_insert_edit_and_delete(self):
+        key = f'subject:{self.calculus.id}'
+        first = self.request()
+        self.request('MT1003', start=time(10, 0), end=time(11, 0))
+        self.assertEqual(self.cells(), [(key, 0, 9, 1), (key, 0, 10, 2)])
+
+        first.start_time = time(14, 0)
+        first.end_time = time(15, 0)
+        first.save()
+        self.assertEqual(self.cells(), [(key, 0, 10, 1), (key, 0, 14, 1)])
+
+        first.delete()
+        self.assertEqual(self.cells(), [(key, 0, 10, 1)])
+
+        expected = self.cells()
+        self.assertEqual(demand.rebuild(), 1)
+        self.assertEqual(self.cells(), expected)
+
+    def test_removal_uses_the_bucket_counted_at_save(self):
+        request = self.request()
+        self.assertEqual(request.demand_key, f'subject:{self.calculus.id}')
+        # Renamed after the request was counted: the old text no longer matches
+        self.calculus.name, self.calculus.code = 'Toán cao cấp', 'MT9999'
+        self.calculus.save()
+        request.delete()
+        self.assertEqual(self.cells(), [])
+
+        request = self.request('Vật lý 1')
+        Subject.objects.create(name='Vật Lý 1', code='PH1003')
+        request = SessionRequest.objects.get(pk=request.pk)
+        request.delivery_mode = 'offline'
+        request.save()
+        # The edit rematches the subject and moves the request out of its text bucket
+        self.assertEqual(SessionDemand.objects.filter(subject_key='vat ly 1').count(), 0)
+        self.assertEqual(SessionDemand.objects.filter(subject__code='PH1003').count(), 2)
+
+        SessionDemand.objects.all().delete()
+        with self.assertLogs('feedback.demand', 'WARNING'):
+            request.delete()
+
+    def test_rebuild_rematches_stored_keys(self):
+        request = self.request('Vật lý 1')
+        physics = Subject.objects.create(name='Vật Lý 1', code='PH1003')
+        demand.rebuild()
+        request.refresh_from_db()
+        self.assertEqual(request.demand_key, f'subject:{physics.id}')
+        request.delete()
+        self.assertEqual(self.cells(), [])
+
+    def test_suggestions_compare_demand_with_sections_and_tutors(self):
+        for _ in range(4):
+            self.request(start=time(9, 0), end=time(10, 0))
+        TutorAvailability.objects.create(tutor=self.tutor, weekday=0, start_time=time(8, 0), end_time=time(10, 0))
+
+        [suggestion] = demand.suggestions('2026-1')
+        self.assertEqual((suggestion['weekday'], suggestion['hour'], suggestion['unmet']), (0, 9, 4))
+        self.assertEqual(suggestion['tutor_ids'], [self.tutor.id])
+
+        Session.objects.create(
+            class_code='MT1003-L01', subject=self.calculus, tutor=self.tutor,
+            days='0', start_time=time(9, 0), end_time=time(11, 0)
+        )
+        self.assertEqual(demand.suggestions('2026-1'), [])
+
+    def test_heatmap_endpoint_is_office_only(self):
+        self.request()
+        url = reverse('feedback:demand_heatmap')
+        self.client.login(username='student1', password='testpass123')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        office = User.objects.create_user(username='office01', password='officepass123')
+        UserProfile.objects.create(user=office, role='office')
+        self.client.login(username='office01', password='officepass123')
+        response = self.client.get(url, {'semester': '2026-1', 'delivery_mode': 'online'})
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['semesters'], ['2026-1'])
+        self.assertEqual([(c['subject'], c['hour'], c['count']) for c in data['cells']], [('Giải Tích 1', 9, 1), ('Giải Tích 1', 10, 1)])
+        self.assertEqual(self.client.get(url, {'delivery_mode': 'carrier pigeon'}).status_code, 400)
+
+
+class ReportTriageTests(TestCase):
+    """Near-duplicate clustering of technical reports"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reporter', password='testpass123')
+
+    def report(self, text, priority='medium'):
+        return TechnicalReport.objects.create(user=self.user, problem_description=text, priority=priority)
+
+    def test_near_duplicates_share_a_cluster(self):
+        first = self.report('Cannot log in with CAS, page shows error 500')
+        second = self.report('cannot login with CAS - page shows error 500!')
+        other = self.report('Video in the online session room keeps freezing')
+        first.refresh_from_db()
+        second.refresh_from_db()
+        other.refresh_from_db()
+
+        self.assertIsNotNone(first.cluster_id)
+        self.assertEqual(first.cluster_id, second.cluster_id)
+        self.assertNotEqual(first.cluster_id, other.cluster_id)
+        self.assertEqual(first.cluster.size, 2)
+        self.assertEqual(first.cluster.representative, first.problem_description)
+
+    def test_signature_similarity(self):
+        text = 'Không tải được tài liệu trong thư viện'
+        self.assertEqual(triage.similarity(triage.signature(text), triage.signature(text)), 1.0)
+        self.assertLess(
+            triage.similarity(triage.signature(text), triage.signature('Đồng hồ đếm ngược bị sai giờ')), 0.2
+        )
+
+    def test_surge_raises_priority_of_pending_reports(self):
+        reports = [self.report(f'Cannot log in with CAS, error 500 (#{i})', priority='low') for i in range(triage.SURGE_HIGH)]
+        cluster = ReportCluster.objects.get()
+        self.assertEqual(cluster.size, triage.SURGE_HIGH)
+        self.assertEqual(cluster.priority, 'high')
+        self.assertEqual(set(TechnicalReport.objects.values_list('priority', flat=True)), {'high'})
+
+        for i in range(triage.SURGE_URGENT - triage.SURGE_HIGH):
+            self.report(f'Cannot log in with CAS, error 500 (again {i})')
+        self.assertEqual(ReportCluster.objects.get().priority, 'urgent')
+        reports[0].refresh_from_db()
+        self.assertEqual(reports[0].priority, 'urgent')
+
+    def test_slow_trickle_does_not_surge(self):
+        start = timezone.now()
+        report = self.report('Notification emails arrive twice', priority='low')
+        for i in range(triage.SURGE_HIGH):
+            later = self.report('Notification emails arrive twice')
+            TechnicalReport.objects.filter(pk=later.pk).update(cluster=None)
+            triage.assign(later, now=start + triage.SURGE_WINDOW * (i + 2))
+        report.refresh_from_db()
+        self.assertEqual(report.priority, 'low')
+
+    def test_resolve_whole_cluster(self):
+        for i in range(3):
+            self.report(f'Room booking page does not load ({i})')
+        unrelated = self.report('Wrong timezone on the calendar export')
+        cluster = ReportCluster.objects.get(size=3)
+
+        self.assertEqual(triage.resolve_clusters([cluster]), 3)
+        self.assertEqual(TechnicalReport.objects.filter(status='resolved').count(), 3)
+        unrelated.refresh_from_db()
+        self.assertEqual(unrelated.status, 'pending')
+        cluster.refresh_from_db()
+        self.assertEqual(cluster.status, 'resolved')
+
+        # The problem comes back: the cluster reopens
+        self.report('Room booking page does not load (again)')
+        cluster.refresh_from_db()
+        self.assertEqual(cluster.status, 'open')
+
+    def test_assign_returns_the_stored_size(self):
+        self.report('Exam countdown shows the wrong time')
+        report = self.report('Exam countdown shows the wrong time!')
+        TechnicalReport.objects.filter(pk=report.pk).update(cluster=None)
+        cluster = triage.assign(report)
+        self.assertEqual(cluster.size, ReportCluster.objects.get(pk=cluster.pk).size)
+
+    def test_rebuild_keeps_priority_of_closed_reports(self):
+        for i in range(triage.SURGE_HIGH):
+            self.report(f'Cannot log in with CAS, error 500 (#{i})', priority='low')
+        closed = self.report('Cannot log in with CAS, error 500 (late)', priority='low')
+        TechnicalReport.objects.filter(pk=closed.pk).update(status='resolved', priority='low')
+        triage.rebuild()
+        closed.refresh_from_db()
+        self.assertEqual(closed.priority, 'low')
+        self.assertEqual(
+            set(TechnicalReport.objects.filter(status='pending').values_list('priority', flat=True)), {'high'}
+        )
+
+    def test_rebuild_keeps_resolved_clusters_resolved(self):
+        for i in range(triage.SURGE_HIGH):
+            self.report(f'Room booking page does not load ({i})', priority='low')
+        TechnicalReport.objects.update(status='resolved', priority='low')
+        triage.rebuild()
+
+        cluster = ReportCluster.objects.get()
+        self.assertEqual(cluster.size, triage.SURGE_HIGH)
+        self.assertEqual((cluster.status, cluster.priority, cluster.window_count), ('resolved', 'low', 0))
+
+        # A new report of the problem reopens it and starts its own surge window
+        self.report('Room booking page does not load (again)', priority='low')
+        cluster.refresh_from_db()
+        self.assertEqual((cluster.status, cluster.priority, cluster.window_count), ('open', 'low', 1))
+
+    def test_rebuild_command(self):
+        for text in ('Cannot upload avatar image', 'cannot upload avatar image!!', 'Search returns nothing'):
+            self.report(text)
+        ReportCluster.objects.all().delete()
+        out = StringIO()
+        call_command('cluster_reports', stdout=out)
+        self.assertIn('2 clusters', out.getvalue())
+        self.assertFalse(TechnicalReport.objects.filter(cluster__isnull=True).exists())
+
+    def test_assignment_cost_does_not_grow(self):
+        for i in range(20):
+            self.report(f'Distinct problem number {i} about feature {i * 7919}')
+        report = self.report('Distinct problem number 3 about feature 23757')
+        TechnicalReport.objects.filter(pk=report.pk).update(cluster=None)
+        with CaptureQueriesContext(connection) as first:
+            triage.assign(report)
+        for i in range(20, 60):
+            self.report(f'Distinct problem number {i} about feature {i * 7919}')
+        with CaptureQueriesContext(connection) as second:
+            triage.assign(report)
+        self.assertEqual(len(first), len(second))
+
+
+class DataExportTests(TestCase):
+    """Streaming CSV/XLSX exports"""
+
+    def setUp(self):
+        tutor_user = User.objects.create_user(username='tutor1', password='tutorpass123')
+        self.tutor = Tutor.objects.create(user=tutor_user, full_name='Trần Văn Tú', tutor_id='TU001')
+        self.math = Subject.objects.create(name='Giải Tích 1', code='MT1003')
+        physics = Subject.objects.create(name='Vật Lý 1', code='PH1003')
+        self.sessions = [
+            Session.objects.create(
+                class_code=code, subject=subject, tutor=self.tutor,
+                days='0', start_time=time(9, 0), end_time=time(11, 0), status='completed'
+            )
+            for code, subject in (('MT1003-A', self.math), ('PH1003-A', physics))
+        ]
+        for i in range(5):
+            user = User.objects.create_user(username=f'student{i}', password='testpass123')
+            student = Student.objects.create(user=user, full_name=f'Nguyễn Văn {i}', student_id=f'ST00{i}')
+            session = self.sessions[i % 2]
+            enrollment = Enrollment.objects.create(student=student, session=session)
+            Feedback.objects.create(enrollment=enrollment, rating=i + 1, comment=f'Buổi học số {i}, "rất" hay')
+            StudentProgress.objects.create(
+                enrollment=enrollment, student=student, session=session, tutor=self.tutor, attendance=i
+            )
+        office = User.objects.create_user(username='office01', password='officepass123')
+        UserProfile.objects.create(user=office, role='office')
+
+    def read_csv(self, response):
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(content.splitlines()))
+
+    def test_csv_export_with_columns_and_filters(self):
+        self.client.login(username='office01', password='officepass123')
+        url = reverse('feedback:export_data', args=['feedback'])
+        response = self.client.get(url, {'columns': 'session,student,rating,comment', 'subject': self.math.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="feedback-', response['Content-Disposition'])
+
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0], ['session', 'student', 'rating', 'comment'])
+        self.assertEqual(rows[1:], [
+            ['MT1003-A', f'Nguyễn Văn {i}', str(i + 1), f'Buổi học số {i}, "rất" hay'] for i in (0, 2, 4)
+        ])
+
+        rows = self.read_csv(self.client.get(
+            reverse('feedback:export_data', args=['enrollments']), {'is_active': 'true', 'date_to': '2000-01-01'}
+        ))
+        self.assertEqual(len(rows), 1)
+
+    def test_csv_cells_cannot_inject_formulas(self):
+        Feedback.objects.filter(rating=1).update(comment='=HYPERLINK("http://evil.example")')
+        Feedback.objects.filter(rating=2).update(comment='-2+3')
+        out = StringIO()
+        call_command('export_data', 'feedback', '--columns', 'rating,comment', '--filter', 'rating=1', stdout=out)
+        call_command('export_data', 'feedback', '--columns', 'rating,comment', '--filter', 'rating=2', stdout=out)
+        comments = [row[1] for row in csv.reader(out.getvalue().replace('\ufeff', '').splitlines())]
+        self.assertEqual(comments, ['comment', '\'=HYPERLINK("http://evil.example")', 'comment', "'-2+3"])
+
+    def test_invalid_requests(self):
+        url = reverse('feedback:export_data', args=['feedback'])
+        self.client.login(username='student0', password='testpass123')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.login(username='office01', password='officepass123')
+        for params in ({'columns': 'rating,password'}, {'tutor': 'abc'}, {'color': 'red'}, {'format': 'pdf'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertFalse(response.json()['success'])
+        self.assertEqual(self.client.get(reverse('feedback:export_data', args=['users'])).status_code, 400)
+
+    def test_xlsx_export(self):
+        self.client.login(username='office01', password='officepass123')
+        response = self.client.get(
+            reverse('feedback:export_data', args=['progress']), {'format': 'xlsx', 'columns': 'student,attendance'}
+        )
+        self.assertEqual(response['Content-Type'], exports.CONTENT_TYPES['xlsx'])
+        package = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(package.testzip())
+        sheet = package.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 6)
+        self.assertIn('<t xml:space="preserve">Nguyễn Văn 4</t></is></c><c><v>4</v></c>', sheet)
+
+    def test_rows_are_streamed_in_chunks(self):
+        columns, rows = exports.build('feedback', ['id'])
+        chunks = list(exports.stream_csv(columns, rows, flush_every=2))
+        # Header, two full chunks and the remainder
+        self.assertEqual(len(chunks), 4)
+        with CaptureQueriesContext(connection) as queries:
+            list(exports.stream('session_requests', columns=['student', 'subject']))
+        self.assertEqual(len(queries), 1)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_data', 'feedback', '--columns', 'student_id,rating', '--filter', 'rating=5', stdout=out)
+        self.assertEqual(list(csv.reader(out.getvalue().lstrip('\ufeff').splitlines())), [['student_id', 'rating'], ['ST004', '5']])
 
-# Create your tests here.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'enrollments.xlsx')
+            call_command('export_data', 'enrollments', '--format', 'xlsx', '--output', path, stderr=StringIO())
+            self.assertIn('xl/worksheets/sheet1.xml', zipfile.ZipFile(path).namelist())
@@ -0,0 +1,242 @@
+"""
+Batch text analytics over Feedback comments.
+
+`analyze_feedback()` reads every non-empty comment, tokenizes it (Vietnamese
+and English share the same Unicode word tokenizer; Vietnamese meaning mostly
+lives in syllable pairs, so bigrams are extracted next to single words) and
+scores it against a small bilingual sentiment lexicon with negation handling.
+Comments are processed in chunks by a process pool; each chunk returns its
+document-term matrix in sparse coordinate form (document index, term index),
+and the merged matrix is reduced with NumPy to the top keywords (count x IDF,
+bigrams weighted up)
+and the sentiment breakdown of every session and every tutor. Results are
+stored in FeedbackThemes, so pages never process text at request time.
+
+The tokenizing functions have no Django dependency so pool workers stay light.
+"""
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+CHUNK_SIZE = 2000
+TOP_KEYWORDS = 10
+# Comments scoring above / below these thresholds count as positive / negative
+POSITIVE_THRESHOLD = 0.25
+NEGATIVE_THRESHOLD = -0.25
+# Vietnamese words are often two syllables ("dễ hiểu", "nhiệt tình"): a bigram
+# weighs this many single words so syllables do not crowd out the phrases
+BIGRAM_WEIGHT = 2.0
+
+STOPWORDS = frozenset('''
+a an and are as at be been but by for from had has have he her his i if in into is it its me my of on or our
+she so than that the their them then there these they this to too us very was we were what when which who will
+with you your also just really much more most can could would should do does did am
+và của là có cho các những được trong với này một thì mà để khi như cũng đã rất nhưng vì nên từ tôi em mình
+ạ à ơi nhé thầy cô bạn anh chị lại ra vào đến theo về hơn nữa nào đó đây sẽ đang còn thêm lắm quá
+'''.split())
+
+NEGATIONS = frozenset('not no never without không chưa chẳng chả ko k'.split())
+
+# Term -> polarity. Bigrams are matched before single words.
+LEXICON = {
+    # English
+    'good': 1, 'great': 1, 'excellent': 1, 'helpful': 1, 'clear': 1, 'friendly': 1, 'patient': 1,
+    'useful': 1, 'interesting': 1, 'love': 1, 'loved': 1, 'amazing': 1, 'best': 1, 'easy': 1,
+    'enthusiastic': 1, 'recommend': 1, 'thanks': 1, 'thank': 1, 'engaging': 1, 'well explained': 1,
+    'bad': -1, 'boring': -1, 'confusing': -1, 'late': -1, 'unclear': -1, 'difficult': -1, 'hard': -1,
+    'slow': -1, 'poor': -1, 'rude': -1, 'worst': -1, 'waste': -1, 'disorganized': -1, 'too fast': -1,
+    # Vietnamese
+    'dễ hiểu': 1, 'nhiệt tình': 1, 'tận tâm': 1, 'tận tình': 1, 'tuyệt vời': 1, 'hữu ích': 1,
+    'thân thiện': 1, 'rõ ràng': 1, 'chi tiết': 1, 'xuất sắc': 1, 'kiên nhẫn': 1, 'dễ thương': 1,
+    'hay': 1, 'tốt': 1, 'vui': 1, 'thích': 1, 'ổn': 1,
+    'khó hiểu': -1, 'lan man': -1, 'buồn ngủ': -1, 'nhàm chán': -1, 'qua loa': -1, 'quá nhanh': -1,
+    'chán': -1, 'tệ': -1, 'dở': -1, 'trễ': -1, 'muộn': -1, 'khó': -1, 'thiếu': -1,
+}
+
+# A negation flips the next lexicon hit within this many tokens ("không dễ hiểu", "not very clear")
+NEGATION_WINDOW = 3
+
+_TOKEN = re.compile(r'[^\W\d_]+')
+
+
+def tokenize(text):
+    """Lower-case word tokens; NFC so precomposed and combining Vietnamese accents match"""
+    return _TOKEN.findall(unicodedata.normalize('NFC', text).lower())
+
+
+def terms(tokens):
+    """Keyword candidates: content words and bigrams of adjacent content words"""
+    words = [token for token in tokens if token not in STOPWORDS and token not in NEGATIONS and len(token) > 1]
+    bigrams = [
+        f'{first} {second}' for first, second in zip(tokens, tokens[1:])
+        if first not in STOPWORDS and second not in STOPWORDS
+        and first not in NEGATIONS and second not in NEGATIONS
+    ]
+    return words + bigrams
+
+
+def sentiment(tokens):
+    """Mean polarity of the lexicon hits of a comment (0 without any hit)"""
+    score = hits = negate = 0
+    i = 0
+    while i < len(tokens):
+        value = LEXICON.get(f'{tokens[i]} {tokens[i + 1]}') if i + 1 < len(tokens) else None
+        step = 2
+        if value is None:
+            value, step = LEXICON.get(tokens[i]), 1
+        if value is not None:
+            score += -value if negate else value
+            hits += 1
+            negate = 0
+        elif tokens[i] in NEGATIONS:
+            negate = NEGATION_WINDOW
+        else:
+            negate = max(negate - 1, 0)
+        i += step
+    return score / hits if hits else 0.0
+
+
+def analyze_chunk(comments):
+    """
+    Worker: sparse document-term matrix (COO) and sentiment of a list of comments.
+    Returns (vocabulary, document indices, term indices, sentiments).
+    """
+    vocabulary = {}
+    documents, term_ids, scores = [], [], []
+    for i, comment in enumerate(comments):
+        tokens = tokenize(comment)
+        for term in terms(tokens):
+            documents.append(i)
+            term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+        scores.append(sentiment(tokens))
+    return (
+        list(vocabulary),
+        np.array(documents, dtype=np.int64),
+        np.array(term_ids, dtype=np.int64),
+        np.array(scores, dtype=np.float64),
+    )
+
+
+def merge_chunks(parts):
+    """Concatenate chunk results into one COO matrix over a shared vocabulary"""
+    vocabulary = {}
+    documents, term_ids, scores = [], [], []
+    offset = 0
+    for chunk_vocabulary, chunk_documents, chunk_terms, chunk_scores in parts:
+        remap = np.array(
+            [vocabulary.setdefault(term, len(vocabulary)) for term in chunk_vocabulary], dtype=np.int64
+        )
+        documents.append(chunk_documents + offset)
+        term_ids.append(remap[chunk_terms] if len(chunk_terms) else chunk_terms)
+        scores.append(chunk_scores)
+        offset += len(chunk_scores)
+    if not scores:
+        return [], np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+    return list(vocabulary), np.concatenate(documents), np.concatenate(term_ids), np.concatenate(scores)
+
+
+def top_keywords(groups, documents, term_ids, idf, top=TOP_KEYWORDS):
+    """
+    Best terms of every group. `groups` maps each document to a group index.
+    Returns {group index: [(term index, count, weight), ...]} best first.
+    """
+    size = len(idf)
+    keys, counts = np.unique(groups[documents] * size + term_ids, return_counts=True)
+    group_of, term_of = keys // size, keys % size
+    weights = counts * idf[term_of]
+    order = np.lexsort((term_of, -weights, group_of))
+    sorted_groups = group_of[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]) if len(order) else order
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    result = {}
+    for index in order[rank < top]:
+        result.setdefault(int(group_of[index]), []).append(
+            (int(term_of[index]), int(counts[index]), float(weights[index]))
+        )
+    return result
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def analyze_feedback(workers=None, chunk_size=CHUNK_SIZE, top=TOP_KEYWORDS):
+    """
+    Recompute FeedbackThemes for every session and tutor with commented feedback.
+    workers=1 runs in-process; otherwise a process pool of `workers` (default: CPU count).
+    Returns {'comments', 'terms', 'sessions', 'tutors'}.
+    """
+    from django.db import transaction
+    from .models import Feedback, FeedbackThemes
+
+    rows = Feedback.objects.exclude(comment='').values_list(
+        'enrollment__session_id', 'enrollment__session__tutor_id', 'comment'
+    ).order_by('id').iterator(chunk_size=chunk_size)
+
+    session_ids, tutor_ids, comment_chunks = [], [], []
+    for chunk in _chunks(rows, chunk_size):
+        session_ids.extend(row[0] for row in chunk)
+        tutor_ids.extend(row[1] for row in chunk)
+        comment_chunks.append([row[2] for row in chunk])
+
+    if workers == 1 or len(comment_chunks) <= 1:
+        parts = [analyze_chunk(comments) for comments in comment_chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(analyze_chunk, comment_chunks))
+
+    vocabulary, documents, term_ids, scores = merge_chunks(parts)
+    document_count = len(scores)
+
+    # Document frequency from the distinct (document, term) cells of the matrix
+    size = max(len(vocabulary), 1)
+    document_frequency = np.bincount(np.unique(documents * size + term_ids) % size, minlength=len(vocabulary))
+    idf = np.log((1 + document_count) / (1 + document_frequency)) + 1
+    idf *= np.where([' ' in term for term in vocabulary], BIGRAM_WEIGHT, 1.0)
+
+    tutor_of_session = dict(zip(session_ids, tutor_ids))
+    themes = []
+    for scope, owners in (('session', session_ids), ('tutor', tutor_ids)):
+        keys, groups = np.unique(np.array(owners, dtype=np.int64), return_inverse=True)
+        counts = np.bincount(groups, minlength=len(keys))
+        mean_scores = np.bincount(groups, weights=scores, minlength=len(keys)) / np.maximum(counts, 1)
+        positive = np.bincount(groups[scores > POSITIVE_THRESHOLD], minlength=len(keys))
+        negative = np.bincount(groups[scores < NEGATIVE_THRESHOLD], minlength=len(keys))
+        keywords = top_keywords(groups, documents, term_ids, idf, top)
+
+        for index, key in enumerate(keys.tolist()):
+            themes.append(FeedbackThemes(
+                scope=scope,
+                session_id=key if scope == 'session' else None,
+                tutor_id=tutor_of_session[key] if scope == 'session' else key,
+                comment_count=int(counts[index]),
+                keywords=[
+                    {'term': vocabulary[term], 'count': count, 'weight': round(weight, 3)}
+                    for term, count, weight in keywords.get(index, [])
+                ],
+                sentiment=round(float(mean_scores[index]), 3),
+                positive=int(positive[index]),
+                negative=int(negative[index]),
+                neutral=int(counts[index] - positive[index] - negative[index]),
+            ))
+
+    with transaction.atomic():
+        FeedbackThemes.objects.all().delete()
+        FeedbackThemes.objects.bulk_create(themes, batch_size=500)
+
+    return {
+        'comments': document_count,
+        'terms': len(vocabulary),
+        'sessions': sum(theme.scope == 'session' for theme in themes),
+        'tutors': sum(theme.scope == 'tutor' for theme in themes),
+    }
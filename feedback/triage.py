@@ -0,0 +1,188 @@
+"""
+Triage of technical reports: near-duplicate clustering with MinHash/LSH.
+
+Each report is reduced to the set of character shingles of its normalized
+text and summarized by a MinHash signature (NUM_PERM hash functions). The
+signature is split into BANDS bands; every cluster stores one indexed row per
+band. A new report looks up its band keys (one indexed query), compares its
+signature with the few candidate clusters found and joins the most similar one
+above SIMILARITY, or starts a new cluster. The cost per report does not depend
+on how many reports exist.
+
+Clusters that grow fast (SURGE_HIGH / SURGE_URGENT reports within
+SURGE_WINDOW) raise the priority of all their pending reports, so an outage
+rises to the top of the admin list on its own.
+"""
+import hashlib
+import re
+import unicodedata
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ReportCluster, ReportClusterBand, TechnicalReport
+
+
+SHINGLE_SIZE = 4
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Estimated Jaccard similarity needed to join a cluster
+SIMILARITY = 0.5
+
+SURGE_WINDOW = timedelta(minutes=15)
+SURGE_HIGH = 5
+SURGE_URGENT = 10
+PRIORITY_ORDER = ['low', 'medium', 'high', 'urgent']
+OPEN_STATUSES = ['pending', 'in_progress']
+
+# Fixed hash functions h(x) = (a * x + b) mod PRIME: signatures must stay comparable across processes
+# (a and x below 2**31 so a * x + b fits in 64 bits)
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20251)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+_WORD = re.compile(r'\w+')
+
+
+def shingles(text):
+    """Character shingles of the lower-cased words of a text (punctuation dropped)"""
+    text = ' '.join(_WORD.findall(unicodedata.normalize('NFC', text).lower()))
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(text):
+    """MinHash signature (NUM_PERM uint64 values) of a text"""
+    values = np.array([zlib.crc32(s.encode()) for s in shingles(text)], dtype=np.uint64) % _PRIME
+    hashed = (np.outer(_A, values) + _B[:, None]) % _PRIME
+    return hashed.min(axis=1)
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(np.asarray(first, dtype=np.uint64) == np.asarray(second, dtype=np.uint64)))
+
+
+def band_keys(sig):
+    """One signed 64-bit key per band (band number included so equal rows in different bands differ)"""
+    sig = np.asarray(sig, dtype=np.uint64)
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + sig[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).digest(),
+            'big', signed=True
+        )
+        for band in range(BANDS)
+    ]
+
+
+def surge_priority(count):
+    if count >= SURGE_URGENT:
+        return 'urgent'
+    if count >= SURGE_HIGH:
+        return 'high'
+    return None
+
+
+def _raise(current, target):
+    if target and PRIORITY_ORDER.index(target) > PRIORITY_ORDER.index(current or 'medium'):
+        return target
+    return current
+
+
+def find_cluster(sig):
+    """Most similar cluster above SIMILARITY among the LSH candidates, or None"""
+    candidate_ids = set(
+        ReportClusterBand.objects.filter(key__in=band_keys(sig)).values_list('cluster_id', flat=True)
+    )
+    best, best_score = None, SIMILARITY
+    for cluster in ReportCluster.objects.filter(id__in=candidate_ids):
+        score = similarity(sig, cluster.signature)
+        if score >= best_score:
+            best, best_score = cluster, score
+    return best
+
+
+@transaction.atomic
+def assign(report, now=None):
+    """Put a report in its cluster (creating one if needed) and apply surge priorities"""
+    now = now or timezone.now()
+    sig = signature(report.problem_description)
+    cluster = find_cluster(sig)
+
+    # Resolved or closed reports (met again by rebuild()) join their cluster without
+    # reopening it or counting toward its surge window
+    is_open = report.status in OPEN_STATUSES
+    raised = False
+    if cluster is None:
+        cluster = ReportCluster.objects.create(
+            representative=report.problem_description,
+            signature=[int(value) for value in sig],
+            size=1,
+            status='open' if is_open else 'resolved',
+            priority=report.priority or 'medium',
+            window_start=now,
+            window_count=1 if is_open else 0,
+            last_report_at=now,
+        )
+        ReportClusterBand.objects.bulk_create([
+            ReportClusterBand(key=key, cluster=cluster) for key in band_keys(sig)
+        ])
+    else:
+        cluster = ReportCluster.objects.select_for_update().get(pk=cluster.pk)
+        cluster.size = F('size') + 1
+        cluster.last_report_at = now
+        if is_open:
+            if now - cluster.window_start > SURGE_WINDOW:
+                cluster.window_start, cluster.window_count = now, 1
+            else:
+                cluster.window_count += 1
+            # A recurring problem reopens its cluster
+            cluster.status = 'open'
+            priority = _raise(cluster.priority, surge_priority(cluster.window_count))
+            raised = priority != cluster.priority
+            cluster.priority = priority
+        cluster.save(update_fields=['window_start', 'window_count', 'size', 'last_report_at', 'status', 'priority'])
+        cluster.refresh_from_db(fields=['size'])
+
+    priority = report.priority
+    if is_open:
+        # Closed reports keep the priority they were handled with
+        priority = _raise(priority, cluster.priority)
+    TechnicalReport.objects.filter(pk=report.pk).update(cluster=cluster, priority=priority)
+    report.cluster, report.priority = cluster, priority
+
+    if raised:
+        # The pending reports of a surging cluster follow its priority
+        lower = PRIORITY_ORDER[:PRIORITY_ORDER.index(cluster.priority)] + ['']
+        TechnicalReport.objects.filter(
+            cluster=cluster, status__in=OPEN_STATUSES, priority__in=lower
+        ).update(priority=cluster.priority)
+    return cluster
+
+
+def resolve_clusters(clusters, now=None):
+    """Resolve every open report of the given clusters. Returns the number of reports resolved."""
+    now = now or timezone.now()
+    cluster_ids = [cluster.pk for cluster in clusters]
+    with transaction.atomic():
+        resolved = TechnicalReport.objects.filter(
+            cluster_id__in=cluster_ids, status__in=OPEN_STATUSES
+        ).update(status='resolved', resolved_at=now)
+        ReportCluster.objects.filter(id__in=cluster_ids).update(status='resolved')
+    return resolved
+
+
+def rebuild():
+    """Recluster every report from scratch, oldest first. Returns the number of clusters."""
+    with transaction.atomic():
+        ReportCluster.objects.all().delete()
+        for report in TechnicalReport.objects.order_by('created_at', 'id').iterator(chunk_size=500):
+            assign(report, now=report.created_at)
+    return ReportCluster.objects.count()
@@ -8,4 +8,6 @@ urlpatterns = [
     path('sessions/request_session/', views.request_session, name='request_session'), 
     path('technical_report/', views.technical_report, name='technical_report'), 
     path('session/<int:session_id>/feedback/', views.view_feedback, name='view_feedback'),
+    path('demand/', views.demand_heatmap, name='demand_heatmap'),
+    path('export/<str:dataset>/', views.export_data, name='export_data'),
 ]
\ No newline at end of file
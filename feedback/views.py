@@ -1,11 +1,19 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from tutoring_sessions.models import Enrollment, Session
+from django.db import transaction
+from django.urls import reverse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from tutoring_sessions.models import Enrollment, Session, Subject
+from tutors.models import Tutor
 from students.models import Student
-from .models import Feedback
+from notification import outbox
+from accounts.ratelimit import rate_limit
+from . import demand, exports
+from .models import Feedback, FeedbackThemes, SessionDemand, SessionRatingSummary
 from .forms import SessionRequestForm, TechnicalReportForm
-from django.db.models import Avg
 
 # Create your views here.
 @login_required
@@ -29,11 +37,24 @@ def feedback(request, enrollment_id):
         rating = request.POST.get('rating')
         comment = request.POST.get('comment', '')
         
-        Feedback.objects.create(
-            enrollment=enrollment,
-            rating=rating,
-            comment=comment,
-        )
+        with transaction.atomic():
+            feedback = Feedback.objects.create(
+                enrollment=enrollment,
+                rating=rating,
+                comment=comment,
+            )
+            session = enrollment.session
+            outbox.enqueue(
+                'feedback_received',
+                'New Feedback',
+                f'{student.full_name} rated {session.class_code} {rating}/5.',
+                [session.tutor.user_id],
+                key=f'feedback:{feedback.id}:created',
+                session_id=session.id,
+                action_url=reverse('feedback:view_feedback', args=[session.id]),
+                related_object_id=feedback.id,
+                related_object_type='Feedback',
+            )
         
         messages.success(request, 'Thank you for submitting your feedback!')
         return redirect('students:sessions')
@@ -43,6 +64,7 @@ def feedback(request, enrollment_id):
     })
 
 @login_required
+@rate_limit('request_session', '10/m')
 def request_session(request):
     """View to submit a new session request from a student"""
     if request.method == 'POST':
@@ -62,6 +84,7 @@ def request_session(request):
     return render(request, 'students/request_session.html', {'form': form})
 
 @login_required
+@rate_limit('technical_report', '5/m')
 def technical_report(request):
     """View to submit a technical report"""
 
@@ -106,62 +129,134 @@ def view_feedback(request, session_id):
     # Get session and verify it belongs to the logged-in tutor
     session = get_object_or_404(Session, id=session_id, tutor=request.user.tutor)
     
-    # Get all enrollments for this session
-    enrollments = Enrollment.objects.filter(session=session).select_related(
-        'student', 'student__user'
-    )
+    # Get all enrollments for this session with their feedback in one query
+    enrollments = list(Enrollment.objects.filter(session=session).select_related(
+        'student', 'student__user', 'feedback'
+    ))
     
     # Separate enrollments with and without comments for display
     feedbacks_with_comments = []
     feedbacks_without_comments = [] # This holds ratings without detailed comments
     
     for enrollment in enrollments:
-        try:
-            feedback = enrollment.feedback # Access the related Feedback object
-            if feedback.comment:
-                feedbacks_with_comments.append({
-                    'student': enrollment.student,
-                    'rating': feedback.rating,
-                    'comment': feedback.comment,
-                    'created_at': feedback.created_at
-                })
-            else:
-                feedbacks_without_comments.append({
-                    'student': enrollment.student,
-                    'rating': feedback.rating,
-                    'created_at': feedback.created_at
-                })
-        except Feedback.DoesNotExist:
+        feedback = getattr(enrollment, 'feedback', None)
+        if feedback is None:
             # Student hasn't submitted feedback yet
-            pass
+            continue
+        if feedback.comment:
+            feedbacks_with_comments.append({
+                'student': enrollment.student,
+                'rating': feedback.rating,
+                'comment': feedback.comment,
+                'created_at': feedback.created_at
+            })
+        else:
+            feedbacks_without_comments.append({
+                'student': enrollment.student,
+                'rating': feedback.rating,
+                'created_at': feedback.created_at
+            })
     
-    # Calculate statistics
-    all_feedbacks = Feedback.objects.filter(enrollment__session=session)
-    total_feedbacks = all_feedbacks.count()
-    total_students = enrollments.count()
+    # Statistics come from the rating rollup maintained on every feedback insert
+    summary = SessionRatingSummary.objects.filter(session=session).first() or SessionRatingSummary(session=session)
+    total_students = len(enrollments)
     
     stats = {
-        # Calculate average rating
-        'average_rating': all_feedbacks.aggregate(Avg('rating'))['rating__avg'] or 0,
-        'total_feedbacks': total_feedbacks,
+        'average_rating': summary.average,
+        'total_feedbacks': summary.count,
         'total_students': total_students,
         # Calculate feedback submission rate
-        'feedback_rate': (total_feedbacks / total_students * 100) if total_students > 0 else 0,
-        # Calculate rating distribution
-        'rating_distribution': {
-            5: all_feedbacks.filter(rating=5).count(),
-            4: all_feedbacks.filter(rating=4).count(),
-            3: all_feedbacks.filter(rating=3).count(),
-            2: all_feedbacks.filter(rating=2).count(),
-            1: all_feedbacks.filter(rating=1).count(),
-        }
+        'feedback_rate': (summary.count / total_students * 100) if total_students > 0 else 0,
+        'rating_distribution': summary.distribution,
     }
     
+    # Keywords and sentiment precomputed by `manage.py analyze_feedback`
+    themes = FeedbackThemes.objects.filter(scope='session', session=session).first()
+    
     context = {
         'session': session,
         'feedbacks_with_comments': feedbacks_with_comments,
         'feedbacks_without_comments': feedbacks_without_comments,
         'stats': stats,
+        'themes': themes,
+    }
+    
+    return render(request, 'feedback/view_feedback.html', context)
+
+
+def _is_office(user):
+    profile = getattr(user, 'userprofile', None)
+    return user.is_staff or (profile is not None and profile.role in ('office', 'admin'))
+
+
+@login_required
+@require_GET
+def demand_heatmap(request):
+    """
+    Session request demand of a semester for office staff (JSON):
+    heatmap cells per subject/weekday/hour and suggested sections to open.
+    Filters: ?semester=2025-1 (default: current), ?subject=<id>, ?delivery_mode=online
+    """
+    if not _is_office(request.user):
+        return JsonResponse({'success': False, 'error': 'Office staff only'}, status=403)
+    
+    semester = request.GET.get('semester') or demand.semester_of(timezone.localdate())
+    subject_id = request.GET.get('subject')
+    if subject_id is not None and not subject_id.isdigit():
+        return JsonResponse({'success': False, 'error': 'Invalid subject'}, status=400)
+    delivery_mode = request.GET.get('delivery_mode')
+    if delivery_mode and delivery_mode not in dict(SessionDemand._meta.get_field('delivery_mode').choices):
+        return JsonResponse({'success': False, 'error': 'Invalid delivery mode'}, status=400)
+    
+    cells = demand.heatmap(semester, int(subject_id) if subject_id else None, delivery_mode)
+    suggestions = demand.suggestions(semester)
+    subjects = dict(Subject.objects.filter(
+        id__in={c['subject_id'] for c in cells} | {s['subject_id'] for s in suggestions}
+    ).values_list('id', 'name'))
+    tutors = dict(Tutor.objects.filter(
+        id__in={t for s in suggestions for t in s['tutor_ids']}
+    ).values_list('id', 'full_name'))
+    
+    for cell in cells:
+        # Unmatched free-text subjects keep their normalized text
+        key = cell.pop('subject_key')
+        cell['subject'] = subjects.get(cell['subject_id'], key)
+    for suggestion in suggestions:
+        suggestion['subject'] = subjects.get(suggestion['subject_id'])
+        suggestion['tutors'] = [{'id': t, 'name': tutors.get(t)} for t in suggestion.pop('tutor_ids')]
+    
+    return JsonResponse({
+        'success': True,
+        'semester': semester,
+        'semesters': list(SessionDemand.objects.order_by('-semester').values_list('semester', flat=True).distinct()),
+        'cells': cells,
+        'suggestions': suggestions,
+    })
+
+
+@login_required
+@require_GET
+def export_data(request, dataset):
+    """
+    Stream a dataset (feedback, progress, enrollments, session_requests) as CSV or XLSX
+    for office staff. ?format=csv|xlsx, ?columns=a,b,c and the dataset's filters,
+    e.g. ?date_from=2025-09-01&date_to=2026-01-31&subject=3
+    """
+    if not _is_office(request.user):
+        return JsonResponse({'success': False, 'error': 'Office staff only'}, status=403)
+    
+    file_format = request.GET.get('format', 'csv')
+    columns = [c for c in request.GET.get('columns', '').split(',') if c]
+    filters = {
+        key: value for key, value in request.GET.items()
+        if key not in ('format', 'columns') and value != ''
     }
+    try:
+        content = exports.stream(dataset, file_format, columns, filters)
+    except ValueError as error:
+        return JsonResponse({'success': False, 'error': str(error)}, status=400)
     
-    return render(request, 'feedback/view_feedback.html', context)
\ No newline at end of file
+    response = StreamingHttpResponse(content, content_type=exports.CONTENT_TYPES[file_format])
+    filename = f'{dataset}-{timezone.localdate():%Y%m%d}.{file_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
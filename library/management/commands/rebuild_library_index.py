@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from library import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of library materials (it is kept in sync on every change)"
+
+    def handle(self, *args, **options):
+        if not search.available():
+            self.stdout.write(self.style.WARNING('Full-text search needs SQLite FTS5; nothing to do.'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Indexed {search.rebuild()} materials.'))
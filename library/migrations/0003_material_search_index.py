@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    """FTS5 index of materials (SQLite only; other backends keep the plain filters)"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS library_material_fts USING fts5("
+        "title, description, publisher, isbn, subject, authors, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute('''
+        INSERT INTO library_material_fts (rowid, title, description, publisher, isbn, subject, authors)
+        SELECT m.id, m.title, COALESCE(m.description, ''), COALESCE(m.publisher, ''), COALESCE(m.isbn, ''), s.name,
+               COALESCE((SELECT group_concat(a.name, ', ') FROM library_material_authors ma
+                         JOIN library_author a ON a.id = ma.author_id WHERE ma.material_id = m.id), '')
+        FROM library_material m JOIN tutoring_sessions_subject s ON s.id = m.subject_id
+    ''')
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS library_material_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0002_initial'),
+        ('tutoring_sessions', '0005_sessionrecommendation'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,141 @@
+"""
+Full-text search of library materials with SQLite FTS5.
+
+`library_material_fts` holds one row per Material (rowid = material id) with
+its title, description, publisher, ISBN, subject name and author names. It is
+kept in sync by the signals in signals.py, inside the same transaction as the
+change. Queries are ranked with BM25 (title and authors weigh most) and come
+back with a highlighted snippet of the best matching column.
+
+The unicode61 tokenizer folds case and accents ("giai tich" finds "Giải
+tích"), but not "đ", which is its own letter: query words starting with "d"
+also match "đ". On other database backends `available()` is False and the
+caller keeps its plain filters.
+"""
+import re
+from dataclasses import dataclass
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+
+TABLE = 'library_material_fts'
+COLUMNS = ('title', 'description', 'publisher', 'isbn', 'subject', 'authors')
+# BM25 weight of each column, in COLUMNS order
+WEIGHTS = (10.0, 1.0, 2.0, 5.0, 3.0, 5.0)
+# `filter` modes of the library page -> indexed columns
+FILTER_COLUMNS = {
+    'title': ('title',),
+    'subject': ('subject',),
+    'author': ('authors',),
+}
+MAX_RESULTS = 200
+# Materials per statement when reindexing (SQLite caps query parameters)
+BATCH_SIZE = 500
+SNIPPET_TOKENS = 16
+
+# Snippet markers that cannot come from the text, replaced after escaping
+_OPEN, _CLOSE = '\x02', '\x03'
+_WORD = re.compile(r'\w+')
+_ISBN = re.compile(r'[\d\s-]{10,}[xX]?')
+
+_SELECT_DOCUMENTS = '''
+    SELECT m.id, m.title, COALESCE(m.description, ''), COALESCE(m.publisher, ''), COALESCE(m.isbn, ''), s.name,
+           COALESCE((SELECT group_concat(a.name, ', ') FROM library_material_authors ma
+                     JOIN library_author a ON a.id = ma.author_id WHERE ma.material_id = m.id), '')
+    FROM library_material m JOIN tutoring_sessions_subject s ON s.id = m.subject_id
+'''
+
+
+@dataclass
+class Hit:
+    material_id: int
+    rank: float
+    snippet: str
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def index(material_ids):
+    """(Re)index the given materials; ids that no longer exist are dropped from the index"""
+    material_ids = list(material_ids)
+    if not material_ids or not available():
+        return
+    with connection.cursor() as cursor:
+        for start in range(0, len(material_ids), BATCH_SIZE):
+            batch = material_ids[start:start + BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid IN ({placeholders})', batch)
+            cursor.execute(
+                f'INSERT INTO {TABLE} (rowid, {", ".join(COLUMNS)}) '
+                f'{_SELECT_DOCUMENTS} WHERE m.id IN ({placeholders})',
+                batch
+            )
+
+
+def remove(material_ids):
+    material_ids = list(material_ids)
+    if not material_ids or not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid IN ({", ".join(["%s"] * len(material_ids))})', material_ids
+        )
+
+
+def rebuild():
+    """Reindex every material. Returns the number of indexed rows."""
+    if not available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(f'INSERT INTO {TABLE} (rowid, {", ".join(COLUMNS)}) {_SELECT_DOCUMENTS}')
+        cursor.execute(f'SELECT count(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
+
+
+def _term(word):
+    if word.startswith('d'):
+        return f'("{word}"* OR "đ{word[1:]}"*)'
+    return f'"{word}"*'
+
+
+def build_query(text, columns=None):
+    """
+    FTS5 MATCH expression: every word as a prefix, all words required, restricted
+    to `columns` if given. An ISBN typed with dashes also matches the isbn column.
+    Returns None when the text has no searchable word.
+    """
+    words = _WORD.findall(text.lower())
+    if not words:
+        return None
+    expression = ' AND '.join(_term(word) for word in words)
+    if columns:
+        expression = f'{{{" ".join(columns)}}} : ({expression})'
+    if _ISBN.fullmatch(text.strip()) and (not columns or 'isbn' in columns):
+        isbn = re.sub(r'[\s-]', '', text.strip()).lower()
+        expression = f'({expression}) OR {{isbn}} : "{isbn}"*'
+    return expression
+
+
+def _snippet(raw):
+    return mark_safe(escape(raw).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>'))
+
+
+def search(text, filter_by=None, limit=MAX_RESULTS):
+    """Best matching materials first: [Hit(material_id, rank, snippet)]"""
+    expression = build_query(text, FILTER_COLUMNS.get(filter_by))
+    if expression is None:
+        return []
+    weights = ', '.join(str(weight) for weight in WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, bm25({TABLE}, {weights}) AS rank, '
+            f"snippet({TABLE}, -1, %s, %s, '…', %s) "
+            f'FROM {TABLE} WHERE {TABLE} MATCH %s ORDER BY rank LIMIT %s',
+            [_OPEN, _CLOSE, SNIPPET_TOKENS, expression, limit]
+        )
+        return [Hit(material_id, rank, _snippet(snippet)) for material_id, rank, snippet in cursor.fetchall()]
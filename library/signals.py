@@ -0,0 +1,57 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from tutoring_sessions.models import Subject
+
+from . import search
+from .models import Author, Material
+
+
+@receiver(post_save, sender=Material)
+def material_saved(sender, instance, update_fields=None, **kwargs):
+    # View and download counters do not change the indexed text
+    if update_fields and set(update_fields) <= {'view_count', 'download_count'}:
+        return
+    search.index([instance.pk])
+
+
+@receiver(post_delete, sender=Material)
+def material_deleted(sender, instance, **kwargs):
+    search.remove([instance.pk])
+
+
+@receiver(m2m_changed, sender=Material.authors.through)
+def material_authors_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Author names are indexed with each material; `reverse` means the change came through author.materials"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            search.index([instance.pk])
+    elif action == 'pre_clear':
+        instance._search_material_ids = list(instance.materials.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        search.index(instance._search_material_ids)
+    elif action in ('post_add', 'post_remove'):
+        search.index(pk_set)
+
+
+@receiver(pre_delete, sender=Author)
+def author_deleting(sender, instance, **kwargs):
+    # The author's links are deleted without m2m_changed
+    instance._search_material_ids = list(instance.materials.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, **kwargs):
+    if not created:
+        search.index(instance.materials.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance, **kwargs):
+    search.index(getattr(instance, '_search_material_ids', []))
+
+
+@receiver(post_save, sender=Subject)
+def subject_saved(sender, instance, created, **kwargs):
+    if not created:
+        search.index(Material.objects.filter(subject=instance).values_list('pk', flat=True))
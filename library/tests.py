@@ -1,3 +1,107 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import UserProfile
+from tutoring_sessions.models import Subject
+
+from . import search
+from .models import Author, Material
+
+
+class LibrarySearchTests(TestCase):
+    """Full-text search of library materials"""
+
+    def setUp(self):
+        self.calculus = Subject.objects.create(name='Giải Tích 1', code='MT1003')
+        self.physics = Subject.objects.create(name='Vật Lý 1', code='PH1003')
+        self.tri = Author.objects.create(name='Nguyễn Đình Trí')
+        self.serway = Author.objects.create(name='Raymond Serway')
+
+        self.calculus_book = Material.objects.create(
+            title='Giải tích hàm nhiều biến', subject=self.calculus,
+            description='Đạo hàm riêng, tích phân bội và chuỗi', isbn='9786040000011', publisher='NXB Giáo Dục'
+        )
+        self.calculus_book.authors.add(self.tri)
+        self.physics_book = Material.objects.create(
+            title='Physics for Scientists and Engineers', subject=self.physics,
+            description='Mechanics, waves and thermodynamics with calculus-based derivations'
+        )
+        self.physics_book.authors.add(self.serway)
+        self.exercises = Material.objects.create(
+            title='Bài tập Vật lý đại cương', subject=self.physics, description='Lời giải chi tiết'
+        )
+
+        user = User.objects.create_user(username='student1', password='testpass123')
+        UserProfile.objects.create(user=user, role='student')
+        self.client.login(username='student1', password='testpass123')
+
+    def ids(self, text, filter_by=None):
+        return [hit.material_id for hit in search.search(text, filter_by)]
+
+    def test_accent_insensitive_prefix_search(self):
+        self.assertEqual(self.ids('giai tich'), [self.calculus_book.id])
+        self.assertEqual(self.ids('dao ham'), [self.calculus_book.id])
+        self.assertEqual(self.ids('nguyen dinh tri'), [self.calculus_book.id])
+        self.assertEqual(self.ids('thermo'), [self.physics_book.id])
+        self.assertEqual(self.ids('978-604-000-001-1'), [self.calculus_book.id])
+        self.assertEqual(self.ids('"); DROP TABLE --'), [])
+
+    def test_title_matches_rank_first(self):
+        # A title match outranks a match in the description
+        other = Material.objects.create(title='Calculus Early Transcendentals', subject=self.calculus)
+        self.assertEqual(self.ids('calculus'), [other.id, self.physics_book.id])
+
+    def test_filter_modes_are_column_filters(self):
+        self.assertEqual(sorted(self.ids('vat ly', 'subject')), sorted([self.physics_book.id, self.exercises.id]))
+        self.assertEqual(self.ids('vat ly', 'title'), [self.exercises.id])
+        self.assertEqual(self.ids('serway', 'author'), [self.physics_book.id])
+        self.assertEqual(self.ids('serway', 'title'), [])
+
+    def test_snippets_are_highlighted_and_escaped(self):
+        Material.objects.create(title='Notes <script>alert(1)</script> on limits', subject=self.calculus)
+        [hit] = search.search('limits')
+        self.assertIn('<mark>limits</mark>', hit.snippet)
+        self.assertNotIn('<script>', hit.snippet)
+
+    def test_index_follows_changes(self):
+        self.tri.name = 'Trần Văn Tân'
+        self.tri.save()
+        self.assertEqual(self.ids('tan', 'author'), [self.calculus_book.id])
+        self.assertEqual(self.ids('tri', 'author'), [])
+
+        self.physics.name = 'Cơ học'
+        self.physics.save()
+        self.assertEqual(len(self.ids('co hoc', 'subject')), 2)
+
+        self.physics_book.authors.remove(self.serway)
+        self.assertEqual(self.ids('serway'), [])
+        self.serway.materials.add(self.exercises)
+        self.assertEqual(self.ids('serway'), [self.exercises.id])
+        self.serway.delete()
+        self.assertEqual(self.ids('serway'), [])
+
+        self.calculus_book.delete()
+        self.assertEqual(self.ids('giai tich'), [])
+
+    def test_library_page_uses_ranked_search(self):
+        response = self.client.get(reverse('library:list'), {'search': 'giai tich', 'filter': 'all'})
+        materials = list(response.context['materials'])
+        self.assertEqual(materials, [self.calculus_book])
+        self.assertContains(response, '<mark>Giải</mark> <mark>tích</mark>', html=False)
+
+        response = self.client.get(reverse('library:list'), {'search': 'serway', 'filter': 'title'})
+        self.assertEqual(list(response.context['materials']), [])
 
-# Create your tests here.
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.TABLE}')
+        self.assertEqual(self.ids('giai tich'), [])
+        out = StringIO()
+        call_command('rebuild_library_index', stdout=out)
+        self.assertIn('Indexed 3 materials', out.getvalue())
+        self.assertEqual(self.ids('giai tich'), [self.calculus_book.id])
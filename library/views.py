@@ -1,6 +1,7 @@
 from django.shortcuts import render, get_object_or_404
 from django.db.models import Q, F
 from .models import Material
+from . import search as material_search
 
 def library_list(request):
     """Hiển thị danh sách tài liệu"""
@@ -14,7 +15,17 @@ def library_list(request):
     if request.user.userprofile.role == "tutor":
         base_template = "tutor_base.html"
 
-    if search:
+    if search and material_search.available():
+        # Ranked full-text matches, best first, with the matching passage highlighted
+        hits = material_search.search(search, filter_by)
+        by_id = materials.in_bulk([hit.material_id for hit in hits])
+        materials = []
+        for hit in hits:
+            material = by_id.get(hit.material_id)
+            if material is not None:
+                material.snippet = hit.snippet
+                materials.append(material)
+    elif search:
         if filter_by == 'title':
             materials = materials.filter(title__icontains=search)
         elif filter_by == 'subject':
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import StoredFile
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'sha256', 'updated_at']
+    search_fields = ['name', 'sha256']
+    readonly_fields = ['name', 'size', 'sha256', 'updated_at']
@@ -0,0 +1,32 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from media_files.models import StoredFile
+from media_files.storage import record_file, forget_file
+
+
+class Command(BaseCommand):
+    help = "Reconcile StoredFile with the files actually present under MEDIA_ROOT (backfill/repair)"
+
+    def handle(self, *args, **options):
+        root = str(settings.MEDIA_ROOT)
+        seen = set()
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                digest = hashlib.sha256()
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(64 * 1024), b''):
+                        digest.update(chunk)
+                record_file(name, os.path.getsize(path), digest.hexdigest())
+                seen.add(name)
+
+        missing = set(StoredFile.objects.values_list('name', flat=True)) - seen
+        for name in missing:
+            forget_file(name)
+
+        self.stdout.write(self.style.SUCCESS(f'Recorded {len(seen)} file(s), removed {len(missing)} stale record(s).'))
@@ -0,0 +1,39 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    """Record the files already under MEDIA_ROOT (same walk as `sync_file_metadata`)"""
+    StoredFile = apps.get_model('media_files', 'StoredFile')
+    root = str(settings.MEDIA_ROOT)
+    batch = []
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(64 * 1024), b''):
+                    digest.update(chunk)
+            batch.append(StoredFile(
+                name=os.path.relpath(path, root).replace(os.sep, '/'),
+                size=os.path.getsize(path),
+                sha256=digest.hexdigest(),
+            ))
+            if len(batch) >= 500:
+                StoredFile.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+    StoredFile.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_files', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class StoredFile(models.Model):
+    """Metadata of a file in the default storage, recorded when it is saved (row deleted with the file)"""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Stored File'
+        verbose_name_plural = 'Stored Files'
+    
+    def __str__(self):
+        return self.name
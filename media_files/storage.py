@@ -0,0 +1,78 @@
+"""
+Storage-metadata layer.
+
+MetadataFileSystemStorage records existence, size and SHA-256 of every file it
+writes and forgets it on delete. Templates ask get_file_info() - a cache lookup
+backed by the StoredFile table - instead of stat()-ing MEDIA_ROOT.
+
+Cached entries expire (FILE_METADATA_CACHE_TIMEOUT, and the much shorter
+FILE_METADATA_MISS_TIMEOUT for files not found), so a worker whose cache does
+not see another worker's writes - e.g. the per-process locmem default - is
+out of date for that long at most.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+
+
+def _cache_key(name):
+    return f'storedfile:{name}'
+
+
+def _cache(name, info):
+    if info:
+        timeout = getattr(settings, 'FILE_METADATA_CACHE_TIMEOUT', 3600)
+    else:
+        timeout = getattr(settings, 'FILE_METADATA_MISS_TIMEOUT', 30)
+    cache.set(_cache_key(name), info, timeout)
+
+
+def record_file(name, size, sha256):
+    from .models import StoredFile
+    StoredFile.objects.update_or_create(name=name, defaults={'size': size, 'sha256': sha256})
+    _cache(name, {'size': size, 'sha256': sha256})
+
+
+def forget_file(name):
+    from .models import StoredFile
+    StoredFile.objects.filter(name=name).delete()
+    _cache(name, False)
+
+
+def get_file_info(name):
+    """
+    {'size': ..., 'sha256': ...} for a stored file, or None if it does not exist.
+    Never touches the filesystem: cache first, then one indexed query.
+    """
+    if not name:
+        return None
+    info = cache.get(_cache_key(name))
+    if info is None:
+        from .models import StoredFile
+        info = StoredFile.objects.filter(name=name).values('size', 'sha256').first() or False
+        _cache(name, info)
+    return info or None
+
+
+def file_exists(name):
+    return get_file_info(name) is not None
+
+
+class MetadataFileSystemStorage(FileSystemStorage):
+    """FileSystemStorage that keeps StoredFile in sync with the files it writes and deletes"""
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in content.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        name = super()._save(name, content)
+        record_file(name, size, digest.hexdigest())
+        return name
+
+    def delete(self, name):
+        super().delete(name)
+        forget_file(name)
@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+
+from .models import StoredFile
+from .storage import get_file_info
+
+
+class StoredFileMetadataTests(TestCase):
+    """Test the storage-metadata layer"""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_save_records_size_and_hash(self):
+        """Test saving a file records its metadata"""
+        name = default_storage.save('docs/a.txt', ContentFile(b'hello'))
+        info = get_file_info(name)
+        self.assertEqual(info['size'], 5)
+        self.assertEqual(
+            info['sha256'],
+            '2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824'
+        )
+        self.assertTrue(StoredFile.objects.filter(name=name).exists())
+
+    def test_delete_forgets_file(self):
+        """Test deleting a file removes its metadata"""
+        name = default_storage.save('docs/a.txt', ContentFile(b'hello'))
+        default_storage.delete(name)
+        self.assertIsNone(get_file_info(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_lookup_falls_back_to_database_once(self):
+        """Test a cache miss costs one query and is then cached"""
+        name = default_storage.save('docs/a.txt', ContentFile(b'hello'))
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertIsNotNone(get_file_info(name))
+            self.assertIsNotNone(get_file_info(name))
+
+    def test_avatar_tags_never_stat_the_disk(self):
+        """Test rendering the avatar tag does not touch the filesystem"""
+        name = default_storage.save('avatars/me.png', ContentFile(b'png'))
+        field = mock.Mock(name='field')
+        field.name = name
+        field.url = default_storage.url(name)
+        template = Template("{% load avatar_tags %}{% avatar_src avatar %}|{{ avatar|valid_avatar }}")
+
+        with mock.patch('os.stat', side_effect=AssertionError('stat called')), \
+                mock.patch('os.path.exists', side_effect=AssertionError('exists called')), \
+                mock.patch('os.path.isfile', side_effect=AssertionError('isfile called')):
+            html = template.render(Context({'avatar': field}))
+
+        self.assertEqual(html, f'{field.url}|True')
+
+    @override_settings(FILE_METADATA_MISS_TIMEOUT=30)
+    def test_misses_expire(self):
+        """Test a cached miss is not kept forever (other processes may save the file)"""
+        self.assertIsNone(get_file_info('docs/later.txt'))
+        StoredFile.objects.create(name='docs/later.txt', size=1, sha256='0' * 64)
+        self.assertIsNone(get_file_info('docs/later.txt'))
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + 31):
+            self.assertIsNotNone(get_file_info('docs/later.txt'))
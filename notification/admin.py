@@ -1,14 +1,16 @@
 # notification/admin.py
 from django.contrib import admin
-from .models import Notification, NotificationObserver
+
+from . import inbox
+from .models import ArchivedNotification, Notification, NotificationDigest, NotificationObserver, OutboxMessage
 
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['id', 'user', 'notification_type', 'title', 'is_read', 'is_broadcast', 'created_at']
+    list_display = ['id', 'user', 'notification_type', 'title', 'count', 'is_read', 'is_broadcast', 'created_at']
     list_filter = ['notification_type', 'is_read', 'is_broadcast', 'created_at']
     search_fields = ['title', 'message', 'user__username']
-    readonly_fields = ['created_at', 'read_at']
+    readonly_fields = ['created_at', 'last_event_at', 'read_at']
     
     fieldsets = (
         ('Basic Info', {
@@ -19,23 +21,33 @@ class NotificationAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Status', {
-            'fields': ('is_read', 'is_broadcast', 'read_at')
+            'fields': ('count', 'is_read', 'is_broadcast', 'read_at')
         }),
         ('Timestamps', {
-            'fields': ('created_at',),
+            'fields': ('created_at', 'last_event_at'),
             'classes': ('collapse',)
         }),
     )
     
     actions = ['mark_as_read', 'mark_as_unread']
     
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and 'user' in form.changed_data and form.initial.get('user'):
+            # The summary of the previous recipient still lists the notification
+            inbox.forget(form.initial['user'])
+    
     def mark_as_read(self, request, queryset):
+        rows = list(queryset.values_list('user_id', 'is_broadcast'))
         updated = queryset.update(is_read=True)
+        inbox.notifications_changed(rows)
         self.message_user(request, f'{updated} notification(s) marked as read.')
     mark_as_read.short_description = "Mark selected as read"
     
     def mark_as_unread(self, request, queryset):
+        rows = list(queryset.values_list('user_id', 'is_broadcast'))
         updated = queryset.update(is_read=False)
+        inbox.notifications_changed(rows)
         self.message_user(request, f'{updated} notification(s) marked as unread.')
     mark_as_unread.short_description = "Mark selected as unread"
 
@@ -44,4 +56,26 @@ class NotificationAdmin(admin.ModelAdmin):
 class NotificationObserverAdmin(admin.ModelAdmin):
     list_display = ['user', 'event_type', 'session_id', 'is_active', 'created_at']
     list_filter = ['event_type', 'is_active']
-    search_fields = ['user__username']
\ No newline at end of file
+    search_fields = ['user__username']
+
+
+@admin.register(NotificationDigest)
+class NotificationDigestAdmin(admin.ModelAdmin):
+    list_display = ['user', 'notification_type', 'count', 'first_at', 'last_at']
+    list_filter = ['notification_type']
+    search_fields = ['user__username']
+
+
+@admin.register(ArchivedNotification)
+class ArchivedNotificationAdmin(admin.ModelAdmin):
+    list_display = ['original_id', 'user_id', 'notification_type', 'title', 'created_at', 'archived_at']
+    list_filter = ['notification_type', 'is_broadcast']
+    search_fields = ['title', 'message']
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'channel', 'status', 'attempts', 'idempotency_key', 'available_at', 'processed_at']
+    list_filter = ['channel', 'status']
+    search_fields = ['idempotency_key', 'last_error']
+    readonly_fields = ['created_at', 'processed_at', 'claimed_by', 'claimed_at']
@@ -1,17 +1,21 @@
-from notification.notification_service import NotificationService
+from django.conf import settings
+
+from notification import inbox
 
     
 def notifications(request):
-    """Add notifications to all template contexts"""
+    """Add notifications to all template contexts (served from the cached inbox summary)"""
     if request.user.is_authenticated:
-        notifications = NotificationService.get_user_notifications(request.user)
-        unread_count = NotificationService.get_unread_count(request.user)
+        summary = inbox.get_summary(request.user)
         
         return {
-            'user_notifications': notifications[:5],  # Latest 5
-            'unread_count': unread_count,
+            'user_notifications': summary['previews'],  # Latest 5
+            'unread_count': summary['unread_count'],
+            # Open the SSE stream only when served through ASGI (see NOTIFICATION_SSE_ENABLED)
+            'notification_sse_enabled': getattr(settings, 'NOTIFICATION_SSE_ENABLED', False),
         }
     return {
         'user_notifications': [],
         'unread_count': 0,
-    }
\ No newline at end of file
+        'notification_sse_enabled': False,
+    }
@@ -0,0 +1,66 @@
+"""
+Notification subscribers of the tutoring_sessions domain events.
+
+Each handler receives a batch of events of one type, loads the sessions it
+needs with one query and enqueues the notifications under the event key, so a
+batch processed twice never notifies twice.
+"""
+from tutoring_sessions import events
+from tutoring_sessions.models import Session
+
+from .notification_service import NotificationService
+
+
+def _sessions(session_ids):
+    return Session.objects.select_related('subject').in_bulk(set(session_ids))
+
+
+@events.subscriber(events.EnrollmentCreated)
+def enrollment_created(batch):
+    sessions = _sessions(event.session_id for event in batch)
+    for event in batch:
+        session = sessions.get(event.session_id)
+        if session is not None:
+            NotificationService.notify_session_confirmed(
+                session, event.student_user_id, key=event.key, enrollment_id=event.enrollment_id
+            )
+
+
+@events.subscriber(events.EnrollmentCancelled)
+def enrollment_cancelled(batch):
+    sessions = _sessions(event.session_id for event in batch)
+    for event in batch:
+        session = sessions.get(event.session_id)
+        if session is not None:
+            NotificationService.notify_enrollment_cancelled(session, event.student_user_id, key=event.key)
+
+
+@events.subscriber(events.EnrollmentMoved)
+def enrollment_moved(batch):
+    sessions = _sessions(
+        session_id for event in batch for session_id in (event.from_session_id, event.to_session_id)
+    )
+    for event in batch:
+        from_session, to_session = sessions.get(event.from_session_id), sessions.get(event.to_session_id)
+        if from_session is not None and to_session is not None:
+            NotificationService.notify_enrollment_moved(
+                from_session, to_session, event.student_user_id, key=event.key, enrollment_id=event.enrollment_id
+            )
+
+
+@events.subscriber(events.SessionRescheduled)
+def session_rescheduled(batch):
+    sessions = _sessions(event.session_id for event in batch)
+    for event in batch:
+        session = sessions.get(event.session_id)
+        if session is not None:
+            NotificationService.notify_session_rescheduled(session, event.student_user_ids, key=event.key)
+
+
+@events.subscriber(events.SessionCancelled)
+def session_cancelled(batch):
+    sessions = _sessions(event.session_id for event in batch)
+    for event in batch:
+        session = sessions.get(event.session_id)
+        if session is not None:
+            NotificationService.notify_session_cancelled(session, event.student_user_ids, key=event.key)
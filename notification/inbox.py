@@ -0,0 +1,155 @@
+"""
+Cached inbox summary (unread count + latest previews) for the base templates.
+
+The summary of each user is built from the database on a cache miss and then
+patched in place when notifications are created or read, so rendering the
+notification dropdown costs no query in steady state. A new broadcast
+concerns every user, so it bumps a shared version instead of touching every
+entry; summaries are rebuilt lazily on the next page view.
+
+Patches are applied once the transaction commits, so a rolled back insert or
+read never shows up in a summary. Changes made by another process (outbox
+dispatcher, other workers) reach a summary only through a shared cache backend
+(Redis, Memcached); with the default per-process cache summaries live
+settings.NOTIFICATION_INBOX_CACHE_TIMEOUT seconds only (one minute by default).
+"""
+import time as time_module
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+PREVIEW_SIZE = 5
+CACHE_TIMEOUT = 60
+BROADCAST_VERSION_KEY = 'notification:inbox:broadcast_version'
+
+
+def _broadcast_version():
+    version = cache.get(BROADCAST_VERSION_KEY)
+    if version is None:
+        cache.add(BROADCAST_VERSION_KEY, time_module.time(), None)
+        version = cache.get(BROADCAST_VERSION_KEY)
+    return version
+
+
+def _key(user_id, version):
+    return f'notification:inbox:{user_id}:{version}'
+
+
+def _timeout():
+    return getattr(settings, 'NOTIFICATION_INBOX_CACHE_TIMEOUT', CACHE_TIMEOUT)
+
+
+def get_summary(user):
+    """
+    {'unread_count': int, 'previews': [Notification, ...]} for the user.
+    Previews carry the `read_by_user` attribute like get_user_notifications rows.
+    """
+    key = _key(user.pk, _broadcast_version())
+    summary = cache.get(key)
+    if summary is None:
+        from .notification_service import NotificationService
+        summary = {
+            'unread_count': NotificationService.get_unread_count(user),
+            'previews': NotificationService.get_inbox_page(user, limit=PREVIEW_SIZE)[0],
+        }
+        cache.set(key, summary, _timeout())
+    return summary
+
+
+def touch_broadcasts():
+    """A broadcast was created or deleted: every summary is stale"""
+    cache.set(BROADCAST_VERSION_KEY, time_module.time(), None)
+
+
+def forget(user_id):
+    """Drop the cached summary of one user"""
+    cache.delete(_key(user_id, _broadcast_version()))
+
+
+def forget_many(user_ids):
+    """Drop the cached summaries of several users (rebuilt on their next page view)"""
+    version = _broadcast_version()
+    cache.delete_many([_key(user_id, version) for user_id in user_ids])
+
+
+def notifications_created(notifications):
+    """Prepend new personal notifications to the summaries that are already cached (after commit)"""
+    notifications = list(notifications)
+    transaction.on_commit(lambda: _prepend(notifications))
+
+
+def _prepend(notifications):
+    version = _broadcast_version()
+    by_key = {}
+    for notification in notifications:
+        by_key.setdefault(_key(notification.user_id, version), []).append(notification)
+    updated = {}
+    for key, summary in cache.get_many(list(by_key)).items():
+        # One user can get several rows at once (e.g. one digest per type); the last created comes first
+        new = by_key[key][::-1]
+        if any(notification.pk is None for notification in new):
+            # Backend did not return primary keys from bulk_create; rebuild on next read
+            cache.delete(key)
+            continue
+        for notification in new:
+            notification.read_by_user = notification.is_read
+        summary['unread_count'] += sum(not notification.is_read for notification in new)
+        summary['previews'] = (new + summary['previews'])[:PREVIEW_SIZE]
+        updated[key] = summary
+    if updated:
+        cache.set_many(updated, _timeout())
+
+
+def notifications_changed(rows):
+    """
+    Notifications were edited outside the service (admin, bulk updates): drop the
+    summaries they appear in. `rows` are (user_id, is_broadcast) pairs.
+    """
+    rows = list(rows)
+    if any(is_broadcast for _, is_broadcast in rows):
+        touch_broadcasts()
+    else:
+        forget_many({user_id for user_id, _ in rows if user_id})
+
+
+def notification_read(user_id, notification_id):
+    """One notification went from unread to read for the user (patched after commit)"""
+    transaction.on_commit(lambda: _mark_read(user_id, notification_id))
+
+
+def _mark_read(user_id, notification_id):
+    key = _key(user_id, _broadcast_version())
+    summary = cache.get(key)
+    if summary is None:
+        return
+    summary['unread_count'] = max(summary['unread_count'] - 1, 0)
+    for preview in summary['previews']:
+        if preview.pk == notification_id:
+            preview.read_by_user = True
+    cache.set(key, summary, _timeout())
+
+
+def all_read(user_id):
+    """Every notification of the user is now read (patched after commit)"""
+    transaction.on_commit(lambda: _mark_all_read(user_id))
+
+
+def _mark_all_read(user_id):
+    key = _key(user_id, _broadcast_version())
+    summary = cache.get(key)
+    if summary is None:
+        return
+    summary['unread_count'] = 0
+    for preview in summary['previews']:
+        preview.read_by_user = True
+    cache.set(key, summary, _timeout())
+
+
+async def apeek(user_id):
+    """Cached summary of the user or None, without ever touching the database (for async streams)"""
+    version = await cache.aget(BROADCAST_VERSION_KEY)
+    if version is None:
+        return None
+    return await cache.aget(_key(user_id, version))
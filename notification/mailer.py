@@ -0,0 +1,118 @@
+"""
+Bulk email delivery for the notification outbox.
+
+A batch of email rows is rendered from cached compiled templates and sent
+over a single backend connection (get_connection + send_messages) instead of
+one SMTP session per message. Every destination domain has a token bucket
+(settings.NOTIFICATION_EMAIL_RATE_LIMITS, messages per minute); messages over
+the limit are handed back to the outbox to be retried later.
+"""
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import select_template
+
+
+@lru_cache(maxsize=None)
+def body_template(notification_type):
+    """Compiled body template of a notification type (falls back to the default one)"""
+    return select_template([
+        f'notification/email/{notification_type}.txt',
+        'notification/email/default.txt',
+    ])
+
+
+class DomainRateLimiter:
+    """Token bucket per destination domain, refilled continuously (process-local)"""
+
+    def __init__(self, rates, clock=time.monotonic):
+        self.rates = rates
+        self.clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def rate(self, domain):
+        return self.rates.get(domain, self.rates.get('default'))
+
+    def acquire(self, domain):
+        """Take one token. Returns 0 when allowed, else the seconds until a token is available."""
+        rate = self.rate(domain)
+        if not rate:
+            return 0
+        now = self.clock()
+        with self._lock:
+            tokens, last = self._buckets.get(domain, (rate, now))
+            tokens = min(rate, tokens + (now - last) * rate / 60)
+            if tokens >= 1:
+                self._buckets[domain] = (tokens - 1, now)
+                return 0
+            self._buckets[domain] = (tokens, now)
+            return (1 - tokens) * 60 / rate
+
+
+_limiter = None
+
+
+def get_limiter():
+    global _limiter
+    rates = getattr(settings, 'NOTIFICATION_EMAIL_RATE_LIMITS', {})
+    if _limiter is None or _limiter.rates is not rates:
+        _limiter = DomainRateLimiter(rates)
+    return _limiter
+
+
+def render_message(payload, user):
+    """EmailMessage for one outbox payload, or None when the user has no address"""
+    if not user or not user['email']:
+        return None
+    action_link = ''
+    if payload['action_url']:
+        action_link = f"{getattr(settings, 'SITE_URL', '')}{payload['action_url']}"
+    body = body_template(payload['notification_type']).render({
+        'name': user['first_name'] or user['username'],
+        'title': payload['title'],
+        'message': payload['message'],
+        'action_link': action_link,
+    })
+    return EmailMessage(subject=payload['title'], body=body, to=[user['email']])
+
+
+def send_outbox_batch(rows):
+    """
+    Deliver a batch of email outbox rows over one connection.
+    Returns {'sent': {row ids}, 'deferred': {row id: seconds}, 'errors': {row id: exception}}.
+    Rows of users without an address count as sent.
+    """
+    result = {'sent': set(), 'deferred': {}, 'errors': {}}
+    users = {
+        user['id']: user
+        for user in User.objects.filter(
+            pk__in=[row.payload['user_id'] for row in rows]
+        ).values('id', 'email', 'first_name', 'username')
+    }
+
+    limiter = get_limiter()
+    outgoing = []
+    for row in rows:
+        message = render_message(row.payload, users.get(row.payload['user_id']))
+        if message is None:
+            result['sent'].add(row.pk)
+            continue
+        wait = limiter.acquire(message.to[0].rsplit('@', 1)[-1].lower())
+        if wait:
+            result['deferred'][row.pk] = wait
+            continue
+        outgoing.append((row, message))
+
+    if outgoing:
+        try:
+            get_connection().send_messages([message for _, message in outgoing])
+        except Exception as error:
+            result['errors'].update((row.pk, error) for row, _ in outgoing)
+        else:
+            result['sent'].update(row.pk for row, _ in outgoing)
+    return result
@@ -0,0 +1,43 @@
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare one connection per message with one pooled connection per batch. "
+        "Point it at a local SMTP stand-in, e.g. `python -m aiosmtpd -n -l localhost:1025` "
+        "and --smtp localhost:1025; without --smtp the configured EMAIL_BACKEND is used."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200, help='Messages per run')
+        parser.add_argument('--smtp', help='host:port of an SMTP server to send to')
+
+    def handle(self, *args, **options):
+        backend = None
+        kwargs = {}
+        if options['smtp']:
+            host, _, port = options['smtp'].partition(':')
+            backend = 'django.core.mail.backends.smtp.EmailBackend'
+            kwargs = {'host': host, 'port': int(port or 25)}
+
+        messages = [
+            EmailMessage(f'Benchmark {i}', 'Session cancelled.', None, [f'user{i}@example.com'])
+            for i in range(options['count'])
+        ]
+
+        start = time.perf_counter()
+        for message in messages:
+            get_connection(backend, **kwargs).send_messages([message])
+        per_message = time.perf_counter() - start
+
+        start = time.perf_counter()
+        get_connection(backend, **kwargs).send_messages(messages)
+        pooled = time.perf_counter() - start
+
+        count = options['count']
+        self.stdout.write(f'Connection per message: {per_message:.3f}s ({count / per_message:.0f} msg/s)')
+        self.stdout.write(f'Pooled connection:      {pooled:.3f}s ({count / pooled:.0f} msg/s)')
+        self.stdout.write(self.style.SUCCESS(f'Speed-up: x{per_message / pooled:.1f}'))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notification import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver pending notification outbox rows (in-app and email). "
+        "Runs until interrupted; use --once from cron instead of a long-running process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Rows claimed per batch')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit')
+        parser.add_argument('--prune-days', type=int, default=7, help='Delete delivered rows older than this')
+
+    def handle(self, *args, **options):
+        pruned = outbox.prune_done(options['prune_days'])
+        if pruned:
+            self.stdout.write(f'Pruned {pruned} delivered row(s).')
+
+        totals = {'claimed': 0, 'delivered': 0, 'retried': 0, 'failed': 0, 'deferred': 0}
+        try:
+            while True:
+                stats = outbox.dispatch_batch(options['batch_size'])
+                for name, value in stats.items():
+                    totals[name] += value
+                if not stats['claimed']:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Delivered {totals['delivered']}, retrying {totals['retried']}, failed {totals['failed']}, "
+            f"rate limited {totals['deferred']}."
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from notification.retention import purge_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive and delete notifications older than their type's retention period "
+        "(settings.NOTIFICATION_RETENTION_DAYS); schedule e.g. weekly"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows archived/deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches')
+        parser.add_argument('--export', metavar='PATH', help='Append rows to a gzip JSON-lines file instead of the archive table')
+        parser.add_argument('--no-archive', action='store_true', help='Delete without keeping a copy')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be purged')
+
+    def handle(self, *args, **options):
+        stats = purge_notifications(
+            batch_size=options['batch_size'],
+            archive=not options['no_archive'],
+            export_path=options['export'],
+            dry_run=options['dry_run'],
+            pause=options['pause'],
+        )
+        verb = 'Would purge' if options['dry_run'] else 'Purged'
+        message = f"{verb} {stats['rows']} notification(s), ~{stats['bytes']} bytes of payload"
+        if not options['dry_run']:
+            message += f" in {stats['batches']} batch(es)"
+            if stats['free_bytes'] is not None:
+                message += f"; SQLite free pages grew by {stats['free_bytes']} bytes (VACUUM to shrink the file)"
+        self.stdout.write(self.style.SUCCESS(message + '.'))
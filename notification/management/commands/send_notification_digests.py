@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from notification.notification_service import NotificationService
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver pending notification digests (types in settings.NOTIFICATION_DIGEST_TYPES); "
+        "schedule periodically, e.g. cron: 0 7 * * * python manage.py send_notification_digests"
+    )
+
+    def handle(self, *args, **options):
+        sent = NotificationService.send_digests()
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} digest notification(s).'))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0002_broadcastread_broadcastreadstate_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name='NotificationDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('session_request', 'Session Request'), ('session_confirmed', 'Session Confirmed'), ('session_cancelled', 'Session Cancelled'), ('session_completed', 'Session Completed'), ('announcement', 'Announcement'), ('feedback_received', 'Feedback Received'), ('technical_report', 'Technical Report')], max_length=30)),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('last_title', models.CharField(max_length=200)),
+                ('last_message', models.TextField()),
+                ('first_at', models.DateTimeField(auto_now_add=True)),
+                ('last_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_digests', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'notification_type')},
+            },
+        ),
+    ]
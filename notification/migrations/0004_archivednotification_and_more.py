@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0003_notification_count_notificationdigest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('user_id', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('notification_type', models.CharField(choices=[('session_request', 'Session Request'), ('session_confirmed', 'Session Confirmed'), ('session_cancelled', 'Session Cancelled'), ('session_completed', 'Session Completed'), ('announcement', 'Announcement'), ('feedback_received', 'Feedback Received'), ('technical_report', 'Technical Report')], max_length=30)),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('session_id', models.IntegerField(blank=True, null=True)),
+                ('is_read', models.BooleanField(default=False)),
+                ('is_broadcast', models.BooleanField(default=False)),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['notification_type', 'created_at'], name='notificatio_notific_1a7847_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0004_archivednotification_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificationobserver',
+            index=models.Index(fields=['event_type', 'session_id', 'is_active'], name='notificatio_event_t_f37953_idx'),
+        ),
+    ]
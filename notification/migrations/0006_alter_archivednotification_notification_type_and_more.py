@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:39
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0005_notificationobserver_notificatio_event_t_f37953_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivednotification',
+            name='notification_type',
+            field=models.CharField(choices=[('session_request', 'Session Request'), ('session_confirmed', 'Session Confirmed'), ('session_cancelled', 'Session Cancelled'), ('session_rescheduled', 'Session Rescheduled'), ('session_completed', 'Session Completed'), ('announcement', 'Announcement'), ('feedback_received', 'Feedback Received'), ('technical_report', 'Technical Report')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('session_request', 'Session Request'), ('session_confirmed', 'Session Confirmed'), ('session_cancelled', 'Session Cancelled'), ('session_rescheduled', 'Session Rescheduled'), ('session_completed', 'Session Completed'), ('announcement', 'Announcement'), ('feedback_received', 'Feedback Received'), ('technical_report', 'Technical Report')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='notificationdigest',
+            name='notification_type',
+            field=models.CharField(choices=[('session_request', 'Session Request'), ('session_confirmed', 'Session Confirmed'), ('session_cancelled', 'Session Cancelled'), ('session_rescheduled', 'Session Rescheduled'), ('session_completed', 'Session Completed'), ('announcement', 'Announcement'), ('feedback_received', 'Feedback Received'), ('technical_report', 'Technical Report')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('in_app', 'In-app'), ('email', 'Email')], max_length=20)),
+                ('idempotency_key', models.CharField(max_length=200, unique=True)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claimed_by', models.CharField(blank=True, max_length=100)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'available_at'], name='notificatio_status_ac26ba_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0006_alter_archivednotification_notification_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxmessage',
+            name='channel',
+            field=models.CharField(choices=[('in_app', 'In-app'), ('email', 'Email'), ('event', 'Domain event')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def seed_read_states(apps, schema_editor):
+    """
+    Broadcasts used to share one global is_read flag. Carry it over to every
+    existing user: the watermark covers the leading run of read broadcasts, and
+    read broadcasts after the first unread one become per-user exceptions.
+    """
+    Notification = apps.get_model('notification', 'Notification')
+    BroadcastReadState = apps.get_model('notification', 'BroadcastReadState')
+    BroadcastRead = apps.get_model('notification', 'BroadcastRead')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    broadcasts = Notification.objects.filter(is_broadcast=True)
+    read_ids = list(broadcasts.filter(is_read=True).order_by('id').values_list('id', flat=True))
+    if not read_ids:
+        return
+    first_unread = broadcasts.filter(is_read=False).order_by('id').values_list('id', flat=True).first()
+    watermark = max((i for i in read_ids if first_unread is None or i < first_unread), default=0)
+    exceptions = [i for i in read_ids if i > watermark]
+
+    states, reads = [], []
+    for user_id in User.objects.values_list('id', flat=True).iterator():
+        if watermark:
+            states.append(BroadcastReadState(user_id=user_id, read_up_to=watermark))
+        reads.extend(BroadcastRead(user_id=user_id, notification_id=i) for i in exceptions)
+        if len(states) >= 500 or len(reads) >= 500:
+            BroadcastReadState.objects.bulk_create(states, ignore_conflicts=True)
+            BroadcastRead.objects.bulk_create(reads, ignore_conflicts=True)
+            states, reads = [], []
+    BroadcastReadState.objects.bulk_create(states, ignore_conflicts=True)
+    BroadcastRead.objects.bulk_create(reads, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0007_alter_outboxmessage_channel'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_read_states, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0008_seed_broadcast_read_states'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='last_event_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
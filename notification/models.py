@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+from . import inbox, realtime
 
 # ... các model khác ...
 
@@ -9,6 +10,7 @@ class Notification(models.Model):
         ('session_request', 'Session Request'),
         ('session_confirmed', 'Session Confirmed'),
         ('session_cancelled', 'Session Cancelled'),
+        ('session_rescheduled', 'Session Rescheduled'),
         ('session_completed', 'Session Completed'),
         ('announcement', 'Announcement'),
         ('feedback_received', 'Feedback Received'),
@@ -35,6 +37,9 @@ class Notification(models.Model):
     related_object_id = models.IntegerField(null=True, blank=True)
     related_object_type = models.CharField(max_length=50, null=True, blank=True)
     
+    # Number of events merged into this row (see NotificationService coalescing)
+    count = models.PositiveIntegerField(default=1)
+    
     # Status
     is_read = models.BooleanField(default=False)
     is_broadcast = models.BooleanField(default=False, help_text="Broadcast to all users")
@@ -42,6 +47,8 @@ class Notification(models.Model):
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     read_at = models.DateTimeField(null=True, blank=True)
+    # Latest event merged into this row (coalescing); created_at stays the first one
+    last_event_at = models.DateTimeField(null=True, blank=True)
     
     # URL to redirect when clicked
     action_url = models.CharField(max_length=500, blank=True)
@@ -53,18 +60,89 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['user', 'is_read', '-created_at']),
             models.Index(fields=['is_broadcast', '-created_at']),
+            models.Index(fields=['is_broadcast', 'id']),
+            models.Index(fields=['notification_type', 'created_at']),  # retention scans
         ]
     
     def __str__(self):
         recipient = self.user.username if self.user else "ALL USERS"
         return f"{self.notification_type} → {recipient}: {self.title}"
     
+    @property
+    def latest_at(self):
+        """Time of the latest event shown by this row"""
+        return self.last_event_at or self.created_at
+    
     def mark_as_read(self):
-        """Mark notification as read"""
+        """Mark notification as read (personal notifications; broadcasts use BroadcastReadState)"""
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
-            self.save()
+            # update() skips post_save, which would drop the summary instead of patching it
+            Notification.objects.filter(pk=self.pk).update(is_read=True, read_at=self.read_at)
+            inbox.notification_read(self.user_id, self.id)
+            realtime.publish([self.user_id], {'type': 'read', 'id': self.id})
+
+
+class ArchivedNotification(models.Model):
+    """
+    Compact copy of a notification removed from the hot table by `purge_notifications`.
+    No foreign keys: archived rows survive user deletion and never join back.
+    """
+    original_id = models.BigIntegerField(unique=True)
+    user_id = models.IntegerField(null=True, blank=True, db_index=True)
+    notification_type = models.CharField(max_length=30, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    session_id = models.IntegerField(null=True, blank=True)
+    is_read = models.BooleanField(default=False)
+    is_broadcast = models.BooleanField(default=False)
+    count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"[archived] {self.notification_type}: {self.title}"
+
+
+class BroadcastReadState(models.Model):
+    """Per-user read watermark for broadcasts: every broadcast with id <= read_up_to is read"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='broadcast_read_state')
+    read_up_to = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.username} read broadcasts up to #{self.read_up_to}"
+
+
+class BroadcastRead(models.Model):
+    """Sparse exception: a broadcast above the user's watermark that was read individually"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='broadcast_reads')
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='broadcast_reads')
+    read_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = [['user', 'notification']]
+    
+    def __str__(self):
+        return f"{self.user.username} read broadcast #{self.notification_id}"
+
+
+class NotificationDigest(models.Model):
+    """Pending digest of low-priority events for one user, turned into one notification per period"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_digests')
+    notification_type = models.CharField(max_length=30, choices=Notification.NOTIFICATION_TYPES)
+    count = models.PositiveIntegerField(default=1)
+    last_title = models.CharField(max_length=200)
+    last_message = models.TextField()
+    first_at = models.DateTimeField(auto_now_add=True)
+    last_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = [['user', 'notification_type']]
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.count} × {self.notification_type}"
 
 
 class NotificationObserver(models.Model):
@@ -77,9 +155,54 @@ class NotificationObserver(models.Model):
     
     class Meta:
         unique_together = [['user', 'event_type', 'session_id']]
+        indexes = [
+            # Recipient lookup: NotificationService.notify / subscriptions.get_subscribers
+            models.Index(fields=['event_type', 'session_id', 'is_active']),
+        ]
         verbose_name = 'Notification Observer'
         verbose_name_plural = 'Notification Observers'
     
     def __str__(self):
         session_info = f" (Session {self.session_id})" if self.session_id else ""
-        return f"{self.user.username} observing {self.event_type}{session_info}"
\ No newline at end of file
+        return f"{self.user.username} observing {self.event_type}{session_info}"
+
+
+class OutboxMessage(models.Model):
+    """
+    Pending delivery written in the same transaction as the domain change that caused it.
+    `python manage.py dispatch_outbox` claims rows in batches and delivers them.
+    """
+    CHANNEL_CHOICES = [
+        ('in_app', 'In-app'),
+        ('email', 'Email'),
+        ('event', 'Domain event'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
+    # Same key = same delivery: enqueuing twice is a no-op
+    idempotency_key = models.CharField(max_length=200, unique=True)
+    payload = models.JSONField()
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.channel} [{self.status}] {self.idempotency_key}"
@@ -1,7 +1,17 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import Notification, NotificationObserver
+from django.db import transaction
+from django.db.models import BooleanField, Case, Exists, ExpressionWrapper, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from . import inbox, realtime, subscriptions
+from .models import Notification, NotificationDigest, NotificationObserver, BroadcastRead, BroadcastReadState
 from django.urls import reverse
-from typing import List, Optional
+from typing import Iterable, List, Optional, Union
 
 
 class NotificationService:
@@ -50,26 +60,9 @@ class NotificationService:
                 session_id, action_url, related_object_id, related_object_type
             )
         
-        if session_id:
-            # Get observers for this session
-            observers = NotificationObserver.objects.filter(
-                event_type=notification_type,
-                session_id=session_id,
-                is_active=True
-            )
-            recipients = [obs.user for obs in observers]
-            return NotificationService._notify_users(
-                recipients, notification_type, title, message,
-                session_id, action_url, related_object_id, related_object_type
-            )
-        
-        # Get general observers for this event type
-        observers = NotificationObserver.objects.filter(
-            event_type=notification_type,
-            session_id__isnull=True,
-            is_active=True
-        )
-        recipients = [obs.user for obs in observers]
+        # Observers of this session, or general observers of the event type,
+        # resolved from the cached subscription registry
+        recipients = subscriptions.get_subscribers(notification_type, session_id or None)
         return NotificationService._notify_users(
             recipients, notification_type, title, message,
             session_id, action_url, related_object_id, related_object_type
@@ -77,7 +70,7 @@ class NotificationService:
     
     @staticmethod
     def _notify_users(
-        users: List[User],
+        users: Iterable[Union[User, int]],
         notification_type: str,
         title: str,
         message: str,
@@ -86,11 +79,36 @@ class NotificationService:
         related_object_id: Optional[int],
         related_object_type: Optional[str]
     ):
-        """Create individual notifications for specific users"""
-        notifications = []
-        for user in users:
-            notification = Notification.objects.create(
-                user=user,
+        """
+        Create individual notifications for specific users (User objects or user IDs).
+        Rows are inserted with bulk_create in batches of settings.NOTIFICATION_BATCH_SIZE,
+        so the cost is one INSERT per batch instead of one per recipient.
+        
+        Types in settings.NOTIFICATION_DIGEST_TYPES are queued for the periodic digest
+        instead; types in settings.NOTIFICATION_COALESCE_TYPES are merged into a recent
+        unread row of the same recipient/type/session/target (see _coalesce).
+        Returns the newly created rows.
+        """
+        user_ids = list(dict.fromkeys(
+            user.pk if isinstance(user, User) else user for user in users
+        ))
+        if not user_ids:
+            return []
+        
+        if notification_type in getattr(settings, 'NOTIFICATION_DIGEST_TYPES', ()):
+            NotificationService._queue_digest(user_ids, notification_type, title, message)
+            return []
+        
+        if notification_type in getattr(settings, 'NOTIFICATION_COALESCE_TYPES', ()):
+            merged = NotificationService._coalesce(
+                user_ids, notification_type, title, message,
+                session_id, action_url, related_object_id, related_object_type
+            )
+            user_ids = [user_id for user_id in user_ids if user_id not in merged]
+        
+        notifications = [
+            Notification(
+                user_id=user_id,
                 notification_type=notification_type,
                 title=title,
                 message=message,
@@ -100,9 +118,145 @@ class NotificationService:
                 related_object_type=related_object_type,
                 is_broadcast=False
             )
-            notifications.append(notification)
+            for user_id in user_ids
+        ]
+        # bulk_create wraps every batch in one transaction (and caps the batch
+        # further if the database limits bound parameters, e.g. SQLite)
+        Notification.objects.bulk_create(
+            notifications,
+            batch_size=getattr(settings, 'NOTIFICATION_BATCH_SIZE', 500)
+        )
+        # bulk_create skips post_save, so patch the cached inbox summaries here
+        inbox.notifications_created(notifications)
+        realtime.publish_notifications(notifications)
         return notifications
     
+    @staticmethod
+    def _coalesce(
+        user_ids: List[int],
+        notification_type: str,
+        title: str,
+        message: str,
+        session_id: Optional[int],
+        action_url: str,
+        related_object_id: Optional[int],
+        related_object_type: Optional[str]
+    ):
+        """
+        Fold the event into each recipient's latest unread notification with the same
+        type, session and target object whose last event is within
+        settings.NOTIFICATION_COALESCE_WINDOW seconds: its counter is incremented, its
+        text replaced by the latest event and its last_event_at moved to now.
+        One SELECT + one UPDATE per batch of recipients. Returns {user_id: notification_id}.
+        """
+        now = timezone.now()
+        cutoff = now - timedelta(seconds=getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 600))
+        batch_size = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 500)
+        merged = {}
+        
+        with transaction.atomic():
+            for start in range(0, len(user_ids), batch_size):
+                rows = Notification.objects.filter(
+                    user_id__in=user_ids[start:start + batch_size],
+                    notification_type=notification_type,
+                    session_id=session_id,
+                    related_object_type=related_object_type,
+                    related_object_id=related_object_id,
+                    is_broadcast=False,
+                    is_read=False,
+                ).filter(
+                    Q(last_event_at__gte=cutoff) | Q(last_event_at__isnull=True, created_at__gte=cutoff)
+                ).order_by('user_id', 'created_at').values_list('user_id', 'id', 'count')
+                # Latest row per user wins
+                batch = {user_id: (notification_id, count) for user_id, notification_id, count in rows}
+                if batch:
+                    # created_at is left alone: inbox cursors and retention rely on it
+                    Notification.objects.filter(id__in=[i for i, _ in batch.values()]).update(
+                        count=F('count') + 1,
+                        title=title,
+                        message=message,
+                        action_url=action_url,
+                        last_event_at=now
+                    )
+                    merged.update(batch)
+        
+        if merged:
+            inbox.forget_many(merged)
+            realtime.publish_notifications([
+                Notification(
+                    id=notification_id,
+                    user_id=user_id,
+                    notification_type=notification_type,
+                    title=title,
+                    message=message,
+                    action_url=action_url,
+                    count=count + 1
+                )
+                for user_id, (notification_id, count) in merged.items()
+            ], coalesced=True)
+        return {user_id: notification_id for user_id, (notification_id, _) in merged.items()}
+    
+    @staticmethod
+    def _queue_digest(user_ids: List[int], notification_type: str, title: str, message: str):
+        """Count the event in each recipient's pending digest (one UPDATE + one INSERT per batch)"""
+        batch_size = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 500)
+        now = timezone.now()
+        with transaction.atomic():
+            for start in range(0, len(user_ids), batch_size):
+                batch = user_ids[start:start + batch_size]
+                pending = NotificationDigest.objects.filter(
+                    user_id__in=batch,
+                    notification_type=notification_type
+                )
+                existing = set(pending.values_list('user_id', flat=True))
+                pending.update(count=F('count') + 1, last_title=title, last_message=message, last_at=now)
+                NotificationDigest.objects.bulk_create([
+                    NotificationDigest(
+                        user_id=user_id,
+                        notification_type=notification_type,
+                        last_title=title,
+                        last_message=message
+                    )
+                    for user_id in batch if user_id not in existing
+                ])
+    
+    @staticmethod
+    def send_digests():
+        """
+        Turn every pending digest into one notification and clear it.
+        Meant to run periodically (python manage.py send_notification_digests).
+        Returns the number of notifications created.
+        """
+        labels = dict(Notification.NOTIFICATION_TYPES)
+        with transaction.atomic():
+            digests = list(NotificationDigest.objects.select_for_update().order_by('id'))
+            if not digests:
+                return 0
+            notifications = [
+                Notification(
+                    user_id=digest.user_id,
+                    notification_type=digest.notification_type,
+                    title=f'{labels.get(digest.notification_type, digest.notification_type)} digest',
+                    message=(
+                        f'{digest.count} new notification(s) since '
+                        f'{timezone.localtime(digest.first_at):%d/%m/%Y %H:%M}. '
+                        f'Latest: {digest.last_title} - {digest.last_message}'
+                    ),
+                    action_url=reverse('notification:notifications_list'),
+                    count=digest.count,
+                    is_broadcast=False
+                )
+                for digest in digests
+            ]
+            Notification.objects.bulk_create(
+                notifications,
+                batch_size=getattr(settings, 'NOTIFICATION_BATCH_SIZE', 500)
+            )
+            NotificationDigest.objects.filter(id__in=[digest.id for digest in digests]).delete()
+        inbox.notifications_created(notifications)
+        realtime.publish_notifications(notifications)
+        return len(notifications)
+    
     @staticmethod
     def _create_broadcast_notification(
         notification_type: str,
@@ -139,31 +293,106 @@ class NotificationService:
         )
     
     @staticmethod
-    def notify_session_confirmed(session, student: User):
-        """Notify student when their session is confirmed"""
-        return NotificationService.notify(
-            notification_type='session_confirmed',
-            title='Session Confirmed',
-            message=f'Your session "{session.title}" has been confirmed for {session.date}',
-            recipients=[student],
+    def _schedule(session):
+        return f'{session.get_days_display()} {session.start_time:%H:%M}-{session.end_time:%H:%M}'
+    
+    # Session lifecycle helpers: delivered through the outbox (in-app + email),
+    # `key` makes them idempotent when an event is processed twice
+    
+    @staticmethod
+    def notify_session_confirmed(session, student: Union[User, int], key: Optional[str] = None, enrollment_id: Optional[int] = None):
+        """Notify a student that their enrollment is confirmed"""
+        from . import outbox
+        outbox.enqueue(
+            'session_confirmed',
+            'Enrollment Confirmed',
+            f'You are enrolled in {session.class_code} ({session.subject.name}), '
+            f'{NotificationService._schedule(session)}.',
+            [student],
+            key=key,
+            session_id=session.id,
+            action_url=reverse('students:sessions'),
+            related_object_id=enrollment_id,
+            related_object_type='Enrollment' if enrollment_id else None,
+        )
+    
+    @staticmethod
+    def notify_enrollment_cancelled(session, student: Union[User, int], key: Optional[str] = None):
+        """Notify a student that they left a class"""
+        from . import outbox
+        outbox.enqueue(
+            'session_cancelled',
+            'Enrollment Cancelled',
+            f'Your enrollment in {session.class_code} ({session.subject.name}) has been cancelled.',
+            [student],
+            key=key,
             session_id=session.id,
-            action_url=f'/student/sessions/{session.id}/',
+            action_url=reverse('tutoring_sessions:available_sessions'),
+        )
+    
+    @staticmethod
+    def notify_enrollment_moved(from_session, to_session, student: Union[User, int], key: Optional[str] = None, enrollment_id: Optional[int] = None):
+        """Notify a student that their enrollment moved to another class"""
+        from . import outbox
+        outbox.enqueue(
+            'session_rescheduled',
+            'Class Changed',
+            f'You moved from {from_session.class_code} to {to_session.class_code} '
+            f'({NotificationService._schedule(to_session)}).',
+            [student],
+            key=key,
+            session_id=to_session.id,
+            action_url=reverse('students:sessions'),
+            related_object_id=enrollment_id,
+            related_object_type='Enrollment' if enrollment_id else None,
+        )
+    
+    @staticmethod
+    def notify_session_rescheduled(session, students: Iterable[Union[User, int]], key: Optional[str] = None):
+        """Notify the students of a class that its schedule changed"""
+        from . import outbox
+        outbox.enqueue(
+            'session_rescheduled',
+            'Session Rescheduled',
+            f'{session.class_code} now meets on {NotificationService._schedule(session)}.',
+            students,
+            key=key,
+            session_id=session.id,
+            action_url=reverse('students:sessions'),
+            related_object_id=session.id,
+            related_object_type='Session',
+        )
+    
+    @staticmethod
+    def notify_session_cancelled(session, students: Iterable[Union[User, int]], key: Optional[str] = None):
+        """Notify the students of a class cancelled by its tutor"""
+        from . import outbox
+        outbox.enqueue(
+            'session_cancelled',
+            'Session Cancelled',
+            f'{session.class_code} ({session.subject.name}) has been cancelled by the tutor.',
+            students,
+            key=key,
+            session_id=session.id,
+            action_url=reverse('tutoring_sessions:available_sessions'),
             related_object_id=session.id,
-            related_object_type='Session'
+            related_object_type='Session',
         )
     
     @staticmethod
-    def notify_session_completed(session, participants: List[User]):
+    def notify_session_completed(session, participants: Iterable[Union[User, int]], key: Optional[str] = None):
         """Notify all participants when session is completed"""
-        return NotificationService.notify(
-            notification_type='session_completed',
-            title='Session Completed',
-            message=f'Session "{session.title}" has been completed. Please provide feedback.',
-            recipients=participants,
+        from . import outbox
+        outbox.enqueue(
+            'session_completed',
+            'Session Completed',
+            f'{session.class_code} ({session.subject.name}) has been completed. Please provide feedback.',
+            participants,
+            key=key,
             session_id=session.id,
-            action_url=f'/student/sessions/{session.id}/feedback/',
+            action_url=reverse('students:sessions'),
             related_object_id=session.id,
-            related_object_type='Session'
+            related_object_type='Session',
         )
     
     @staticmethod
@@ -185,6 +414,8 @@ class NotificationService:
             session_id=session_id,
             defaults={'is_active': True}
         )
+        if created:
+            subscriptions.invalidate(event_type, session_id)
         return observer
     
     @staticmethod
@@ -195,27 +426,168 @@ class NotificationService:
             event_type=event_type,
             session_id=session_id
         ).update(is_active=False)
+        subscriptions.invalidate(event_type, session_id)
     
     @staticmethod
-    def get_user_notifications(user: User, unread_only: bool = False):
-        """Get notifications for a specific user (including broadcasts)"""
-        # Personal notifications
-        personal = Notification.objects.filter(user=user)
-        
-        # Broadcast notifications
-        broadcasts = Notification.objects.filter(is_broadcast=True)
+    def _broadcast_watermark(user: User):
+        """SQL expression for the user's broadcast read watermark (0 if never set)"""
+        return Coalesce(
+            Subquery(BroadcastReadState.objects.filter(user=user).values('read_up_to')[:1]),
+            Value(0)
+        )
+    
+    @staticmethod
+    def _broadcast_read_exception(user: User):
+        return Exists(BroadcastRead.objects.filter(user=user, notification=OuterRef('pk')))
+    
+    @staticmethod
+    def _inbox_branches(user: User, unread_only: bool = False, types: Optional[Iterable[str]] = None):
+        """
+        The inbox as disjoint (queryset, read_by_user expression) branches, each of
+        which an index can answer in (created_at, id) order on its own:
+        personal unread / personal read via (user, is_read, -created_at), broadcasts
+        via (is_broadcast, -created_at).
+        """
+        watermark = NotificationService._broadcast_watermark(user)
+        read_exception = NotificationService._broadcast_read_exception(user)
         
-        # Combine
-        notifications = personal | broadcasts
+        # `flag__in=[value]` instead of `flag=value`: on SQLite the latter compiles to
+        # `NOT flag` / `flag`, which cannot seek on the boolean column of the index
+        branches = [(Notification.objects.filter(user=user, is_read__in=[False]), Value(False))]
+        if not unread_only:
+            branches.append((Notification.objects.filter(user=user, is_read__in=[True]), Value(True)))
         
+        broadcasts = Notification.objects.filter(is_broadcast__in=[True])
         if unread_only:
-            notifications = notifications.filter(is_read=False)
+            broadcasts = broadcasts.filter(id__gt=watermark).exclude(read_exception)
+        branches.append((broadcasts, Case(
+            When(id__lte=watermark, then=Value(True)),
+            When(read_exception, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        )))
         
-        return notifications.order_by('-created_at')
+        if types:
+            branches = [(queryset.filter(notification_type__in=types), read) for queryset, read in branches]
+        return branches
+    
+    @staticmethod
+    def _union(branches, ordering=('-created_at', '-id'), limit: Optional[int] = None):
+        """
+        UNION ALL of the inbox branches, annotated with read_by_user.
+        With a limit, each branch is first cut to its own `limit` rows in `ordering`
+        (an id IN (... LIMIT n) subquery, since SQLite rejects LIMIT inside UNION members).
+        """
+        querysets = []
+        for queryset, read_by_user in branches:
+            if limit is not None:
+                queryset = Notification.objects.filter(
+                    pk__in=queryset.order_by(*ordering).values('pk')[:limit]
+                )
+            querysets.append(queryset.annotate(
+                read_by_user=ExpressionWrapper(read_by_user, output_field=BooleanField())
+            ).order_by())
+        first, *rest = querysets
+        return first.union(*rest, all=True).order_by(*ordering)
+    
+    @staticmethod
+    def get_user_notifications(user: User, unread_only: bool = False, types: Optional[Iterable[str]] = None):
+        """
+        Get notifications for a specific user (personal + broadcasts), newest first.
+        Each row is annotated with `read_by_user`: the global is_read flag for personal
+        notifications, the user's watermark/exceptions for broadcasts.
+        """
+        return NotificationService._union(NotificationService._inbox_branches(user, unread_only, types))
+    
+    @staticmethod
+    def encode_cursor(notification: Notification) -> str:
+        """Opaque keyset cursor for a notification's (created_at, id)"""
+        raw = f'{notification.created_at.isoformat()}|{notification.id}'
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor: str):
+        """Inverse of encode_cursor; raises ValueError on malformed input"""
+        try:
+            raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            created_at, notification_id = raw.rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(notification_id)
+        except (TypeError, ValueError, UnicodeDecodeError, binascii.Error) as e:
+            raise ValueError('Invalid cursor') from e
+    
+    @staticmethod
+    def get_inbox_page(
+        user: User,
+        before: Optional[str] = None,
+        since: Optional[str] = None,
+        types: Optional[Iterable[str]] = None,
+        unread_only: bool = False,
+        limit: int = 20
+    ):
+        """
+        One page of the inbox, keyset-paginated on (created_at, id).
+        
+        before: cursor -> the next older items, newest first (default: the latest items)
+        since:  cursor -> items newer than the cursor, oldest first (for polling)
+        Returns (items, has_more). Raises ValueError on an invalid cursor.
+        """
+        branches = NotificationService._inbox_branches(user, unread_only, types)
+        # Keyset written as a range on created_at plus a tie-break on id, so every
+        # branch stays an index range scan
+        if since:
+            created_at, notification_id = NotificationService.decode_cursor(since)
+            keyset = Q(created_at__gte=created_at) & ~Q(created_at=created_at, id__lte=notification_id)
+            ordering = ('created_at', 'id')
+        else:
+            keyset = Q()
+            if before:
+                created_at, notification_id = NotificationService.decode_cursor(before)
+                keyset = Q(created_at__lte=created_at) & ~Q(created_at=created_at, id__gte=notification_id)
+            ordering = ('-created_at', '-id')
+        
+        branches = [(queryset.filter(keyset), read) for queryset, read in branches]
+        items = list(NotificationService._union(branches, ordering, limit + 1)[:limit + 1])
+        return items[:limit], len(items) > limit
     
     @staticmethod
     def get_unread_count(user: User):
         """Get count of unread notifications"""
-        personal_unread = Notification.objects.filter(user=user, is_read=False).count()
-        broadcast_unread = Notification.objects.filter(is_broadcast=True, is_read=False).count()
-        return personal_unread + broadcast_unread
\ No newline at end of file
+        # `__in=[value]` so SQLite can seek on the boolean columns (see _inbox_branches)
+        personal_unread = Notification.objects.filter(user=user, is_read__in=[False]).count()
+        # Range count above the watermark on the (is_broadcast, id) index, minus sparse exceptions
+        broadcast_unread = Notification.objects.filter(
+            is_broadcast__in=[True],
+            id__gt=NotificationService._broadcast_watermark(user)
+        ).exclude(
+            NotificationService._broadcast_read_exception(user)
+        ).count()
+        return personal_unread + broadcast_unread
+    
+    @staticmethod
+    def mark_read(user: User, notification: Notification):
+        """Mark one notification as read for this user. Returns False if the user cannot see it."""
+        if notification.is_broadcast:
+            state = BroadcastReadState.objects.filter(user=user).first()
+            if state is None or notification.id > state.read_up_to:
+                _, created = BroadcastRead.objects.get_or_create(user=user, notification=notification)
+                if created:
+                    inbox.notification_read(user.pk, notification.id)
+                    realtime.publish([user.pk], {'type': 'read', 'id': notification.id})
+            return True
+        if notification.user_id == user.id:
+            notification.mark_as_read()
+            return True
+        return False
+    
+    @staticmethod
+    def mark_all_read(user: User):
+        """Mark every notification as read: one UPDATE for personal ones, one watermark move for broadcasts"""
+        Notification.objects.filter(user=user, is_read__in=[False]).update(is_read=True, read_at=timezone.now())
+        
+        latest = Notification.objects.filter(is_broadcast__in=[True]).order_by('-id').values_list('id', flat=True).first()
+        if latest is not None:
+            BroadcastReadState.objects.update_or_create(user=user, defaults={'read_up_to': latest})
+            # Exceptions below the watermark are now redundant
+            BroadcastRead.objects.filter(user=user, notification_id__lte=latest).delete()
+        inbox.all_read(user.pk)
+        realtime.publish([user.pk], {'type': 'read_all'})
@@ -0,0 +1,281 @@
+"""
+Transactional outbox for notification delivery.
+
+Views call `enqueue()` inside the transaction of the domain change (enroll,
+cancel, reschedule, feedback), so a delivery exists if and only if the change
+committed. A dispatcher (`python manage.py dispatch_outbox`, plus an optional
+in-process worker woken after commit) claims rows in batches and delivers them:
+
+- in_app: one row per event; the notifications of every recipient are created
+  in the same transaction that marks the row done, so a crash never duplicates them.
+- email: one row per recipient; the email rows of a batch are sent together over
+  one backend connection by `mailer.send_outbox_batch` (at least once).
+- event: one row per domain event (tutoring_sessions.events), handed to the
+  event subscribers in batches (at least once).
+
+Failed deliveries are retried with exponential backoff up to MAX_ATTEMPTS.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import mailer
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+# A claimed row not finished within this delay is considered abandoned (crashed worker)
+LEASE_SECONDS = 5 * 60
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='outbox')
+_wake_pending = threading.Event()
+
+
+def enqueue(
+    notification_type,
+    title,
+    message,
+    recipients,
+    key=None,
+    session_id=None,
+    action_url='',
+    related_object_id=None,
+    related_object_type=None,
+):
+    """
+    Record the deliveries of one event. Call inside the transaction of the domain change.
+    `key` identifies the event (e.g. "enrollment:42:created"); enqueuing the same key
+    twice is a no-op. Email rows are added for types in settings.NOTIFICATION_EMAIL_TYPES.
+    """
+    user_ids = list(dict.fromkeys(
+        user.pk if isinstance(user, User) else user for user in recipients
+    ))
+    if not user_ids:
+        return
+    key = key or uuid.uuid4().hex
+    content = {
+        'notification_type': notification_type,
+        'title': title,
+        'message': message,
+        'session_id': session_id,
+        'action_url': action_url,
+        'related_object_id': related_object_id,
+        'related_object_type': related_object_type,
+    }
+    rows = [OutboxMessage(
+        channel='in_app',
+        idempotency_key=f'{key}:in_app',
+        payload=dict(content, user_ids=user_ids),
+    )]
+    if notification_type in getattr(settings, 'NOTIFICATION_EMAIL_TYPES', ()):
+        rows += [
+            OutboxMessage(
+                channel='email',
+                idempotency_key=f'{key}:email:{user_id}',
+                payload=dict(content, user_id=user_id),
+            )
+            for user_id in user_ids
+        ]
+    OutboxMessage.objects.bulk_create(rows, ignore_conflicts=True)
+    transaction.on_commit(wake)
+
+
+def enqueue_event(event_name, key, data):
+    """Record a domain event for the subscribers of tutoring_sessions.events"""
+    OutboxMessage.objects.bulk_create([OutboxMessage(
+        channel='event',
+        idempotency_key=f'{key}:event',
+        payload={'event': event_name, 'data': data},
+    )], ignore_conflicts=True)
+    transaction.on_commit(wake)
+
+
+def wake():
+    """Let the in-process worker drain the outbox (the dispatch_outbox process handles the rest)"""
+    if not getattr(settings, 'NOTIFICATION_OUTBOX_AUTODISPATCH', True):
+        return
+    if not _wake_pending.is_set():
+        _wake_pending.set()
+        _executor.submit(_drain)
+
+
+def _drain():
+    _wake_pending.clear()
+    try:
+        while dispatch_batch()['claimed']:
+            pass
+    except Exception:
+        logger.exception('Outbox dispatch failed')
+    finally:
+        connection.close()
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def _ready(now):
+    return Q(status='pending', available_at__lte=now) | Q(
+        status='processing', claimed_at__lt=now - timedelta(seconds=LEASE_SECONDS)
+    )
+
+
+def claim_batch(worker, batch_size=100):
+    """
+    Claim up to batch_size deliverable rows for this worker.
+    The conditional UPDATE makes the claim safe when several dispatchers race
+    (SKIP LOCKED is used where the database supports it).
+    """
+    now = timezone.now()
+    ready = OutboxMessage.objects.filter(_ready(now)).order_by('id')
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            ready = ready.select_for_update(skip_locked=True)
+        ids = list(ready.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+        OutboxMessage.objects.filter(_ready(now), id__in=ids).update(
+            status='processing',
+            claimed_by=worker,
+            claimed_at=now,
+            attempts=F('attempts') + 1
+        )
+    return list(OutboxMessage.objects.filter(id__in=ids, claimed_by=worker, claimed_at=now).order_by('id'))
+
+
+def deliver_in_app(payload):
+    from .notification_service import NotificationService
+    NotificationService.notify(
+        notification_type=payload['notification_type'],
+        title=payload['title'],
+        message=payload['message'],
+        recipients=payload['user_ids'],
+        session_id=payload['session_id'],
+        action_url=payload['action_url'],
+        related_object_id=payload['related_object_id'],
+        related_object_type=payload['related_object_type'],
+    )
+
+
+# Channels delivered one row at a time, each in the transaction that finishes the row
+CHANNELS = {
+    'in_app': deliver_in_app,
+}
+
+def deliver_events(rows):
+    from tutoring_sessions import events
+    return events.dispatch(rows)
+
+
+# Channels delivered a whole batch at a time: handler(rows) -> {'sent', 'deferred', 'errors'}
+BATCH_CHANNELS = {
+    'email': mailer.send_outbox_batch,
+    'event': deliver_events,
+}
+
+
+class LeaseLost(Exception):
+    """The row was reclaimed by another worker (lease expired) before this one finished it"""
+
+
+def _update_claimed(message, worker, **fields):
+    """Update a row this worker still holds; raises LeaseLost (rolling back the caller's transaction) otherwise"""
+    if not OutboxMessage.objects.filter(pk=message.pk, claimed_by=worker).update(**fields):
+        raise LeaseLost(message.idempotency_key)
+
+
+def _finish(message, worker):
+    _update_claimed(message, worker, status='done', processed_at=timezone.now(), last_error='')
+
+
+def _fail(message, worker, error):
+    failed = message.attempts >= MAX_ATTEMPTS
+    _update_claimed(
+        message, worker,
+        status='failed' if failed else 'pending',
+        available_at=timezone.now() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (message.attempts - 1)),
+        claimed_by='',
+        last_error=repr(error)[:2000]
+    )
+    return failed
+
+
+def _defer(message, worker, delay):
+    """Put a row back without counting the attempt (e.g. destination rate limited)"""
+    _update_claimed(
+        message, worker,
+        status='pending',
+        available_at=timezone.now() + timedelta(seconds=delay),
+        attempts=F('attempts') - 1,
+        claimed_by=''
+    )
+
+
+def dispatch_batch(batch_size=100, worker=None):
+    """Claim and deliver one batch. Returns counters (claimed, delivered, retried, failed, deferred)."""
+    worker = worker or worker_id()
+    stats = {'claimed': 0, 'delivered': 0, 'retried': 0, 'failed': 0, 'deferred': 0}
+    messages = claim_batch(worker, batch_size)
+    stats['claimed'] = len(messages)
+
+    batches = {}
+    for message in messages:
+        if message.channel in BATCH_CHANNELS:
+            batches.setdefault(message.channel, []).append(message)
+            continue
+        try:
+            # Delivery and completion commit together: in-app rows are never duplicated
+            with transaction.atomic():
+                CHANNELS[message.channel](message.payload)
+                _finish(message, worker)
+            stats['delivered'] += 1
+        except LeaseLost:
+            # Another worker owns the row now; the delivery above was rolled back
+            logger.warning('Outbox lease on %s lost, delivery rolled back', message.idempotency_key)
+        except Exception as error:
+            logger.warning('Outbox delivery %s failed: %r', message.idempotency_key, error)
+            try:
+                stats['failed' if _fail(message, worker, error) else 'retried'] += 1
+            except LeaseLost:
+                pass
+
+    for channel, rows in batches.items():
+        try:
+            result = BATCH_CHANNELS[channel](rows)
+        except Exception as error:
+            result = {'sent': set(), 'deferred': {}, 'errors': {row.pk: error for row in rows}}
+        for message in rows:
+            try:
+                if message.pk in result['sent']:
+                    _finish(message, worker)
+                    stats['delivered'] += 1
+                elif message.pk in result['deferred']:
+                    _defer(message, worker, result['deferred'][message.pk])
+                    stats['deferred'] += 1
+                else:
+                    error = result['errors'].get(message.pk, 'not delivered')
+                    logger.warning('Outbox delivery %s failed: %r', message.idempotency_key, error)
+                    stats['failed' if _fail(message, worker, error) else 'retried'] += 1
+            except LeaseLost:
+                # Batch channels are at least once: the worker holding the row now delivers it again
+                logger.warning('Outbox lease on %s lost', message.idempotency_key)
+    return stats
+
+
+def prune_done(days=7):
+    """Delete delivered rows older than `days` (their keys can then be reused)"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxMessage.objects.filter(status='done', processed_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,147 @@
+"""
+Real-time notification fan-out for the Server-Sent Events stream.
+
+Sync code (views, services) publishes small events for a set of users; every
+open `/notifications/stream/` connection of those users receives them. The
+default backend keeps subscribers in process memory, which is enough for a
+single ASGI worker. Multi-worker deployments plug in another backend (e.g. one
+relaying through Redis pub/sub) with settings.NOTIFICATION_PUBSUB_BACKEND.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+# Events buffered per connection before new ones are dropped (slow clients)
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    """One open stream: an asyncio queue bound to the event loop that serves it"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def deliver(self, event):
+        """Thread-safe: may be called from any thread"""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client will resync from the unread count carried by the next event
+            pass
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class BaseBackend:
+    """Interface of a pub/sub backend"""
+
+    def subscribe(self, user_id) -> Subscription:
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription: Subscription):
+        raise NotImplementedError
+
+    def publish(self, user_ids, event):
+        """Deliver event to the given users; user_ids=None means every connected user"""
+        raise NotImplementedError
+
+
+class InProcessBackend(BaseBackend):
+    """Subscribers of this worker process, indexed by user id"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_ids, event):
+        with self._lock:
+            if user_ids is None:
+                targets = [s for subs in self._subscribers.values() for s in subs]
+            else:
+                targets = [s for user_id in user_ids for s in self._subscribers.get(user_id, ())]
+        for subscription in targets:
+            subscription.deliver(event)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> BaseBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(settings, 'NOTIFICATION_PUBSUB_BACKEND', 'notification.realtime.InProcessBackend')
+                _backend = import_string(path)()
+    return _backend
+
+
+def publish(user_ids, event):
+    """
+    Publish an event once the current transaction commits, so a stream never
+    announces a notification that is rolled back.
+    """
+    user_ids = None if user_ids is None else list(user_ids)
+    transaction.on_commit(lambda: get_backend().publish(user_ids, event))
+
+
+def publish_notifications(notifications, coalesced=False):
+    """
+    Publish personal notifications to their recipients with a single on_commit callback.
+    coalesced=True marks updates of rows the client may already show.
+    """
+    events = [
+        (n.user_id, dict(notification_event(n), coalesced=coalesced))
+        for n in notifications if n.pk is not None
+    ]
+
+    def send():
+        backend = get_backend()
+        for user_id, event in events:
+            backend.publish([user_id], event)
+
+    transaction.on_commit(send)
+
+
+def notification_event(notification):
+    """Payload of a 'notification' event"""
+    return {
+        'type': 'notification',
+        'id': notification.id,
+        'notification_type': notification.notification_type,
+        'type_display': notification.get_notification_type_display(),
+        'title': notification.title,
+        'message': notification.message,
+        'action_url': notification.action_url,
+        'is_broadcast': notification.is_broadcast,
+        'count': notification.count,
+    }
@@ -0,0 +1,136 @@
+"""
+Retention policy for the Notification table.
+
+Each notification type is kept for settings.NOTIFICATION_RETENTION_DAYS[type]
+days (falling back to the 'default' entry; None keeps a type forever). Expired
+rows are copied to ArchivedNotification (or a gzip JSON-lines export) and
+deleted in small batches, each in its own short transaction, so SQLite never
+holds its write lock for long.
+"""
+import gzip
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedNotification, Notification
+
+
+ARCHIVE_FIELDS = (
+    'id', 'user_id', 'notification_type', 'title', 'message', 'session_id',
+    'is_read', 'is_broadcast', 'count', 'created_at',
+)
+
+
+def retention_days(notification_type):
+    policy = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', {})
+    return policy.get(notification_type, policy.get('default'))
+
+
+def expired_notifications(now=None):
+    """Notifications past the retention period of their type"""
+    now = now or timezone.now()
+    condition = Q()
+    for notification_type, _ in Notification.NOTIFICATION_TYPES:
+        days = retention_days(notification_type)
+        if days is not None:
+            condition |= Q(notification_type=notification_type, created_at__lt=now - timedelta(days=days))
+    if not condition:
+        return Notification.objects.none()
+    return Notification.objects.filter(condition)
+
+
+def _row_bytes(row):
+    """Approximate payload size of a row (text as UTF-8, 8 bytes per scalar)"""
+    return sum(
+        len(value.encode()) if isinstance(value, str) else 8
+        for value in row.values() if value is not None
+    )
+
+
+def _sqlite_free_bytes():
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA freelist_count')
+        free_pages = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_size')
+        return free_pages * cursor.fetchone()[0]
+
+
+def _archive(rows):
+    ArchivedNotification.objects.bulk_create([
+        ArchivedNotification(
+            original_id=row['id'],
+            user_id=row['user_id'],
+            notification_type=row['notification_type'],
+            title=row['title'],
+            message=row['message'],
+            session_id=row['session_id'],
+            is_read=row['is_read'],
+            is_broadcast=row['is_broadcast'],
+            count=row['count'],
+            created_at=row['created_at'],
+        )
+        for row in rows
+    ], ignore_conflicts=True)
+
+
+def purge_notifications(batch_size=500, archive=True, export_path=None, dry_run=False, pause=0.0, now=None):
+    """
+    Archive and delete expired notifications.
+
+    archive:     copy rows to ArchivedNotification before deleting them
+    export_path: append rows to this gzip JSON-lines file instead of the archive table
+    dry_run:     only count what would be purged
+    pause:       seconds to sleep between batches to let other writers in
+
+    Returns {'rows', 'bytes', 'batches', 'free_bytes'}; bytes is the approximate
+    payload removed from the hot table, free_bytes the growth of SQLite's free
+    page list (None on other databases).
+    """
+    now = now or timezone.now()
+    expired = expired_notifications(now).order_by('id').values(*ARCHIVE_FIELDS)
+    stats = {'rows': 0, 'bytes': 0, 'batches': 0, 'free_bytes': None}
+
+    if dry_run:
+        for row in expired.iterator(chunk_size=batch_size):
+            stats['rows'] += 1
+            stats['bytes'] += _row_bytes(row)
+        return stats
+
+    free_before = _sqlite_free_bytes()
+    export = gzip.open(export_path, 'at', encoding='utf-8') if export_path else None
+    try:
+        while True:
+            with transaction.atomic():
+                rows = list(expired[:batch_size])
+                if not rows:
+                    break
+                if export is not None:
+                    for row in rows:
+                        export.write(json.dumps(row, default=str) + '\n')
+                elif archive:
+                    _archive(rows)
+                # Cascades to BroadcastRead; post_delete keeps inbox caches in step
+                Notification.objects.filter(id__in=[row['id'] for row in rows]).delete()
+
+            stats['rows'] += len(rows)
+            stats['bytes'] += sum(_row_bytes(row) for row in rows)
+            stats['batches'] += 1
+            if len(rows) < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+    finally:
+        if export is not None:
+            export.close()
+
+    free_after = _sqlite_free_bytes()
+    if free_before is not None:
+        stats['free_bytes'] = max(free_after - free_before, 0)
+    return stats
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import inbox, realtime, subscriptions
+from .models import Notification, NotificationObserver
+
+
+@receiver(post_save, sender=Notification)
+def patch_inbox_on_create(sender, instance, created, **kwargs):
+    """Keep cached inbox summaries and open streams in step with notifications created or edited one by one"""
+    if not created:
+        inbox.notifications_changed([(instance.user_id, instance.is_broadcast)])
+        return
+    if instance.is_broadcast:
+        inbox.touch_broadcasts()
+        realtime.publish(None, realtime.notification_event(instance))
+    elif instance.user_id:
+        inbox.notifications_created([instance])
+        realtime.publish_notifications([instance])
+
+
+@receiver(post_delete, sender=Notification)
+def invalidate_inbox_on_delete(sender, instance, **kwargs):
+    if instance.is_broadcast:
+        inbox.touch_broadcasts()
+    elif instance.user_id:
+        inbox.forget(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=NotificationObserver)
+def invalidate_subscribers(sender, instance, **kwargs):
+    """Observer edits outside the service (admin, shell) must drop the registry entry too"""
+    subscriptions.invalidate(instance.event_type, instance.session_id)
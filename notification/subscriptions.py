@@ -0,0 +1,48 @@
+"""
+Subscription registry: (event_type, session_id) -> set of subscribed user IDs.
+
+NotificationService.notify resolves its recipients here instead of querying
+NotificationObserver on every event. Entries are loaded lazily (one indexed
+query) and dropped whenever a subscription of that key changes.
+
+The drop only reaches other processes through a shared cache backend (Redis,
+Memcached). With the default per-process cache the other processes keep their
+copy until it expires, so entries live settings.NOTIFICATION_SUBSCRIBERS_CACHE_TIMEOUT
+seconds only (one minute by default).
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import NotificationObserver
+
+
+CACHE_TIMEOUT = 60
+
+
+def _timeout():
+    return getattr(settings, 'NOTIFICATION_SUBSCRIBERS_CACHE_TIMEOUT', CACHE_TIMEOUT)
+
+
+def _key(event_type, session_id):
+    return f'notification:subscribers:{event_type}:{session_id if session_id is not None else "all"}'
+
+
+def get_subscribers(event_type, session_id=None):
+    """
+    Active subscribers of an event; session_id=None means the observers
+    registered for every session of that event type.
+    """
+    key = _key(event_type, session_id)
+    user_ids = cache.get(key)
+    if user_ids is None:
+        user_ids = frozenset(NotificationObserver.objects.filter(
+            event_type=event_type,
+            session_id=session_id,
+            is_active=True
+        ).values_list('user_id', flat=True))
+        cache.set(key, user_ids, _timeout())
+    return user_ids
+
+
+def invalidate(event_type, session_id=None):
+    cache.delete(_key(event_type, session_id))
@@ -1,8 +1,27 @@
 # notification/tests.py
-from django.test import TestCase, Client
+import asyncio
+import json
+import time
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, Client, AsyncClient, override_settings
+from django.utils import timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.urls import reverse
-from notification.models import Notification, NotificationObserver
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from notification import inbox, mailer, outbox, realtime, subscriptions, views
+from notification.retention import expired_notifications, purge_notifications
+from notification.models import ArchivedNotification, Notification, NotificationDigest, NotificationObserver, OutboxMessage, BroadcastRead, BroadcastReadState
 from notification.notification_service import NotificationService
 
 
@@ -311,4 +330,829 @@ class NotificationObserverTests(TestCase):
                 user=self.user,
                 event_type='session_completed',
                 session_id=1
-            )
\ No newline at end of file
+            )
+
+class SubscriptionRegistryTests(TestCase):
+    """Cached (event_type, session_id) -> subscriber IDs registry"""
+    
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(f'observer{i}', password='pass123') for i in range(3)]
+        for user in self.users[:2]:
+            NotificationService.subscribe_to_session(user, 7, 'session_completed')
+        NotificationObserver.objects.create(user=self.users[2], event_type='session_completed')
+    
+    def test_lookup_is_cached(self):
+        self.assertEqual(subscriptions.get_subscribers('session_completed', 7), {u.pk for u in self.users[:2]})
+        with self.assertNumQueries(0):
+            self.assertEqual(len(subscriptions.get_subscribers('session_completed', 7)), 2)
+        self.assertEqual(subscriptions.get_subscribers('session_completed'), {self.users[2].pk})
+    
+    def test_subscribe_and_unsubscribe_invalidate(self):
+        subscriptions.get_subscribers('session_completed', 7)
+        NotificationService.unsubscribe_from_session(self.users[0], 7, 'session_completed')
+        self.assertEqual(subscriptions.get_subscribers('session_completed', 7), {self.users[1].pk})
+        
+        NotificationService.subscribe_to_session(self.users[2], 7, 'session_completed')
+        self.assertEqual(subscriptions.get_subscribers('session_completed', 7), {self.users[1].pk, self.users[2].pk})
+    
+    @override_settings(NOTIFICATION_SUBSCRIBERS_CACHE_TIMEOUT=60)
+    def test_entries_missed_by_invalidation_expire(self):
+        subscriptions.get_subscribers('session_completed', 7)
+        # A change made in another process does not clear this process' cache
+        NotificationObserver.objects.filter(user=self.users[0]).update(is_active=False)
+        self.assertEqual(len(subscriptions.get_subscribers('session_completed', 7)), 2)
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + 61):
+            self.assertEqual(subscriptions.get_subscribers('session_completed', 7), {self.users[1].pk})
+    
+    def test_notify_resolves_recipients_without_observer_query(self):
+        subscriptions.get_subscribers('session_completed', 7)
+        with CaptureQueriesContext(connection) as ctx:
+            NotificationService.notify('session_completed', 'Done', 'Session done', session_id=7)
+        self.assertFalse(any('notificationobserver' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(Notification.objects.filter(session_id=7).count(), 2)
+
+
+class BroadcastReadReceiptTests(TestCase):
+    """Broadcasts are read per user, never through the shared is_read flag"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user1 = User.objects.create_user(username='reader1', password='testpass123')
+        self.user2 = User.objects.create_user(username='reader2', password='testpass123')
+        self.broadcasts = [
+            NotificationService.broadcast_announcement(f'Broadcast {i}', 'Message')
+            for i in range(3)
+        ]
+    
+    def test_reading_a_broadcast_does_not_affect_other_users(self):
+        self.client.login(username='reader1', password='testpass123')
+        response = self.client.post(
+            reverse('notification:mark_notification_read', args=[self.broadcasts[0].id])
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        self.broadcasts[0].refresh_from_db()
+        self.assertFalse(self.broadcasts[0].is_read)
+        self.assertEqual(NotificationService.get_unread_count(self.user1), 2)
+        self.assertEqual(NotificationService.get_unread_count(self.user2), 3)
+        
+        read = {n.id: n.read_by_user for n in NotificationService.get_user_notifications(self.user1)}
+        self.assertTrue(read[self.broadcasts[0].id])
+        self.assertFalse(read[self.broadcasts[1].id])
+    
+    def test_mark_all_read_moves_watermark(self):
+        NotificationService.mark_read(self.user1, self.broadcasts[1])
+        NotificationService.mark_all_read(self.user1)
+        
+        state = BroadcastReadState.objects.get(user=self.user1)
+        self.assertEqual(state.read_up_to, self.broadcasts[-1].id)
+        # Exceptions under the watermark are cleaned up
+        self.assertFalse(BroadcastRead.objects.filter(user=self.user1).exists())
+        self.assertEqual(NotificationService.get_unread_count(self.user1), 0)
+        self.assertFalse(NotificationService.get_user_notifications(self.user1, unread_only=True).exists())
+        self.assertEqual(NotificationService.get_unread_count(self.user2), 3)
+        
+        # A new broadcast is unread again
+        NotificationService.broadcast_announcement('Later', 'Message')
+        self.assertEqual(NotificationService.get_unread_count(self.user1), 1)
+    
+    def test_mark_all_read_does_not_write_per_broadcast(self):
+        def queries_for(user):
+            with CaptureQueriesContext(connection) as ctx:
+                NotificationService.mark_all_read(user)
+            return len(ctx.captured_queries)
+        
+        baseline = queries_for(self.user1)
+        for i in range(20):
+            NotificationService.broadcast_announcement(f'Extra {i}', 'Message')
+        self.assertEqual(queries_for(self.user2), baseline)
+        self.assertEqual(BroadcastReadState.objects.count(), 2)
+    
+    def test_cannot_mark_other_users_notification(self):
+        notification = Notification.objects.create(
+            user=self.user2,
+            notification_type='announcement',
+            title='Private',
+            message='Message'
+        )
+        self.assertFalse(NotificationService.mark_read(self.user1, notification))
+        notification.refresh_from_db()
+        self.assertFalse(notification.is_read)
+    
+    def test_migration_carries_over_the_global_flag(self):
+        from importlib import import_module
+        from django.apps import apps
+        seed_read_states = import_module('notification.migrations.0008_seed_broadcast_read_states').seed_read_states
+        
+        # Broadcasts read under the old global flag: 0 and 2, not 1
+        Notification.objects.filter(id__in=[self.broadcasts[0].id, self.broadcasts[2].id]).update(is_read=True)
+        seed_read_states(apps, None)
+        
+        for user in (self.user1, self.user2):
+            self.assertEqual(BroadcastReadState.objects.get(user=user).read_up_to, self.broadcasts[0].id)
+            self.assertEqual(NotificationService.get_unread_count(user), 1)
+            unread = NotificationService.get_user_notifications(user, unread_only=True)
+            self.assertEqual([n.id for n in unread], [self.broadcasts[1].id])
+
+
+class InboxSummaryCacheTests(TestCase):
+    """Cached unread count and previews used by the context processor"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='inboxuser', password='testpass123')
+        self.other = User.objects.create_user(username='otheruser', password='testpass123')
+        for i in range(3):
+            NotificationService.notify('announcement', f'Old {i}', 'Message', recipients=[self.user])
+    
+    def test_summary_served_from_cache(self):
+        summary = inbox.get_summary(self.user)
+        self.assertEqual(summary['unread_count'], 3)
+        self.assertEqual([n.title for n in summary['previews']], ['Old 2', 'Old 1', 'Old 0'])
+        
+        with self.assertNumQueries(0):
+            summary = inbox.get_summary(self.user)
+        self.assertEqual(summary['unread_count'], 3)
+    
+    def test_new_notifications_patch_summary(self):
+        inbox.get_summary(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(4):
+                NotificationService.notify('announcement', f'New {i}', 'Message', recipients=[self.user, self.other])
+        
+        with self.assertNumQueries(0):
+            summary = inbox.get_summary(self.user)
+        self.assertEqual(summary['unread_count'], 7)
+        self.assertEqual(len(summary['previews']), inbox.PREVIEW_SIZE)
+        self.assertEqual(summary['previews'][0].title, 'New 3')
+        self.assertEqual(summary['unread_count'], NotificationService.get_unread_count(self.user))
+    
+    def test_reads_patch_summary(self):
+        inbox.get_summary(self.user)
+        latest = Notification.objects.filter(user=self.user).order_by('-id').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.mark_read(self.user, latest)
+            # Reading twice must not decrement twice
+            NotificationService.mark_read(self.user, latest)
+        
+        with self.assertNumQueries(0):
+            summary = inbox.get_summary(self.user)
+        self.assertEqual(summary['unread_count'], 2)
+        self.assertTrue(summary['previews'][0].read_by_user)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.mark_all_read(self.user)
+        summary = inbox.get_summary(self.user)
+        self.assertEqual(summary['unread_count'], 0)
+        self.assertTrue(all(n.read_by_user for n in summary['previews']))
+    
+    def test_broadcast_invalidates_summaries(self):
+        inbox.get_summary(self.user)
+        NotificationService.broadcast_announcement('Broadcast', 'Message')
+        
+        summary = inbox.get_summary(self.user)
+        self.assertEqual(summary['unread_count'], 4)
+        self.assertEqual(summary['previews'][0].title, 'Broadcast')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.mark_read(self.user, summary['previews'][0])
+        self.assertEqual(inbox.get_summary(self.user)['unread_count'], 3)
+    
+    @override_settings(NOTIFICATION_DIGEST_TYPES=['session_completed', 'feedback_received'])
+    def test_several_rows_per_user_are_all_counted(self):
+        for notification_type in ('session_completed', 'feedback_received'):
+            NotificationService.notify(notification_type, 'Digest', 'Message', recipients=[self.user])
+        inbox.get_summary(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.send_digests()
+        
+        summary = inbox.get_summary(self.user)
+        self.assertEqual(summary['unread_count'], 5)
+        self.assertEqual(summary['unread_count'], NotificationService.get_unread_count(self.user))
+        self.assertEqual(
+            {n.notification_type for n in summary['previews'][:2]}, {'session_completed', 'feedback_received'}
+        )
+    
+    def test_edits_and_admin_actions_drop_summary(self):
+        inbox.get_summary(self.user)
+        notification = Notification.objects.filter(user=self.user).first()
+        notification.is_read = True
+        notification.save()
+        self.assertEqual(inbox.get_summary(self.user)['unread_count'], 2)
+        
+        admin = User.objects.create_superuser('inboxadmin', 'admin@example.com', 'adminpass123')
+        self.client.force_login(admin)
+        self.client.post(reverse('admin:notification_notification_changelist'), {
+            'action': 'mark_as_unread',
+            '_selected_action': [notification.pk],
+        })
+        self.assertEqual(inbox.get_summary(self.user)['unread_count'], 3)
+    
+    def test_rolled_back_notifications_never_reach_summary(self):
+        from django.db import transaction
+        inbox.get_summary(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    NotificationService.notify('announcement', 'Ghost', 'Message', recipients=[self.user])
+                    raise RuntimeError('delivery failed')
+            except RuntimeError:
+                pass
+        summary = inbox.get_summary(self.user)
+        self.assertEqual(summary['unread_count'], 3)
+        self.assertNotIn('Ghost', [n.title for n in summary['previews']])
+
+
+class RealtimeHubTests(TestCase):
+    """In-process pub/sub hub behind the SSE stream"""
+    
+    async def test_publish_reaches_only_target_users(self):
+        backend = realtime.InProcessBackend()
+        alice = backend.subscribe(1)
+        alice_tab2 = backend.subscribe(1)
+        bob = backend.subscribe(2)
+        
+        backend.publish([1], {'type': 'read_all'})
+        self.assertEqual(await alice.get(timeout=1), {'type': 'read_all'})
+        self.assertEqual(await alice_tab2.get(timeout=1), {'type': 'read_all'})
+        with self.assertRaises(asyncio.TimeoutError):
+            await bob.get(timeout=0.05)
+        
+        backend.publish(None, {'type': 'notification'})
+        self.assertEqual((await bob.get(timeout=1))['type'], 'notification')
+        
+        backend.unsubscribe(alice)
+        backend.unsubscribe(alice_tab2)
+        backend.unsubscribe(bob)
+        self.assertEqual(backend.connection_count(), 0)
+    
+    async def test_thousands_of_idle_subscribers(self):
+        backend = realtime.InProcessBackend()
+        subscriptions = [backend.subscribe(user_id) for user_id in range(5000)]
+        self.assertEqual(backend.connection_count(), 5000)
+        
+        backend.publish([4242], {'type': 'read_all'})
+        self.assertEqual(await subscriptions[4242].get(timeout=1), {'type': 'read_all'})
+        self.assertTrue(all(s.queue.empty() for s in subscriptions))
+    
+    async def test_slow_client_queue_is_bounded(self):
+        backend = realtime.InProcessBackend()
+        subscription = backend.subscribe(1)
+        for i in range(realtime.QUEUE_SIZE + 10):
+            backend.publish([1], {'type': 'read', 'id': i})
+        await asyncio.sleep(0)
+        self.assertEqual(subscription.queue.qsize(), realtime.QUEUE_SIZE)
+
+
+@override_settings(NOTIFICATION_SSE_ENABLED=True)
+class NotificationStreamTests(TransactionTestCase):
+    """SSE endpoint (TransactionTestCase so on_commit publishing fires)"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='streamuser', password='testpass123')
+        self.client = AsyncClient()
+    
+    async def read_event(self, stream):
+        chunk = await asyncio.wait_for(stream.__anext__(), 2)
+        return chunk.decode() if isinstance(chunk, bytes) else chunk
+    
+    async def test_stream_requires_login(self):
+        response = await self.client.get(reverse('notification:notification_stream'))
+        self.assertEqual(response.status_code, 302)
+    
+    @override_settings(NOTIFICATION_SSE_ENABLED=False)
+    async def test_disabled_stream_answers_once(self):
+        await self.client.aforce_login(self.user)
+        await sync_to_async(inbox.get_summary)(self.user)
+        
+        response = await self.client.get(reverse('notification:notification_stream'))
+        self.assertFalse(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = response.content.decode()
+        self.assertTrue(content.startswith(f'retry: {views.STREAM_DISABLED_RETRY_MS}\n\n'))
+        self.assertIn('"unread_count": 0', content)
+        self.assertEqual(realtime.get_backend().connection_count(), 0)
+    
+    async def test_pages_open_the_stream_only_when_enabled(self):
+        from accounts.models import UserProfile
+        await sync_to_async(UserProfile.objects.create)(user=self.user, role='student')
+        await self.client.aforce_login(self.user)
+        url = reverse('notification:notifications_list')
+        stream_url = reverse('notification:notification_stream')
+        self.assertContains(await self.client.get(url), stream_url)
+        with self.settings(NOTIFICATION_SSE_ENABLED=False):
+            self.assertNotContains(await self.client.get(url), stream_url)
+    
+    async def test_stream_pushes_new_notifications(self):
+        await self.client.aforce_login(self.user)
+        # Warm the inbox summary like a page render does
+        await sync_to_async(inbox.get_summary)(self.user)
+        
+        response = await self.client.get(reverse('notification:notification_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await self.read_event(stream)).startswith('retry:'))
+        self.assertIn('"unread_count": 0', await self.read_event(stream))
+        
+        await sync_to_async(NotificationService.notify)(
+            'announcement', 'Live', 'Pushed over SSE', recipients=[self.user]
+        )
+        event = await self.read_event(stream)
+        self.assertTrue(event.startswith('event: notification\n'))
+        data = json.loads(event.split('data: ', 1)[1])
+        self.assertEqual(data['title'], 'Live')
+        self.assertEqual(data['unread_count'], 1)
+        
+        await sync_to_async(NotificationService.mark_all_read)(self.user)
+        self.assertTrue((await self.read_event(stream)).startswith('event: read_all\n'))
+        
+        # Client disconnect: the ASGI handler cancels the pending read
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(realtime.get_backend().connection_count(), 0)
+
+
+@override_settings(
+    NOTIFICATION_COALESCE_TYPES=['feedback_received'],
+    NOTIFICATION_COALESCE_WINDOW=600,
+    NOTIFICATION_DIGEST_TYPES=['session_completed']
+)
+class NotificationCoalescingTests(TestCase):
+    """Repeated events collapse into one row; low-priority types go to the digest"""
+    
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(username=f'coalesce{i}', password='testpass123')
+            for i in range(3)
+        ]
+    
+    def feedback(self, i, session_id=1, recipients=None, object_id=1):
+        return NotificationService.notify(
+            notification_type='feedback_received',
+            title=f'Feedback {i}',
+            message=f'Student {i} rated your session',
+            recipients=recipients or self.users,
+            session_id=session_id,
+            related_object_id=object_id,
+            related_object_type='Feedback'
+        )
+    
+    def test_events_in_window_are_merged(self):
+        self.feedback(0)
+        created_at = Notification.objects.get(user=self.users[0]).created_at
+        for i in range(1, 5):
+            self.feedback(i)
+        
+        rows = Notification.objects.filter(notification_type='feedback_received')
+        self.assertEqual(rows.count(), 3)
+        for row in rows:
+            self.assertEqual(row.count, 5)
+            self.assertEqual(row.title, 'Feedback 4')
+            self.assertGreater(row.last_event_at, row.created_at)
+            self.assertEqual(row.latest_at, row.last_event_at)
+        # The first event keeps its place for inbox cursors and retention
+        self.assertEqual(Notification.objects.get(user=self.users[0]).created_at, created_at)
+        self.assertEqual(NotificationService.get_unread_count(self.users[0]), 1)
+    
+    def test_other_targets_are_not_merged(self):
+        self.feedback(0, object_id=1)
+        self.feedback(1, object_id=2)
+        self.assertEqual(Notification.objects.filter(user=self.users[0]).count(), 2)
+    
+    def test_window_follows_the_last_event(self):
+        self.feedback(0)
+        self.feedback(1)
+        Notification.objects.update(
+            created_at=timezone.now() - timedelta(minutes=30), last_event_at=timezone.now() - timedelta(minutes=5)
+        )
+        self.feedback(2)
+        self.assertEqual(Notification.objects.get(user=self.users[0]).count, 3)
+        
+        Notification.objects.update(last_event_at=timezone.now() - timedelta(minutes=11))
+        self.feedback(3)
+        self.assertEqual(Notification.objects.filter(user=self.users[0]).count(), 2)
+    
+    def test_merge_costs_constant_queries(self):
+        self.feedback(0)
+        with self.assertNumQueries(4):  # savepoint, SELECT, UPDATE, release
+            self.feedback(1)
+    
+    def test_different_session_read_or_expired_rows_are_not_merged(self):
+        self.feedback(0)
+        self.feedback(1, session_id=2)
+        self.assertEqual(Notification.objects.filter(user=self.users[0]).count(), 2)
+        
+        Notification.objects.filter(user=self.users[0], session_id=1).first().mark_as_read()
+        Notification.objects.filter(user=self.users[1], session_id=1).update(
+            created_at=timezone.now() - timedelta(minutes=11)
+        )
+        self.feedback(2)
+        
+        self.assertEqual(Notification.objects.filter(user=self.users[0], session_id=1).count(), 2)
+        self.assertEqual(Notification.objects.filter(user=self.users[1], session_id=1).count(), 2)
+        self.assertEqual(Notification.objects.get(user=self.users[2], session_id=1).count, 2)
+    
+    def test_other_types_are_not_merged(self):
+        for i in range(3):
+            NotificationService.notify('announcement', 'Same', 'Same', recipients=[self.users[0]])
+        self.assertEqual(Notification.objects.filter(user=self.users[0]).count(), 3)
+    
+    def test_merged_row_refreshes_inbox_summary(self):
+        self.feedback(0)
+        inbox.get_summary(self.users[0])
+        self.feedback(1)
+        summary = inbox.get_summary(self.users[0])
+        self.assertEqual(summary['unread_count'], 1)
+        self.assertEqual(summary['previews'][0].count, 2)
+    
+    def test_digest_batches_low_priority_types(self):
+        for i in range(4):
+            NotificationService.notify(
+                'session_completed', f'Completed {i}', 'Please give feedback', recipients=self.users[:2]
+            )
+        
+        self.assertFalse(Notification.objects.filter(notification_type='session_completed').exists())
+        self.assertEqual(NotificationDigest.objects.count(), 2)
+        self.assertEqual(NotificationDigest.objects.get(user=self.users[0]).count, 4)
+        
+        call_command('send_notification_digests', stdout=StringIO())
+        
+        self.assertFalse(NotificationDigest.objects.exists())
+        digest = Notification.objects.get(user=self.users[0], notification_type='session_completed')
+        self.assertEqual(digest.count, 4)
+        self.assertIn('Completed 3', digest.message)
+        self.assertEqual(NotificationService.send_digests(), 0)
+
+
+@override_settings(NOTIFICATION_RETENTION_DAYS={'default': 30, 'announcement': 7, 'technical_report': None})
+class NotificationRetentionTests(TestCase):
+    """Per-type retention, archival and batched purge"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='retention', password='testpass123')
+        self.now = timezone.now()
+        for notification_type, age in [
+            ('announcement', 10), ('announcement', 3),
+            ('session_confirmed', 40), ('session_confirmed', 20),
+            ('technical_report', 400),
+        ]:
+            notification = Notification.objects.create(
+                user=self.user, notification_type=notification_type, title=f'{notification_type} {age}', message='x' * 50
+            )
+            Notification.objects.filter(pk=notification.pk).update(created_at=self.now - timedelta(days=age))
+    
+    def test_policy_per_type(self):
+        expired = set(expired_notifications(self.now).values_list('title', flat=True))
+        self.assertEqual(expired, {'announcement 10', 'session_confirmed 40'})
+    
+    def test_purge_archives_in_batches(self):
+        stats = purge_notifications(batch_size=1, now=self.now)
+        
+        self.assertEqual(stats['rows'], 2)
+        self.assertEqual(stats['batches'], 2)
+        self.assertGreater(stats['bytes'], 100)
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertEqual(
+            set(ArchivedNotification.objects.values_list('title', flat=True)),
+            {'announcement 10', 'session_confirmed 40'}
+        )
+    
+    def test_dry_run_and_no_archive(self):
+        stats = purge_notifications(dry_run=True, now=self.now)
+        self.assertEqual(stats['rows'], 2)
+        self.assertEqual(Notification.objects.count(), 5)
+        
+        purge_notifications(archive=False, now=self.now)
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertFalse(ArchivedNotification.objects.exists())
+    
+    def test_purge_refreshes_inbox_summary(self):
+        self.assertEqual(inbox.get_summary(self.user)['unread_count'], 5)
+        purge_notifications(now=self.now)
+        self.assertEqual(inbox.get_summary(self.user)['unread_count'], 3)
+    
+    def test_command_reports_rows_and_bytes(self):
+        out = StringIO()
+        call_command('purge_notifications', '--batch-size', '10', stdout=out)
+        self.assertIn('Purged 2 notification(s)', out.getvalue())
+        self.assertIn('bytes', out.getvalue())
+
+
+class InboxPaginationTests(TestCase):
+    """Keyset-paginated inbox page and JSON feed"""
+    
+    def setUp(self):
+        cache.clear()
+        from accounts.models import UserProfile
+        self.user = User.objects.create_user(username='pager', password='testpass123')
+        UserProfile.objects.create(user=self.user, role='student')
+        self.other = User.objects.create_user(username='pager2', password='testpass123')
+        for i in range(6):
+            NotificationService.notify('session_confirmed', f'Personal {i}', 'Message', recipients=[self.user])
+            NotificationService.notify('session_confirmed', f'Other {i}', 'Message', recipients=[self.other])
+            NotificationService.broadcast_announcement(f'Broadcast {i}', 'Message')
+        # Same timestamp for everything: pages must still be stable thanks to the id tie-break
+        Notification.objects.update(created_at=timezone.now())
+        self.client.login(username='pager', password='testpass123')
+    
+    def feed(self, **params):
+        return self.client.get(reverse('notification:notifications_feed'), params).json()
+    
+    def test_feed_walks_every_item_once(self):
+        seen, cursor = [], None
+        while True:
+            data = self.feed(limit=5, **({'before': cursor} if cursor else {}))
+            seen += [n['title'] for n in data['notifications']]
+            cursor = data['next_cursor']
+            if not data['has_more']:
+                break
+        
+        self.assertEqual(len(seen), 12)
+        self.assertEqual(len(set(seen)), 12)
+        self.assertFalse(any(title.startswith('Other') for title in seen))
+    
+    def test_since_returns_newer_items(self):
+        latest = self.feed(limit=1)['notifications'][0]
+        self.assertEqual(self.feed(since=latest['cursor'])['notifications'], [])
+        
+        NotificationService.notify('session_confirmed', 'Newest', 'Message', recipients=[self.user])
+        data = self.feed(since=latest['cursor'])
+        self.assertEqual([n['title'] for n in data['notifications']], ['Newest'])
+    
+    def test_type_and_unread_filters(self):
+        data = self.feed(type='announcement', limit=100)
+        self.assertEqual(len(data['notifications']), 6)
+        self.assertTrue(all(n['is_broadcast'] for n in data['notifications']))
+        
+        NotificationService.mark_all_read(self.user)
+        self.assertEqual(self.feed(unread=1)['notifications'], [])
+    
+    def test_invalid_parameters(self):
+        url = reverse('notification:notifications_feed')
+        self.assertEqual(self.client.get(url, {'before': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'type': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': 'x'}).status_code, 400)
+    
+    def test_page_is_one_query(self):
+        with self.assertNumQueries(1):
+            items, has_more = NotificationService.get_inbox_page(self.user, limit=5)
+        self.assertEqual(len(items), 5)
+        self.assertTrue(has_more)
+    
+    def test_inbox_page_links_to_older_items(self):
+        response = self.client.get(reverse('notification:notifications_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['notifications']), 12)
+        self.assertIsNone(response.context['next_cursor'])
+        
+        for i in range(20):
+            NotificationService.notify('session_confirmed', f'More {i}', 'Message', recipients=[self.user])
+        response = self.client.get(reverse('notification:notifications_list'))
+        self.assertEqual(len(response.context['notifications']), 20)
+        
+        response = self.client.get(reverse('notification:notifications_list'), {'before': response.context['next_cursor']})
+        self.assertEqual(len(response.context['notifications']), 12)
+        self.assertFalse(response.context['is_first_page'])
+
+
+@override_settings(NOTIFICATION_EMAIL_TYPES=['session_cancelled'])
+class OutboxDispatchTests(TestCase):
+    """Transactional outbox: claim, deliver, retry, idempotency"""
+    
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(username=f'outbox{i}', email=f'outbox{i}@example.com', password='pass123')
+            for i in range(3)
+        ]
+    
+    def enqueue(self, key='session:1:cancelled', notification_type='session_cancelled'):
+        outbox.enqueue(notification_type, 'Session Cancelled', 'CO3001 is cancelled.', self.users, key=key, session_id=1)
+    
+    def test_enqueue_is_idempotent(self):
+        self.enqueue()
+        self.enqueue()
+        self.assertEqual(OutboxMessage.objects.filter(channel='in_app').count(), 1)
+        self.assertEqual(OutboxMessage.objects.filter(channel='email').count(), 3)
+        
+        self.enqueue(key='feedback:1:created', notification_type='feedback_received')
+        self.assertEqual(OutboxMessage.objects.filter(idempotency_key__startswith='feedback').count(), 1)
+    
+    def test_dispatch_delivers_in_app_and_email(self):
+        self.enqueue()
+        stats = outbox.dispatch_batch()
+        
+        self.assertEqual(stats, {'claimed': 4, 'delivered': 4, 'retried': 0, 'failed': 0, 'deferred': 0})
+        self.assertEqual(Notification.objects.filter(notification_type='session_cancelled').count(), 3)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [u.email for u in self.users])
+        self.assertFalse(OutboxMessage.objects.exclude(status='done').exists())
+        
+        # Nothing left to claim: delivered rows are never delivered twice
+        self.assertEqual(outbox.dispatch_batch()['claimed'], 0)
+        self.assertEqual(Notification.objects.count(), 3)
+    
+    def test_failed_delivery_is_retried_then_given_up(self):
+        self.enqueue()
+        with mock.patch.dict(outbox.CHANNELS, {'in_app': mock.Mock(side_effect=RuntimeError('boom'))}):
+            stats = outbox.dispatch_batch()
+        self.assertEqual(stats['retried'], 1)
+        row = OutboxMessage.objects.get(channel='in_app')
+        self.assertEqual((row.status, row.attempts), ('pending', 1))
+        self.assertIn('boom', row.last_error)
+        self.assertGreater(row.available_at, timezone.now())
+        self.assertFalse(Notification.objects.exists())
+        
+        # Backoff elapsed: the retry succeeds
+        OutboxMessage.objects.update(available_at=timezone.now())
+        outbox.dispatch_batch()
+        self.assertEqual(OutboxMessage.objects.get(channel='in_app').status, 'done')
+        self.assertEqual(Notification.objects.count(), 3)
+        
+        self.enqueue(key='session:2:cancelled')
+        failing = mock.Mock(side_effect=RuntimeError('down'))
+        with mock.patch.dict(outbox.CHANNELS, {'in_app': failing}):
+            for _ in range(outbox.MAX_ATTEMPTS):
+                OutboxMessage.objects.filter(status='pending').update(available_at=timezone.now())
+                outbox.dispatch_batch()
+        self.assertEqual(OutboxMessage.objects.get(idempotency_key='session:2:cancelled:in_app').status, 'failed')
+    
+    def test_abandoned_claims_are_reclaimed(self):
+        self.enqueue()
+        outbox.claim_batch('crashed-worker')
+        self.assertEqual(outbox.dispatch_batch()['claimed'], 0)
+        
+        OutboxMessage.objects.update(claimed_at=timezone.now() - timedelta(seconds=outbox.LEASE_SECONDS + 1))
+        self.assertEqual(outbox.dispatch_batch()['delivered'], 4)
+    
+    def test_lost_lease_rolls_back_the_delivery(self):
+        self.enqueue()
+        
+        def deliver_late(payload):
+            outbox.deliver_in_app(payload)
+            # The lease ran out meanwhile and another worker claimed the row
+            OutboxMessage.objects.filter(channel='in_app').update(claimed_by='other-worker')
+        
+        with mock.patch.dict(outbox.CHANNELS, {'in_app': deliver_late}):
+            stats = outbox.dispatch_batch()
+        self.assertEqual(stats['delivered'], 3)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(OutboxMessage.objects.get(channel='in_app').status, 'processing')
+        
+        message = OutboxMessage.objects.filter(channel='email').first()
+        with self.assertRaises(outbox.LeaseLost):
+            outbox._fail(message, 'not-the-owner', RuntimeError('boom'))
+    
+    def test_command_drains_once(self):
+        self.enqueue()
+        out = StringIO()
+        call_command('dispatch_outbox', '--once', stdout=out)
+        self.assertIn('Delivered 4', out.getvalue())
+
+
+class CountingEmailBackend(LocmemEmailBackend):
+    """locmem backend recording how many connections (send_messages calls) were used"""
+    connections = 0
+    
+    def send_messages(self, messages):
+        CountingEmailBackend.connections += 1
+        return super().send_messages(messages)
+
+
+@override_settings(
+    NOTIFICATION_EMAIL_TYPES=['session_cancelled'],
+    EMAIL_BACKEND='notification.tests.CountingEmailBackend',
+)
+class BulkEmailDeliveryTests(TestCase):
+    """Email rows of a batch share one connection; destination domains are rate limited"""
+    
+    def setUp(self):
+        cache.clear()
+        CountingEmailBackend.connections = 0
+    
+    def create_users(self, count, domain='example.com'):
+        return User.objects.bulk_create([
+            User(username=f'mail{domain}{i}', first_name=f'Student{i}', email=f'mail{i}@{domain}')
+            for i in range(count)
+        ])
+    
+    def test_batch_uses_one_connection(self):
+        users = self.create_users(150)
+        outbox.enqueue('session_cancelled', 'Session Cancelled', 'CO3001 is cancelled.', users,
+                       key='session:1:cancelled', action_url='/sessions/')
+        
+        stats = outbox.dispatch_batch(batch_size=200)
+        
+        self.assertEqual(stats['delivered'], 151)
+        self.assertEqual(CountingEmailBackend.connections, 1)
+        self.assertEqual(len(mail.outbox), 150)
+        self.assertIn('Student0', mail.outbox[0].body)
+        self.assertIn('http://127.0.0.1:8000/sessions/', mail.outbox[0].body)
+    
+    def test_templates_are_compiled_once(self):
+        mailer.body_template.cache_clear()
+        users = self.create_users(20)
+        outbox.enqueue('session_cancelled', 'Session Cancelled', 'Cancelled.', users, key='session:2:cancelled')
+        outbox.dispatch_batch()
+        info = mailer.body_template.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 19))
+    
+    def test_rate_limited_domain_is_deferred(self):
+        users = self.create_users(5, domain='slow.example') + self.create_users(3)
+        with override_settings(NOTIFICATION_EMAIL_RATE_LIMITS={'default': None, 'slow.example': 2}):
+            outbox.enqueue('session_cancelled', 'Session Cancelled', 'Cancelled.', users, key='session:3:cancelled')
+            stats = outbox.dispatch_batch()
+        
+        self.assertEqual((stats['delivered'], stats['deferred']), (1 + 2 + 3, 3))
+        self.assertEqual(len(mail.outbox), 5)
+        deferred = OutboxMessage.objects.filter(status='pending')
+        self.assertEqual(deferred.count(), 3)
+        # Waiting for the limit is not a failed attempt
+        self.assertFalse(deferred.exclude(attempts=0).exists())
+        self.assertTrue(all(row.available_at > timezone.now() for row in deferred))
+    
+    def test_connection_error_retries_the_batch(self):
+        users = self.create_users(3)
+        outbox.enqueue('session_cancelled', 'Session Cancelled', 'Cancelled.', users, key='session:4:cancelled')
+        with mock.patch.object(CountingEmailBackend, 'send_messages', side_effect=OSError('refused')):
+            stats = outbox.dispatch_batch()
+        self.assertEqual((stats['delivered'], stats['retried']), (1, 3))
+        self.assertIn('refused', OutboxMessage.objects.filter(channel='email').first().last_error)
+    
+    def test_token_bucket_refills(self):
+        now = [0.0]
+        limiter = mailer.DomainRateLimiter({'hcmut.edu.vn': 60}, clock=lambda: now[0])
+        for _ in range(60):
+            self.assertEqual(limiter.acquire('hcmut.edu.vn'), 0)
+        self.assertAlmostEqual(limiter.acquire('hcmut.edu.vn'), 1.0)
+        now[0] = 1.0
+        self.assertEqual(limiter.acquire('hcmut.edu.vn'), 0)
+        self.assertEqual(limiter.acquire('other.com'), 0)
+
+
+class NotificationFanOutBenchmarkTests(TestCase):
+    """Benchmark: fan-out cost must not grow with the number of recipients"""
+    
+    def create_observers(self, count, session_id):
+        """Create `count` users observing session_completed on a session"""
+        users = User.objects.bulk_create([
+            User(username=f'observer{session_id}_{i}') for i in range(count)
+        ])
+        NotificationObserver.objects.bulk_create([
+            NotificationObserver(user=user, event_type='session_completed', session_id=session_id)
+            for user in users
+        ])
+    
+    def notify_session(self, session_id):
+        return NotificationService.notify(
+            notification_type='session_completed',
+            title='Session Completed',
+            message='Please provide feedback',
+            session_id=session_id
+        )
+    
+    def batch_size(self, count):
+        """Rows per INSERT: NOTIFICATION_BATCH_SIZE capped by the backend's parameter limit"""
+        from django.conf import settings
+        from django.db import connection
+        fields = [f for f in Notification._meta.concrete_fields if not f.primary_key]
+        return min(settings.NOTIFICATION_BATCH_SIZE, connection.ops.bulk_batch_size(fields, [None] * count))
+    
+    def test_constant_query_count(self):
+        """Test the query count does not depend on the number of recipients within a batch"""
+        size = self.batch_size(2000)
+        self.create_observers(1, session_id=1)
+        self.create_observers(size, session_id=2)
+        
+        # 1 SELECT of observer user IDs + 1 INSERT, no per-user query
+        with self.assertNumQueries(2):
+            self.notify_session(1)
+        with self.assertNumQueries(2):
+            notifications = self.notify_session(2)
+        
+        self.assertEqual(len(notifications), size)
+        self.assertTrue(all(n.pk for n in notifications))
+    
+    def test_2000_observers(self):
+        """Test 2,000 observers cost one INSERT per batch instead of ~4,000 queries"""
+        import math
+        self.create_observers(2000, session_id=3)
+        
+        with self.assertNumQueries(1 + math.ceil(2000 / self.batch_size(2000))):
+            self.notify_session(3)
+        
+        self.assertEqual(Notification.objects.filter(session_id=3).count(), 2000)
+    
+    def test_batch_size_setting(self):
+        """Test NOTIFICATION_BATCH_SIZE bounds each INSERT"""
+        self.create_observers(50, session_id=4)
+        
+        with self.settings(NOTIFICATION_BATCH_SIZE=10):
+            with self.assertNumQueries(1 + 5):
+                self.notify_session(4)
@@ -8,4 +8,6 @@ urlpatterns = [
     path('', views.notifications_list, name='notifications_list'),
     path('<int:notification_id>/read/', views.mark_notification_read, name='mark_notification_read'),
     path('mark-all-read/', views.mark_all_read, name='mark_all_read'),
+    path('stream/', views.notification_stream, name='notification_stream'),
+    path('feed/', views.notifications_feed, name='notifications_feed'),
 ]
\ No newline at end of file
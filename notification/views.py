@@ -1,15 +1,37 @@
 # notification/views.py
+import asyncio
+import json
+
+from django.conf import settings
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
+from . import inbox, realtime
 from .models import Notification
 from .notification_service import NotificationService
 
+INBOX_PAGE_SIZE = 20
+FEED_MAX_LIMIT = 100
+# Inbox filter tabs -> (unread_only, notification types)
+INBOX_FILTERS = {
+    'all': (False, None),
+    'unread': (True, None),
+    'session_request': (False, ['session_request']),
+    'announcement': (False, ['announcement']),
+}
+
+# Comment line sent on idle streams so proxies keep the connection open
+STREAM_KEEPALIVE_SECONDS = 20
+# Browser reconnection delay after the stream drops
+STREAM_RETRY_MS = 5000
+# Reconnection delay sent by the one-shot answer when streaming is disabled
+STREAM_DISABLED_RETRY_MS = 5 * 60 * 1000
+
 
 @login_required
 def notifications_list(request):
-    """View to display all notifications, setting the correct base template based on user role"""
+    """View to display the inbox one page at a time, setting the correct base template based on user role"""
     # 🔥 Select base template based on role
     if request.user.userprofile.role == 'tutor':
         base_template = 'tutor_base.html'
@@ -18,14 +40,91 @@ def notifications_list(request):
         base_template = 'student_base.html'
         dashboard_url = 'students:student_dashboard'
     
-    notifications = NotificationService.get_user_notifications(request.user)
-    unread_count = NotificationService.get_unread_count(request.user)
+    active_filter = request.GET.get('filter', 'all')
+    if active_filter not in INBOX_FILTERS:
+        active_filter = 'all'
+    unread_only, types = INBOX_FILTERS[active_filter]
+    before = request.GET.get('before')
+    
+    try:
+        notifications, has_more = NotificationService.get_inbox_page(
+            request.user, before=before, types=types, unread_only=unread_only, limit=INBOX_PAGE_SIZE
+        )
+    except ValueError:
+        # Stale or tampered cursor: start again from the latest notifications
+        before = None
+        notifications, has_more = NotificationService.get_inbox_page(
+            request.user, types=types, unread_only=unread_only, limit=INBOX_PAGE_SIZE
+        )
     
     return render(request, 'notification/notifications.html', {
         'notifications': notifications,
-        'unread_count': unread_count,
+        'unread_count': inbox.get_summary(request.user)['unread_count'],
         'base_template': base_template,
         'dashboard_url': dashboard_url,
+        'active_filter': active_filter,
+        'is_first_page': not before,
+        'next_cursor': NotificationService.encode_cursor(notifications[-1]) if has_more else None,
+    })
+
+
+def _feed_item(notification):
+    return {
+        'id': notification.id,
+        'notification_type': notification.notification_type,
+        'type_display': notification.get_notification_type_display(),
+        'title': notification.title,
+        'message': notification.message,
+        'action_url': notification.action_url,
+        'is_broadcast': notification.is_broadcast,
+        'is_read': notification.read_by_user,
+        'count': notification.count,
+        'created_at': notification.created_at.isoformat(),
+        'cursor': NotificationService.encode_cursor(notification),
+    }
+
+
+@login_required
+@require_GET
+def notifications_feed(request):
+    """
+    Inbox as JSON, keyset-paginated on (created_at, id).
+    ?before=<cursor> older items (newest first), ?since=<cursor> newer items (oldest first),
+    ?type=<notification_type> (repeatable), ?unread=1, ?limit= (1-100)
+    """
+    before = request.GET.get('before')
+    since = request.GET.get('since')
+    if before and since:
+        return JsonResponse({'success': False, 'error': 'Use either before or since'}, status=400)
+    
+    try:
+        limit = min(max(int(request.GET.get('limit', INBOX_PAGE_SIZE)), 1), FEED_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid limit'}, status=400)
+    
+    types = request.GET.getlist('type')
+    valid_types = dict(Notification.NOTIFICATION_TYPES)
+    if any(t not in valid_types for t in types):
+        return JsonResponse({'success': False, 'error': 'Invalid type'}, status=400)
+    
+    try:
+        items, has_more = NotificationService.get_inbox_page(
+            request.user,
+            before=before,
+            since=since,
+            types=types or None,
+            unread_only=request.GET.get('unread') in ('1', 'true'),
+            limit=limit
+        )
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor'}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'notifications': [_feed_item(n) for n in items],
+        'has_more': has_more,
+        # Pass back as ?before= (or ?since= when polling) to continue
+        'next_cursor': NotificationService.encode_cursor(items[-1]) if items else (since or before),
     })
 
 
@@ -35,13 +134,12 @@ def mark_notification_read(request, notification_id):
     """Mark a notification as read"""
     try:
         notification = Notification.objects.get(id=notification_id)
-        # Check if the notification belongs to the user or is a broadcast
-        if notification.user == request.user or notification.is_broadcast:
-            notification.mark_as_read()
+        # Personal notifications must belong to the user; broadcasts are read per user
+        if NotificationService.mark_read(request.user, notification):
             return JsonResponse({'success': True})
     except Notification.DoesNotExist:
         pass
-    # Return 404 if not found or unauthorized (though unauthorized check is implicit via notification.user)
+    # Return 404 if not found or unauthorized
     return JsonResponse({'success': False}, status=404)
 
 
@@ -49,6 +147,59 @@ def mark_notification_read(request, notification_id):
 @require_POST
 def mark_all_read(request):
     """Mark all notifications as read for the current user"""
-    # Only update notifications explicitly addressed to the current user
-    Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
-    return JsonResponse({'success': True})
\ No newline at end of file
+    # Personal notifications + the user's broadcast watermark
+    NotificationService.mark_all_read(request.user)
+    return JsonResponse({'success': True})
+
+def _sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+async def _event_stream(user_id):
+    """
+    Wait on the pub/sub hub and forward events to the browser.
+    Idle connections only cost a coroutine and a queue; the unread count comes
+    from the cached inbox summary, never from the database.
+    """
+    backend = realtime.get_backend()
+    subscription = backend.subscribe(user_id)
+    try:
+        yield f'retry: {STREAM_RETRY_MS}\n\n'
+        summary = await inbox.apeek(user_id)
+        if summary is not None:
+            yield _sse('unread', {'unread_count': summary['unread_count']})
+        while True:
+            try:
+                event = await subscription.get(timeout=STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            summary = await inbox.apeek(user_id)
+            if summary is not None:
+                event = dict(event, unread_count=summary['unread_count'])
+            yield _sse(event['type'], event)
+    finally:
+        backend.unsubscribe(subscription)
+
+
+@login_required
+@require_GET
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of the user's notifications (serve through config.asgi).
+    Unless settings.NOTIFICATION_SSE_ENABLED says so, the request may be held by a
+    WSGI worker: answer once with the unread count and a long retry delay instead.
+    """
+    user = await request.auser()
+    if not getattr(settings, 'NOTIFICATION_SSE_ENABLED', False):
+        body = f'retry: {STREAM_DISABLED_RETRY_MS}\n\n'
+        summary = await inbox.apeek(user.pk)
+        if summary is not None:
+            body += _sse('unread', {'unread_count': summary['unread_count']})
+        response = HttpResponse(body, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        return response
+    response = StreamingHttpResponse(_event_stream(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # disable nginx buffering
+    return response
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from tutoring_sessions.models import Session, Enrollment, AdvisingSession
+
+
+def active_session_ids(student):
+    """Subquery of the sessions the student is actively enrolled in (never evaluated in Python)"""
+    return Enrollment.objects.filter(
+        student=student,
+        is_active=True
+    ).values('session_id')
+
+
+def get_today_sessions(student, today):
+    """Enrolled 'scheduled'/'ongoing' sessions that meet on today's weekday, ordered by time"""
+    return Session.objects.filter(
+        Session.weekday_q(today.weekday()),
+        id__in=active_session_ids(student),
+        status__in=['scheduled', 'ongoing']
+    ).select_related('subject', 'tutor').order_by('start_time')
+
+
+def get_upcoming_advising(student, today, days=7):
+    """Active advising sessions of the student's classes within the next `days` days"""
+    return AdvisingSession.objects.filter(
+        main_session_id__in=active_session_ids(student),
+        date__gte=today,
+        date__lte=today + timedelta(days=days),
+        is_active=True
+    ).select_related('main_session', 'main_session__subject', 'tutor').order_by('date', 'start_time')
+
+
+def get_dashboard_data(student, today):
+    """Everything the student dashboard renders: one query per list"""
+    return {
+        'today_sessions': list(get_today_sessions(student, today)),
+        'upcoming_advising': list(get_upcoming_advising(student, today)),
+    }
@@ -1,3 +1,91 @@
+from datetime import time, timedelta
+from django.core.cache import cache
 from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import UserProfile
+from tutors.models import Tutor
+from tutoring_sessions.models import Subject, Session, Enrollment, AdvisingSession
+from .models import Student
+from .selectors import get_dashboard_data
 
-# Create your tests here.
+
+class StudentDashboardQueryTests(TestCase):
+    """Query budgets for the student dashboard"""
+    
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.today = timezone.now().date()
+        self.user = User.objects.create_user(username='student1', password='testpass123')
+        UserProfile.objects.create(user=self.user, role='student')
+        self.student = Student.objects.create(user=self.user, full_name='Test Student', student_id='ST001')
+        
+        tutor_user = User.objects.create_user(username='tutor1', password='testpass123')
+        self.tutor = Tutor.objects.create(user=tutor_user, full_name='Test Tutor', tutor_id='TU001')
+        self.subject = Subject.objects.create(name='Mathematics', code='MATH101')
+        self.client.login(username='student1', password='testpass123')
+    
+    def enroll(self, count):
+        """Enroll the student in `count` sessions meeting today, each with an advising session"""
+        today_code = str(self.today.weekday())
+        for i in range(count):
+            session = Session.objects.create(
+                class_code=f'MATH101-{i}',
+                subject=self.subject,
+                tutor=self.tutor,
+                days=today_code,
+                start_time=time(7 + i % 12, 0),
+                end_time=time(8 + i % 12, 0),
+                status='ongoing'
+            )
+            Enrollment.objects.create(student=self.student, session=session)
+            AdvisingSession.objects.create(
+                main_session=session,
+                tutor=self.tutor,
+                date=self.today + timedelta(days=1),
+                start_time=time(14, 0),
+                end_time=time(15, 0)
+            )
+    
+    def test_selector_filters_in_sql(self):
+        """Test weekday, status and enrollment filtering"""
+        self.enroll(3)
+        other_day = str((self.today.weekday() + 1) % 7)
+        Session.objects.filter(class_code='MATH101-0').update(days=other_day)
+        Session.objects.filter(class_code='MATH101-1').update(status='cancelled')
+        Enrollment.objects.filter(session__class_code='MATH101-2').update(is_active=False)
+        Session.objects.create(
+            class_code='NAMED', subject=self.subject, tutor=self.tutor,
+            days=Session.DAY_CHOICES[self.today.weekday()][1],
+            start_time=time(7, 0), end_time=time(8, 0), status='scheduled'
+        )
+        Enrollment.objects.create(student=self.student, session=Session.objects.get(class_code='NAMED'))
+        
+        with self.assertNumQueries(2):
+            data = get_dashboard_data(self.student, self.today)
+        
+        self.assertEqual([s.class_code for s in data['today_sessions']], ['NAMED'])
+        self.assertEqual(len(data['upcoming_advising']), 2)
+    
+    def test_dashboard_query_budget(self):
+        """Test the dashboard page stays within its query budget"""
+        self.enroll(1)
+        # Cold inbox cache: 3 notification queries from the context processor
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse('students:student_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        # Steady state: session, user, student + the 2 dashboard queries
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('students:student_dashboard'))
+        self.assertEqual(response.status_code, 200)
+    
+    def test_dashboard_queries_constant_at_50_enrollments(self):
+        """Benchmark: 50 enrollments cost the same number of queries as one"""
+        self.enroll(50)
+        self.client.get(reverse('students:student_dashboard'))
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('students:student_dashboard'))
+        self.assertEqual(len(response.context['today_sessions']), 50)
+        self.assertEqual(len(response.context['upcoming_advising']), 50)
@@ -1,12 +1,13 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from .models import Student
-from tutoring_sessions.models import Session, Enrollment, SessionMaterial, AdvisingSession
+from tutoring_sessions.models import Session, Enrollment, SessionMaterial
 from .forms import AvatarUpdateForm, SupportNeedsUpdateForm
+from .selectors import get_dashboard_data
 from django.http import JsonResponse
+from accounts.avatars import schedule_avatar_processing
 from django.contrib import messages
 from django.utils import timezone
-from datetime import timedelta
 from django.db.models import Q, F
 
 @login_required
@@ -20,59 +21,15 @@ def dashboard(request):
     
     today = timezone.now().date()
     
-    # Map Python weekday to database format
-    weekday_map = {
-        0: 'Monday',    # Monday
-        1: 'Tuesday',   # Tuesday
-        2: 'Wednesday', # Wednesday
-        3: 'Thursday',  # Thursday
-        4: 'Friday',    # Friday
-        5: 'Saturday',  # Saturday
-        6: 'Sunday',    # Sunday
-    }
-    
-    today_code = weekday_map[today.weekday()]
-    
-    # Get sessions that the student has enrolled in
-    enrolled_sessions = Enrollment.objects.filter(
-        student=student,
-        is_active=True
-    ).select_related('session', 'session__subject', 'session__tutor')
-    
-    # Filter today's sessions
-    today_sessions = []
-    for enrollment in enrolled_sessions:
-        session = enrollment.session
-        # Only show sessions that are 'scheduled' or 'ongoing'
-        if session.status in ['scheduled', 'ongoing']:
-            days_list = session.days.split('-')
-            if today_code in days_list:
-                today_sessions.append(session)
-    
-    # Sort by time
-    today_sessions.sort(key=lambda x: x.start_time)
-    
-    # Get advising sessions for the classes the student has enrolled in
-    # Only retrieve advising sessions within the next 7 days
-    next_week = today + timedelta(days=7)
-    
-    # Get a list of session IDs that the student has enrolled in
-    enrolled_session_ids = [e.session.id for e in enrolled_sessions]
-    
-    # Get advising sessions
-    upcoming_advising = AdvisingSession.objects.filter(
-        main_session_id__in=enrolled_session_ids,
-        date__gte=today,
-        date__lte=next_week,
-        is_active=True
-    ).select_related('main_session', 'main_session__subject', 'tutor').order_by('date', 'start_time')
+    # Filtering by weekday/status/enrollment is done in SQL by the selectors
+    dashboard_data = get_dashboard_data(student, today)
     
     # Session colors
     colors = ['blue', 'green', 'mint', 'pink', 'peach', 'purple', 'orange', 'teal']
     
     context = {
-        'today_sessions': today_sessions,
-        'upcoming_advising': upcoming_advising,
+        'today_sessions': dashboard_data['today_sessions'],
+        'upcoming_advising': dashboard_data['upcoming_advising'],
         'colors': colors,
         'today': today,
     }
@@ -111,10 +68,13 @@ def session_material(request, session_id):
 def update_avatar(request):
     if request.method == 'POST':
         student = request.user.student
+        old_avatar = student.avatar.name
         form = AvatarUpdateForm(request.POST, request.FILES, instance=student)
         
         if form.is_valid():
             form.save()
+            # Strip metadata and build the sidebar/profile renditions in the background
+            schedule_avatar_processing(student.avatar, old_avatar)
             return JsonResponse({
                 'success': True,
                 'avatar_url': student.avatar.url if student.avatar else None
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Subject, Tutor, Student, Session, Enrollment, SessionMaterial, AdvisingSession
+from .models import Subject, Tutor, Student, Session, Enrollment, SessionMaterial, AdvisingSession, AdvisingSeries, Holiday, SessionRecommendation
 
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
@@ -23,7 +23,26 @@ admin.site.register(SessionMaterial)
 class AdvisingSessionAdmin(admin.ModelAdmin):
     list_display = (
         'main_session', 'tutor', 'date',
-        'start_time', 'end_time', 'is_active'
+        'start_time', 'end_time', 'series', 'is_active'
     )
     list_filter = ('is_active', 'date', 'tutor')
-    search_fields = ('main_session__class_code', 'tutor__user__username')
\ No newline at end of file
+    search_fields = ('main_session__class_code', 'tutor__user__username')
+
+@admin.register(AdvisingSeries)
+class AdvisingSeriesAdmin(admin.ModelAdmin):
+    list_display = (
+        'main_session', 'tutor', 'weekdays', 'start_date',
+        'until', 'start_time', 'end_time', 'is_active'
+    )
+    list_filter = ('is_active', 'tutor')
+    search_fields = ('main_session__class_code', 'tutor__user__username')
+
+@admin.register(Holiday)
+class HolidayAdmin(admin.ModelAdmin):
+    list_display = ('date', 'name')
+    search_fields = ('name',)
+
+@admin.register(SessionRecommendation)
+class SessionRecommendationAdmin(admin.ModelAdmin):
+    list_display = ('student', 'rank', 'session', 'score', 'computed_at')
+    search_fields = ('student__full_name', 'session__class_code')
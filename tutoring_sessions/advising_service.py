@@ -0,0 +1,187 @@
+from datetime import timedelta
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AdvisingSeries, AdvisingSession, Holiday, Session
+from .timetable import touch_timetables
+
+
+class AdvisingSeriesService:
+    """
+    Recurring advising sessions.
+    A series is expanded in memory, conflict-checked as a whole and written
+    with a single bulk_create; edits and cancellations hit every future
+    occurrence with one UPDATE.
+    """
+
+    # Hard cap so a typo in "until" cannot generate years of rows
+    MAX_OCCURRENCES = 100
+
+    @staticmethod
+    def expand_dates(start_date, until, weekdays: Iterable[int], skip_dates: Iterable = ()):
+        """Return every date in [start_date, until] falling on one of the weekdays"""
+        weekdays = set(weekdays)
+        skip_dates = set(skip_dates)
+        dates = []
+        current = start_date
+        while current <= until:
+            if current.weekday() in weekdays and current not in skip_dates:
+                dates.append(current)
+            current += timedelta(days=1)
+        return dates
+
+    @staticmethod
+    def find_conflicts(tutor, dates: List, start_time, end_time, exclude_series: Optional[AdvisingSeries] = None):
+        """
+        Return the dates on which the tutor is already busy between start_time and end_time.
+        Two queries regardless of the number of dates: advising sessions on those
+        dates, and weekly sessions overlapping the time window.
+        """
+        if not dates:
+            return []
+
+        advising = AdvisingSession.objects.filter(
+            tutor=tutor,
+            is_active=True,
+            date__in=dates,
+            start_time__lt=end_time,
+            end_time__gt=start_time
+        )
+        if exclude_series is not None:
+            advising = advising.exclude(series=exclude_series)
+        busy = set(advising.values_list('date', flat=True))
+
+        busy_weekdays = set()
+        weekly_sessions = Session.objects.filter(
+            tutor=tutor,
+            status__in=['scheduled', 'ongoing'],
+            start_time__lt=end_time,
+            end_time__gt=start_time
+        ).only('days')
+        for session in weekly_sessions:
+            busy_weekdays |= session.get_weekdays()
+
+        return sorted(d for d in dates if d in busy or d.weekday() in busy_weekdays)
+
+    @staticmethod
+    def create_series(
+        main_session: Session,
+        start_date,
+        until,
+        weekdays: Iterable[int],
+        start_time,
+        end_time,
+        location: str = "",
+        notes: str = ""
+    ):
+        """
+        Create a series and all of its occurrences.
+        Raises ValueError when the rule is empty, invalid, too long, or conflicts with the tutor's timetable.
+        """
+        try:
+            weekdays = sorted(set(int(d) for d in weekdays))
+        except (TypeError, ValueError):
+            raise ValueError('Invalid weekday selection.')
+        if not weekdays:
+            raise ValueError('Please select at least one weekday.')
+        if any(d < 0 or d > 6 for d in weekdays):
+            raise ValueError('Invalid weekday selection.')
+        if start_time >= end_time:
+            raise ValueError('The end time must be after the start time.')
+        if until < start_date:
+            raise ValueError('The end date must be after the start date.')
+
+        holidays = Holiday.objects.filter(
+            date__gte=start_date,
+            date__lte=until
+        ).values_list('date', flat=True)
+        dates = AdvisingSeriesService.expand_dates(start_date, until, weekdays, holidays)
+
+        if not dates:
+            raise ValueError('The recurrence rule does not produce any date.')
+        if len(dates) > AdvisingSeriesService.MAX_OCCURRENCES:
+            raise ValueError(
+                f'A series cannot have more than {AdvisingSeriesService.MAX_OCCURRENCES} sessions.'
+            )
+
+        tutor = main_session.tutor
+        conflicts = AdvisingSeriesService.find_conflicts(tutor, dates, start_time, end_time)
+        if conflicts:
+            raise ValueError(
+                'Schedule conflict on: ' + ', '.join(d.strftime('%d/%m/%Y') for d in conflicts)
+            )
+
+        with transaction.atomic():
+            series = AdvisingSeries.objects.create(
+                main_session=main_session,
+                tutor=tutor,
+                weekdays="-".join(str(d) for d in weekdays),
+                start_date=start_date,
+                until=until,
+                start_time=start_time,
+                end_time=end_time,
+                location=location,
+                notes=notes,
+            )
+            AdvisingSession.objects.bulk_create([
+                AdvisingSession(
+                    main_session=main_session,
+                    tutor=tutor,
+                    series=series,
+                    date=d,
+                    start_time=start_time,
+                    end_time=end_time,
+                    location=location,
+                    notes=notes,
+                )
+                for d in dates
+            ])
+        # bulk_create/update() bypass the post_save signals
+        touch_timetables()
+        return series
+
+    @staticmethod
+    def update_series(series: AdvisingSeries, start_time, end_time, location: str = "", notes: str = ""):
+        """Apply new time/location/notes to every upcoming occurrence of the series"""
+        if start_time >= end_time:
+            raise ValueError('The end time must be after the start time.')
+        today = timezone.now().date()
+        upcoming = series.occurrences.filter(date__gte=today, is_active=True)
+
+        if (start_time, end_time) != (series.start_time, series.end_time):
+            dates = list(upcoming.values_list('date', flat=True))
+            conflicts = AdvisingSeriesService.find_conflicts(
+                series.tutor, dates, start_time, end_time, exclude_series=series
+            )
+            if conflicts:
+                raise ValueError(
+                    'Schedule conflict on: ' + ', '.join(d.strftime('%d/%m/%Y') for d in conflicts)
+                )
+
+        with transaction.atomic():
+            updated = upcoming.update(
+                start_time=start_time,
+                end_time=end_time,
+                location=location,
+                notes=notes
+            )
+            AdvisingSeries.objects.filter(pk=series.pk).update(
+                start_time=start_time,
+                end_time=end_time,
+                location=location,
+                notes=notes
+            )
+        touch_timetables()
+        return updated
+
+    @staticmethod
+    def cancel_series(series: AdvisingSeries):
+        """Cancel every upcoming occurrence of the series; past ones are kept as history"""
+        today = timezone.now().date()
+        with transaction.atomic():
+            cancelled = series.occurrences.filter(date__gte=today, is_active=True).update(is_active=False)
+            AdvisingSeries.objects.filter(pk=series.pk).update(is_active=False)
+        touch_timetables()
+        return cancelled
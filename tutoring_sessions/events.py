@@ -0,0 +1,142 @@
+"""
+Domain events of enrollments and sessions.
+
+Views `emit()` an event inside the transaction of the change. The event is
+stored as a row of the notification outbox, so it exists if and only if the
+change committed; once the transaction commits the outbox dispatcher is woken
+and hands the events to their subscribers in batches, off the request path.
+A request therefore costs one INSERT however many subscribers there are.
+
+Subscribers are called with a list of events of one type and may be called
+again with the same events after a failure, so they must be idempotent
+(e.g. reuse `event.key` as the outbox key of what they produce).
+"""
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+
+@dataclass(frozen=True)
+class EnrollmentCreated:
+    enrollment_id: int
+    session_id: int
+    student_user_id: int
+
+    @property
+    def key(self):
+        return f'enrollment:{self.enrollment_id}:created'
+
+
+@dataclass(frozen=True)
+class EnrollmentCancelled:
+    enrollment_id: int
+    session_id: int
+    student_user_id: int
+
+    @property
+    def key(self):
+        return f'enrollment:{self.enrollment_id}:cancelled'
+
+
+@dataclass(frozen=True)
+class EnrollmentMoved:
+    """A student moved their enrollment to another class of the same subject"""
+    enrollment_id: int
+    from_session_id: int
+    to_session_id: int
+    student_user_id: int
+    # A student can move back and forth between the same classes: the time of the move keeps the key unique
+    changed_at: str = field(default_factory=lambda: timezone.now().isoformat())
+
+    @property
+    def key(self):
+        return f'enrollment:{self.enrollment_id}:moved:{self.changed_at}'
+
+
+@dataclass(frozen=True)
+class SessionRescheduled:
+    """The tutor changed the days or hours of a class"""
+    session_id: int
+    days: str
+    start_time: str
+    end_time: str
+    student_user_ids: Tuple[int, ...] = field(default=())
+    # A class can go back to an earlier schedule: the time of the change keeps the key unique
+    changed_at: str = field(default_factory=lambda: timezone.now().isoformat())
+
+    @property
+    def key(self):
+        return f'session:{self.session_id}:rescheduled:{self.changed_at}'
+
+
+@dataclass(frozen=True)
+class SessionCancelled:
+    session_id: int
+    student_user_ids: Tuple[int, ...] = field(default=())
+
+    @property
+    def key(self):
+        return f'session:{self.session_id}:cancelled'
+
+
+EVENT_TYPES = {
+    event_type.__name__: event_type
+    for event_type in (EnrollmentCreated, EnrollmentCancelled, EnrollmentMoved, SessionRescheduled, SessionCancelled)
+}
+
+_subscribers = defaultdict(list)
+
+
+def subscriber(*event_types):
+    """Register a batch handler: handler(events) with a list of events of one type"""
+    def register(handler):
+        for event_type in event_types:
+            if handler not in _subscribers[event_type]:
+                _subscribers[event_type].append(handler)
+        return handler
+    return register
+
+
+def emit(event):
+    """Record an event in the current transaction; subscribers run after commit"""
+    from notification import outbox
+    outbox.enqueue_event(type(event).__name__, event.key, asdict(event))
+
+
+def deserialize(payload):
+    event_type = EVENT_TYPES[payload['event']]
+    data = dict(payload['data'])
+    if 'student_user_ids' in data:
+        data['student_user_ids'] = tuple(data['student_user_ids'])
+    return event_type(**data)
+
+
+def dispatch(rows):
+    """
+    Outbox batch handler of the 'event' channel: group the rows by event type
+    and call every subscriber once per group. A failing group is retried as a
+    whole by the outbox; other groups are not affected.
+    Returns {'sent', 'deferred', 'errors'} like the other batch channels.
+    """
+    result = {'sent': set(), 'deferred': {}, 'errors': {}}
+    groups = defaultdict(list)
+    for row in rows:
+        try:
+            groups[EVENT_TYPES[row.payload['event']]].append((row, deserialize(row.payload)))
+        except (KeyError, TypeError) as error:
+            result['errors'][row.pk] = error
+
+    for event_type, items in groups.items():
+        events = [event for _, event in items]
+        try:
+            with transaction.atomic():
+                for handler in _subscribers[event_type]:
+                    handler(events)
+        except Exception as error:
+            result['errors'].update((row.pk, error) for row, _ in items)
+        else:
+            result['sent'].update(row.pk for row, _ in items)
+    return result
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from tutoring_sessions.recommendations import compute_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-student session recommendations "
+        "(schedule nightly, e.g. cron: 0 2 * * * python manage.py compute_recommendations)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Recommendations kept per student')
+
+    def handle(self, *args, **options):
+        written = compute_recommendations(n=options['top'])
+        self.stdout.write(self.style.SUCCESS(f'Stored {written} recommendations.'))
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutoring_sessions', '0003_advisingsession'),
+        ('tutors', '0002_tutoravailability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Holiday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AdvisingSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekdays', models.CharField(max_length=20)),
+                ('start_date', models.DateField()),
+                ('until', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('location', models.CharField(blank=True, max_length=200)),
+                ('notes', models.TextField(blank=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('main_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='advising_series', to='tutoring_sessions.session')),
+                ('tutor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tutors.tutor')),
+            ],
+            options={
+                'verbose_name_plural': 'Advising series',
+            },
+        ),
+        migrations.AddField(
+            model_name='advisingsession',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='tutoring_sessions.advisingseries'),
+        ),
+    ]
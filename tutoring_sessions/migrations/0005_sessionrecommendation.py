@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0001_initial'),
+        ('tutoring_sessions', '0004_holiday_advisingseries_advisingsession_series'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tutoring_sessions.session')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_recommendations', to='students.student')),
+            ],
+            options={
+                'ordering': ['student', 'rank'],
+                'indexes': [models.Index(fields=['student', 'rank'], name='tutoring_se_student_d384e2_idx')],
+                'unique_together': {('student', 'session')},
+            },
+        ),
+    ]
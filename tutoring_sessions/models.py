@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 from students.models import Student  # Import Student từ app students
 from tutors.models import Tutor
@@ -44,7 +45,25 @@ class Session(models.Model):
     
     def get_days_display(self):
         mapping = dict(self.DAY_CHOICES)
-        return ", ".join(mapping[d] for d in self.days.split("-"))
+        return ", ".join(mapping.get(d.strip(), d.strip()) for d in self.days.split("-"))
+    
+    def get_weekdays(self):
+        """Trả về tập weekday (0 = Monday) của lớp, chấp nhận cả "2-4" lẫn "Monday" """
+        names = {label: int(code) for code, label in self.DAY_CHOICES}
+        weekdays = set()
+        for part in self.days.split("-"):
+            part = part.strip()
+            if part.isdigit():
+                weekdays.add(int(part))
+            elif part in names:
+                weekdays.add(names[part])
+        return weekdays
+    
+    @classmethod
+    def weekday_q(cls, weekday):
+        """Q lọc các lớp học vào weekday (0 = Monday), khớp cả mã "0-2" lẫn tên "Monday" """
+        code, label = cls.DAY_CHOICES[weekday]
+        return Q(days__regex=rf'(^|-){code}(-|$)') | Q(days__contains=label)
     
     @property
     def capacity_display(self):
@@ -71,10 +90,55 @@ class SessionMaterial(models.Model):
     def __str__(self):
         return f"{self.session.class_code} - {self.title}"
     
+class Holiday(models.Model):
+    """Ngày nghỉ lễ - bỏ qua khi sinh lịch phụ đạo định kỳ"""
+    date = models.DateField(unique=True)
+    name = models.CharField(max_length=100)
+    
+    class Meta:
+        ordering = ['date']
+    
+    def __str__(self):
+        return f"{self.name} ({self.date})"
+
+class AdvisingSeries(models.Model):
+    """Chuỗi buổi phụ đạo lặp lại hằng tuần"""
+    main_session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='advising_series')
+    tutor = models.ForeignKey(Tutor, on_delete=models.CASCADE)
+    weekdays = models.CharField(max_length=20)  # Ví dụ: "0-2-4" (0 = Monday)
+    start_date = models.DateField()
+    until = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    location = models.CharField(max_length=200, blank=True)
+    notes = models.TextField(blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name_plural = 'Advising series'
+    
+    def __str__(self):
+        return f"Advising series: {self.main_session.class_code} ({self.start_date} - {self.until})"
+    
+    def get_weekdays(self):
+        return [int(d) for d in self.weekdays.split("-") if d]
+    
+    def get_weekdays_display(self):
+        mapping = dict(Session.DAY_CHOICES)
+        return ", ".join(mapping[str(d)] for d in self.get_weekdays())
+
 class AdvisingSession(models.Model):
     """Lớp phụ đạo thêm dựa trên session chính"""
     main_session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='advising_sessions')
     tutor = models.ForeignKey(Tutor, on_delete=models.CASCADE)
+    series = models.ForeignKey(
+        AdvisingSeries,
+        on_delete=models.CASCADE,
+        related_name='occurrences',
+        null=True,
+        blank=True
+    )
     date = models.DateField()  # Ngày cụ thể
     start_time = models.TimeField()
     end_time = models.TimeField()
@@ -95,3 +159,21 @@ class AdvisingSession(models.Model):
         today = timezone.now().date()
         return self.date == today
     
+
+class SessionRecommendation(models.Model):
+    """Top-N lớp gợi ý cho từng sinh viên, được tính lại hằng đêm"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='session_recommendations')
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['student', 'rank']
+        unique_together = ('student', 'session')
+        indexes = [
+            models.Index(fields=['student', 'rank']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student.full_name} #{self.rank}: {self.session.class_code}"
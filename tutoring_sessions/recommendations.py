@@ -0,0 +1,217 @@
+"""
+Session recommender.
+
+Scores every candidate Session for every student at once with NumPy and stores
+the top-N per student in SessionRecommendation. Meant to run nightly through
+`python manage.py compute_recommendations`; pages only read the stored table.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Avg, Count
+
+from feedback.models import Feedback
+from students.models import Student
+from .models import Session, Enrollment, Subject, SessionRecommendation
+
+
+# Score weights (each component is normalised to [0, 1])
+W_CO_ENROLLMENT = 0.35
+W_MAJOR = 0.20
+W_POPULARITY = 0.05
+W_RATING = 0.20
+W_CAPACITY = 0.10
+W_SCHEDULE_FIT = 0.10
+
+# Bayesian smoothing of tutor ratings: RATING_PRIOR_WEIGHT pseudo-votes at the global mean
+RATING_PRIOR_WEIGHT = 5
+
+# Timetable resolution used for conflict detection
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+STUDENT_CHUNK_SIZE = 1000
+
+
+def _index(values):
+    return {value: i for i, value in enumerate(values)}
+
+
+def _slot_vector(session):
+    """Boolean (7 * SLOTS_PER_DAY) vector of the slots occupied by a weekly session"""
+    vector = np.zeros(7 * SLOTS_PER_DAY, dtype=bool)
+    start = (session.start_time.hour * 60 + session.start_time.minute) // SLOT_MINUTES
+    end = -(-(session.end_time.hour * 60 + session.end_time.minute) // SLOT_MINUTES)
+    for weekday in session.get_weekdays():
+        vector[weekday * SLOTS_PER_DAY + start:weekday * SLOTS_PER_DAY + end] = True
+    return vector
+
+
+def _tutor_ratings(tutor_ids):
+    """Bayesian-smoothed average rating per tutor, scaled to [0, 1]"""
+    rows = Feedback.objects.values('enrollment__session__tutor_id').annotate(
+        avg=Avg('rating'),
+        n=Count('id')
+    )
+    stats = {row['enrollment__session__tutor_id']: (row['avg'], row['n']) for row in rows}
+    total = sum(n for _, n in stats.values())
+    global_mean = sum(avg * n for avg, n in stats.values()) / total if total else 3.0
+
+    ratings = np.full(len(tutor_ids), global_mean)
+    for i, tutor_id in enumerate(tutor_ids):
+        if tutor_id in stats:
+            avg, n = stats[tutor_id]
+            ratings[i] = (RATING_PRIOR_WEIGHT * global_mean + avg * n) / (RATING_PRIOR_WEIGHT + n)
+    return (ratings - 1) / 4
+
+
+def build_features(student_rows, subject_ids, sessions, enrollments, tutor_ratings):
+    """
+    Arrays shared by every scoring chunk.
+
+    student_rows:  list of (student_id, major)
+    subject_ids:   list of subject ids
+    sessions:      Session instances with status scheduled/ongoing
+    enrollments:   list of (student_id, session_id, subject_id, is_current)
+    tutor_ratings: {tutor_id: rating in [0, 1]}
+    """
+    student_index = _index(sid for sid, _ in student_rows)
+    subject_index = _index(subject_ids)
+    session_index = _index(s.id for s in sessions)
+    majors = sorted({major.strip().lower() for _, major in student_rows if major and major.strip()})
+    major_index = _index(majors)
+
+    candidates = [s for s in sessions if s.status == 'scheduled' and s.enrolled_count < s.capacity]
+    n_students, n_subjects, n_candidates = len(student_rows), len(subject_ids), len(candidates)
+
+    # Student x subject history (every enrollment ever) and student x current session
+    history = np.zeros((n_students, n_subjects), dtype=np.float32)
+    current = np.zeros((n_students, len(sessions)), dtype=np.float32)
+    for student_id, session_id, subject_id, is_current in enrollments:
+        row = student_index.get(student_id)
+        if row is None:
+            continue
+        history[row, subject_index[subject_id]] = 1
+        if is_current and session_id in session_index:
+            current[row, session_index[session_id]] = 1
+
+    # Co-enrollment: P(subject j | subject i)
+    co = history.T @ history
+    taken = np.diag(co).copy()
+    np.fill_diagonal(co, 0)
+    co /= np.maximum(taken, 1)[:, None]
+
+    # Major: share of each subject among enrollments of students with the same major
+    student_major = np.array([
+        major_index.get((major or '').strip().lower(), -1) for _, major in student_rows
+    ], dtype=int)
+    major_subjects = np.zeros((len(majors) + 1, n_subjects), dtype=np.float32)
+    np.add.at(major_subjects, student_major, history)
+    major_subjects[-1] = 0  # students without a major
+    major_subjects /= np.maximum(major_subjects.sum(axis=1), 1)[:, None]
+
+    cand_slots = np.array(
+        [_slot_vector(s) for s in candidates], dtype=np.float32
+    ).reshape(n_candidates, 7 * SLOTS_PER_DAY)
+    cand_days = cand_slots.reshape(n_candidates, 7, SLOTS_PER_DAY).any(axis=2).astype(np.float32)
+    cand_subject = np.array([subject_index[s.subject_id] for s in candidates], dtype=int)
+    cand_rating = np.array([tutor_ratings.get(s.tutor_id, 0.5) for s in candidates])
+    cand_capacity = np.array([
+        (s.capacity - s.enrolled_count) / s.capacity if s.capacity else 0 for s in candidates
+    ])
+    popularity = taken / max(taken.max(initial=0), 1)
+
+    return {
+        'candidates': candidates,
+        'history': history,
+        'current': current,
+        'co': co,
+        'student_major': student_major,
+        'major_subjects': major_subjects,
+        'session_slots': np.array(
+            [_slot_vector(s) for s in sessions], dtype=np.float32
+        ).reshape(len(sessions), 7 * SLOTS_PER_DAY),
+        'cand_slots': cand_slots,
+        'cand_days': cand_days,
+        'cand_subject': cand_subject,
+        # Student-independent part of the score
+        'cand_static': W_POPULARITY * popularity[cand_subject] + W_RATING * cand_rating + W_CAPACITY * cand_capacity,
+    }
+
+
+def score_chunk(features, start, stop):
+    """
+    (students[start:stop] x candidates) score matrix.
+    Candidates that conflict with the student's timetable or whose subject the
+    student already takes score -inf.
+    """
+    history = features['history'][start:stop]
+    cand_subject = features['cand_subject']
+    n = history.shape[0]
+
+    co_affinity = (history @ features['co']) / np.maximum(history.sum(axis=1), 1)[:, None]
+    major_affinity = features['major_subjects'][features['student_major'][start:stop]]
+
+    busy = (features['current'][start:stop] @ features['session_slots']) > 0
+    busy_days = busy.reshape(n, 7, SLOTS_PER_DAY).any(axis=2).astype(np.float32)
+    conflict = (busy.astype(np.float32) @ features['cand_slots'].T) > 0
+    cand_days = features['cand_days']
+    schedule_fit = (busy_days @ cand_days.T) / np.maximum(cand_days.sum(axis=1), 1)
+
+    scores = (
+        W_CO_ENROLLMENT * co_affinity[:, cand_subject]
+        + W_MAJOR * major_affinity[:, cand_subject]
+        + W_SCHEDULE_FIT * schedule_fit
+        + features['cand_static'][None, :]
+    )
+    scores[conflict | (history[:, cand_subject] > 0)] = -np.inf
+    return scores
+
+
+def top_n(scores, n):
+    """Indices of the n best finite scores in each row, best first (-1 = no candidate)"""
+    n = min(n, scores.shape[1])
+    if n == 0:
+        return np.empty((scores.shape[0], 0), dtype=int)
+    best = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    order = np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1, kind='stable')
+    best = np.take_along_axis(best, order, axis=1)
+    best[~np.isfinite(np.take_along_axis(scores, best, axis=1))] = -1
+    return best
+
+
+def compute_recommendations(n=10):
+    """Recompute the top-n recommendations of every student. Returns the number of rows written."""
+    subject_ids = list(Subject.objects.values_list('id', flat=True))
+    sessions = list(Session.objects.filter(
+        status__in=['scheduled', 'ongoing']
+    ).only('id', 'subject_id', 'tutor_id', 'days', 'start_time', 'end_time', 'capacity', 'enrolled_count', 'status'))
+    enrollments = [
+        (student_id, session_id, subject_id, is_active and status in ('scheduled', 'ongoing'))
+        for student_id, session_id, subject_id, is_active, status in Enrollment.objects.values_list(
+            'student_id', 'session_id', 'session__subject_id', 'is_active', 'session__status'
+        )
+    ]
+    student_rows = list(Student.objects.values_list('id', 'major'))
+
+    tutor_ids = sorted({s.tutor_id for s in sessions})
+    tutor_ratings = dict(zip(tutor_ids, _tutor_ratings(tutor_ids)))
+    features = build_features(student_rows, subject_ids, sessions, enrollments, tutor_ratings)
+    candidates = features['candidates']
+
+    rows = []
+    for start in range(0, len(student_rows), STUDENT_CHUNK_SIZE):
+        chunk = student_rows[start:start + STUDENT_CHUNK_SIZE]
+        scores = score_chunk(features, start, start + len(chunk))
+        for (student_id, _), best, row_scores in zip(chunk, top_n(scores, n), scores):
+            for rank, column in enumerate(c for c in best if c >= 0):
+                rows.append(SessionRecommendation(
+                    student_id=student_id,
+                    session_id=candidates[column].id,
+                    rank=rank + 1,
+                    score=float(row_scores[column]),
+                ))
+
+    with transaction.atomic():
+        SessionRecommendation.objects.all().delete()
+        SessionRecommendation.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
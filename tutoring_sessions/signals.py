@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Session, Enrollment, AdvisingSession, AdvisingSeries
+from .timetable import touch_timetables
+
+
+@receiver([post_save, post_delete], sender=Session)
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=AdvisingSession)
+@receiver([post_save, post_delete], sender=AdvisingSeries)
+def invalidate_timetables(sender, **kwargs):
+    """Cached timetables are stale as soon as a session, enrollment or advising session changes"""
+    touch_timetables()
@@ -516,4 +516,398 @@ class RescheduleIntegrationTestCase(TestCase):
         self.assertEqual(self.session1.enrolled_count, 0)
         
         self.session2.refresh_from_db()
-        self.assertEqual(self.session2.enrolled_count, 1)
\ No newline at end of file
+        self.assertEqual(self.session2.enrolled_count, 1)
+
+class AdvisingSeriesTestCase(TestCase):
+    """Test cases cho chuỗi buổi phụ đạo định kỳ"""
+    
+    def setUp(self):
+        """Khởi tạo dữ liệu test"""
+        from datetime import date
+        self.tutor_user = User.objects.create_user(
+            username='tutor1',
+            password='tutorpass123'
+        )
+        self.tutor = Tutor.objects.create(
+            user=self.tutor_user,
+            full_name='Test Tutor',
+            tutor_id='TU001'
+        )
+        self.subject = Subject.objects.create(name='Mathematics', code='MATH101')
+        self.session = Session.objects.create(
+            class_code='MATH101-A',
+            subject=self.subject,
+            tutor=self.tutor,
+            days='0-2',
+            start_time=time(9, 0),
+            end_time=time(11, 0),
+            status='ongoing'
+        )
+        # 2030-01-07 là thứ Hai
+        self.start = date(2030, 1, 7)
+        self.until = date(2030, 2, 3)
+    
+    def test_expand_dates_skips_holidays(self):
+        """Test: Sinh ngày theo thứ trong tuần và bỏ qua ngày lễ"""
+        from datetime import date
+        from .advising_service import AdvisingSeriesService
+        dates = AdvisingSeriesService.expand_dates(
+            self.start, self.until, [1, 3], skip_dates=[date(2030, 1, 10)]
+        )
+        self.assertEqual(len(dates), 7)
+        self.assertNotIn(date(2030, 1, 10), dates)
+        self.assertTrue(all(d.weekday() in (1, 3) for d in dates))
+    
+    def test_create_series_single_bulk_insert(self):
+        """Test: Tạo toàn bộ chuỗi với số query cố định"""
+        from datetime import date
+        from .advising_service import AdvisingSeriesService
+        from .models import Holiday
+        Holiday.objects.create(date=date(2030, 1, 8), name='Holiday')
+        
+        # holidays, advising conflicts, weekly conflicts, savepoint, series insert, bulk insert, release
+        with self.assertNumQueries(7):
+            series = AdvisingSeriesService.create_series(
+                main_session=self.session,
+                start_date=self.start,
+                until=self.until,
+                weekdays=[1, 3],
+                start_time=time(14, 0),
+                end_time=time(16, 0),
+            )
+        
+        self.assertEqual(series.occurrences.count(), 7)
+        self.assertFalse(series.occurrences.filter(date=date(2030, 1, 8)).exists())
+    
+    def test_create_series_rejects_conflicts(self):
+        """Test: Không tạo chuỗi khi trùng lịch lớp chính của tutor"""
+        from .advising_service import AdvisingSeriesService
+        from .models import AdvisingSession
+        with self.assertRaises(ValueError):
+            AdvisingSeriesService.create_series(
+                main_session=self.session,
+                start_date=self.start,
+                until=self.until,
+                weekdays=[0],
+                start_time=time(10, 0),
+                end_time=time(12, 0),
+            )
+        self.assertEqual(AdvisingSession.objects.count(), 0)
+    
+    def test_create_series_validates_rule(self):
+        """Test: Thứ trong tuần ngoài 0-6, không phải số hoặc giờ kết thúc trước giờ bắt đầu bị từ chối"""
+        from .advising_service import AdvisingSeriesService
+        from .models import AdvisingSeries
+        cases = [
+            (['9'], time(14, 0), time(16, 0), 'Invalid weekday selection.'),
+            (['tue'], time(14, 0), time(16, 0), 'Invalid weekday selection.'),
+            (['1'], time(16, 0), time(14, 0), 'The end time must be after the start time.'),
+        ]
+        for weekdays, start_time, end_time, message in cases:
+            with self.assertRaisesMessage(ValueError, message):
+                AdvisingSeriesService.create_series(
+                    main_session=self.session,
+                    start_date=self.start,
+                    until=self.until,
+                    weekdays=weekdays,
+                    start_time=start_time,
+                    end_time=end_time,
+                )
+        self.assertEqual(AdvisingSeries.objects.count(), 0)
+    
+    def test_update_and_cancel_series(self):
+        """Test: Sửa và huỷ áp dụng cho toàn bộ chuỗi"""
+        from .advising_service import AdvisingSeriesService
+        series = AdvisingSeriesService.create_series(
+            main_session=self.session,
+            start_date=self.start,
+            until=self.until,
+            weekdays=[1, 3],
+            start_time=time(14, 0),
+            end_time=time(16, 0),
+        )
+        
+        updated = AdvisingSeriesService.update_series(
+            series, start_time=time(15, 0), end_time=time(17, 0), location='B1-201'
+        )
+        self.assertEqual(updated, 8)
+        self.assertFalse(series.occurrences.exclude(location='B1-201').exists())
+        
+        cancelled = AdvisingSeriesService.cancel_series(series)
+        self.assertEqual(cancelled, 8)
+        self.assertFalse(series.occurrences.filter(is_active=True).exists())
+
+
+class TimetableApiTestCase(TestCase):
+    """Test cases cho API thời khoá biểu theo tuần"""
+    
+    def setUp(self):
+        """Khởi tạo dữ liệu test"""
+        from datetime import date
+        from .models import AdvisingSession
+        self.user = User.objects.create_user(username='student1', password='testpass123')
+        self.student = Student.objects.create(user=self.user, full_name='Test Student', student_id='ST001')
+        self.tutor_user = User.objects.create_user(username='tutor1', password='tutorpass123')
+        self.tutor = Tutor.objects.create(user=self.tutor_user, full_name='Test Tutor', tutor_id='TU001')
+        subject = Subject.objects.create(name='Mathematics', code='MATH101')
+        self.session = Session.objects.create(
+            class_code='MATH101-A',
+            subject=subject,
+            tutor=self.tutor,
+            days='0-2',
+            start_time=time(9, 0),
+            end_time=time(11, 0),
+            status='ongoing'
+        )
+        Enrollment.objects.create(student=self.student, session=self.session)
+        # Tuần 2030-W02 bắt đầu từ thứ Hai 2030-01-07
+        AdvisingSession.objects.create(
+            main_session=self.session,
+            tutor=self.tutor,
+            date=date(2030, 1, 9),
+            start_time=time(7, 0),
+            end_time=time(8, 0)
+        )
+        self.url = reverse('timetable_api') + '?week=2030-W02'
+    
+    def test_student_week_merges_sessions_and_advising(self):
+        """Test: Gộp lớp định kỳ và buổi phụ đạo vào từng ngày"""
+        self.client.login(username='student1', password='testpass123')
+        data = self.client.get(self.url).json()
+        
+        self.assertEqual(data['start'], '2030-01-07')
+        self.assertEqual(data['role'], 'student')
+        self.assertEqual([i['kind'] for i in data['days'][0]['items']], ['session'])
+        self.assertEqual([i['kind'] for i in data['days'][2]['items']], ['advising', 'session'])
+        self.assertEqual(data['days'][1]['items'], [])
+    
+    def test_tutor_week(self):
+        """Test: Tutor cũng xem được thời khoá biểu"""
+        self.client.login(username='tutor1', password='tutorpass123')
+        data = self.client.get(reverse('timetable_api') + '?week=2030-01-10').json()
+        self.assertEqual(data['role'], 'tutor')
+        self.assertEqual(len(data['days'][2]['items']), 2)
+    
+    def test_conditional_get_and_invalidation(self):
+        """Test: ETag trả về 304, thay đổi dữ liệu làm mới cache"""
+        self.client.login(username='student1', password='testpass123')
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        
+        with self.assertNumQueries(2):  # auth session + user only
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        
+        self.session.start_time = time(10, 0)
+        self.session.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_version_missed_by_invalidation_expires(self):
+        """Test: Thay đổi từ process khác (không xoá được cache ở đây) hết hạn sau TIMETABLE_VERSION_TIMEOUT"""
+        import time as time_module
+        from unittest import mock
+        from django.test import override_settings
+        self.client.login(username='student1', password='testpass123')
+        with override_settings(TIMETABLE_VERSION_TIMEOUT=60):
+            etag = self.client.get(self.url)['ETag']
+            # update() không phát signal: giống một thay đổi ở process khác
+            Session.objects.filter(pk=self.session.pk).update(start_time=time(10, 0))
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time_module.time() + 61):
+                response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_invalid_week(self):
+        """Test: Tham số week không hợp lệ"""
+        self.client.login(username='student1', password='testpass123')
+        response = self.client.get(reverse('timetable_api') + '?week=abc')
+        self.assertEqual(response.status_code, 400)
+
+
+class SessionRecommendationTestCase(TestCase):
+    """Test cases cho gợi ý lớp học"""
+    
+    def setUp(self):
+        """Khởi tạo dữ liệu test"""
+        tutor_user = User.objects.create_user(username='tutor1', password='tutorpass123')
+        self.tutor = Tutor.objects.create(user=tutor_user, full_name='Test Tutor', tutor_id='TU001')
+        self.math = Subject.objects.create(name='Mathematics', code='MATH101')
+        self.physics = Subject.objects.create(name='Physics', code='PHY101')
+        self.history = Subject.objects.create(name='History', code='HIS101')
+        
+        self.math_a = self.make_session('MATH-A', self.math, '0', 7)
+        self.physics_a = self.make_session('PHY-A', self.physics, '1', 7)
+        self.history_a = self.make_session('HIS-A', self.history, '2', 7)
+        self.physics_clash = self.make_session('PHY-B', self.physics, '0', 7)
+        
+        # Một sinh viên khác học cả Toán và Lý -> Lý là môn đi kèm Toán
+        self.user = User.objects.create_user(username='student1', password='testpass123')
+        self.student = Student.objects.create(user=self.user, full_name='Student', student_id='ST001')
+        other = Student.objects.create(
+            user=User.objects.create_user(username='student2', password='testpass123'),
+            full_name='Other', student_id='ST002'
+        )
+        Enrollment.objects.create(student=other, session=self.math_a)
+        Enrollment.objects.create(student=other, session=self.physics_a)
+        Enrollment.objects.create(student=self.student, session=self.math_a)
+    
+    def make_session(self, code, subject, days, hour):
+        return Session.objects.create(
+            class_code=code, subject=subject, tutor=self.tutor, days=days,
+            start_time=time(hour, 0), end_time=time(hour + 2, 0), status='scheduled'
+        )
+    
+    def test_compute_recommendations(self):
+        """Test: Xếp hạng theo đồng đăng ký, loại lớp trùng lịch và môn đã học"""
+        from .models import SessionRecommendation
+        from .recommendations import compute_recommendations
+        compute_recommendations(n=10)
+        
+        ranked = list(SessionRecommendation.objects.filter(
+            student=self.student
+        ).values_list('session__class_code', flat=True))
+        self.assertEqual(ranked, ['PHY-A', 'HIS-A'])
+    
+    def test_find_sessions_serves_recommendations_in_one_query(self):
+        """Test: Trang tìm lớp đọc bảng gợi ý đã tính sẵn"""
+        from accounts.models import UserProfile
+        from .models import SessionRecommendation
+        from .recommendations import compute_recommendations
+        UserProfile.objects.create(user=self.user, role='student')
+        compute_recommendations(n=10)
+        
+        self.client.login(username='student1', password='testpass123')
+        response = self.client.get(reverse('students:find_sessions'))
+        self.assertEqual(
+            [r.session.class_code for r in response.context['recommendations']],
+            ['PHY-A', 'HIS-A']
+        )
+        self.assertContains(response, 'Recommended for you')
+
+
+class NotificationOutboxWiringTestCase(TestCase):
+    """Test cases: thao tác ghi danh/huỷ lớp phát domain event qua outbox trong cùng transaction"""
+    
+    def setUp(self):
+        """Khởi tạo dữ liệu test"""
+        self.tutor_user = User.objects.create_user(username='tutor1', password='tutorpass123')
+        self.tutor = Tutor.objects.create(user=self.tutor_user, full_name='Test Tutor', tutor_id='TU001')
+        subject = Subject.objects.create(name='Mathematics', code='MATH101')
+        self.session = Session.objects.create(
+            class_code='MATH101-A',
+            subject=subject,
+            tutor=self.tutor,
+            days='0-2',
+            start_time=time(9, 0),
+            end_time=time(11, 0),
+            status='scheduled'
+        )
+        self.users = []
+        for i in range(3):
+            user = User.objects.create_user(username=f'student{i}', email=f's{i}@example.com', password='testpass123')
+            Student.objects.create(user=user, full_name=f'Student {i}', student_id=f'ST00{i}')
+            self.users.append(user)
+    
+    def drain(self):
+        """Chạy dispatcher cho tới khi outbox trống"""
+        from notification import outbox
+        while outbox.dispatch_batch()['claimed']:
+            pass
+    
+    def test_enroll_emits_one_event_row(self):
+        """Test ghi danh chỉ ghi một event, thông báo được tạo ngoài request"""
+        from notification.models import Notification, OutboxMessage
+        self.client.login(username='student0', password='testpass123')
+        self.client.post(reverse('tutoring_sessions:enroll_session', args=[self.session.id]))
+        
+        enrollment = Enrollment.objects.get(student__user=self.users[0])
+        row = OutboxMessage.objects.get()
+        self.assertEqual((row.channel, row.idempotency_key), ('event', f'enrollment:{enrollment.id}:created:event'))
+        self.assertEqual(row.payload['event'], 'EnrollmentCreated')
+        self.assertFalse(Notification.objects.exists())
+        
+        self.drain()
+        notification = Notification.objects.get(user=self.users[0])
+        self.assertEqual(notification.notification_type, 'session_confirmed')
+        self.assertIn('MATH101-A (Mathematics), Monday, Wednesday 09:00-11:00', notification.message)
+    
+    def test_tutor_cancel_enqueues_every_student(self):
+        """Test tutor huỷ lớp: một event, sau đó một thông báo + một email cho mỗi sinh viên"""
+        from notification.models import Notification, OutboxMessage
+        for user in self.users:
+            Enrollment.objects.create(student=user.student, session=self.session)
+        
+        self.client.login(username='tutor1', password='tutorpass123')
+        self.client.get(reverse('tutoring_sessions:tutor_cancel_session', args=[self.session.id]))
+        self.assertEqual(OutboxMessage.objects.get().channel, 'event')
+        
+        self.drain()
+        self.assertEqual(OutboxMessage.objects.filter(channel='email').count(), 3)
+        self.assertEqual(Notification.objects.filter(notification_type='session_cancelled').count(), 3)
+    
+    def test_schedule_changed_back_is_a_new_event(self):
+        """Test đổi lịch A→B→A: mỗi lần đổi là một event riêng, sinh viên được báo cả hai lần"""
+        from notification.models import OutboxMessage
+        url = reverse('tutoring_sessions:tutor_reschedule_session', args=[self.session.id])
+        self.client.login(username='tutor1', password='tutorpass123')
+        for days, start, end in (('1', '13:00', '15:00'), ('0', '09:00', '11:00')):
+            self.client.post(url, {'days': days, 'start_time': start, 'end_time': end})
+        
+        rows = OutboxMessage.objects.filter(channel='event', payload__event='SessionRescheduled')
+        self.assertEqual(rows.count(), 2)
+        self.assertEqual(len(set(rows.values_list('idempotency_key', flat=True))), 2)
+    
+    def test_moving_back_and_forth_is_a_new_event(self):
+        """Test chuyển lớp A→B→A→B: lần chuyển A→B thứ hai vẫn là một event riêng"""
+        from django.db import transaction
+        from notification.models import OutboxMessage
+        from tutoring_sessions import events
+        for from_id, to_id in ((1, 2), (2, 1), (1, 2)):
+            with transaction.atomic():
+                events.emit(events.EnrollmentMoved(100, from_id, to_id, self.users[0].id))
+        
+        rows = OutboxMessage.objects.filter(channel='event', payload__event='EnrollmentMoved')
+        self.assertEqual(rows.count(), 3)
+        self.assertEqual(len(set(rows.values_list('idempotency_key', flat=True))), 3)
+    
+    def test_events_are_processed_in_batches(self):
+        """Test mỗi loại event gọi subscriber một lần cho cả batch, lớp học chỉ được load một lần"""
+        from django.db import connection, transaction
+        from django.test.utils import CaptureQueriesContext
+        from notification import outbox
+        from tutoring_sessions import events
+        calls = []
+        recorder = events.subscriber(events.EnrollmentCancelled)(lambda batch: calls.append(len(batch)))
+        self.addCleanup(events._subscribers[events.EnrollmentCancelled].remove, recorder)
+        
+        with transaction.atomic():
+            for i, user in enumerate(self.users):
+                events.emit(events.EnrollmentCancelled(100 + i, self.session.id, user.id))
+        with CaptureQueriesContext(connection) as queries:
+            outbox.dispatch_batch()
+        
+        self.assertEqual(calls, [3])
+        session_loads = [q for q in queries if 'FROM "tutoring_sessions_session"' in q['sql']]
+        self.assertEqual(len(session_loads), 1)
+    
+    def test_failing_subscriber_retries_without_duplicates(self):
+        """Test subscriber lỗi: event được thử lại, thông báo không bị nhân đôi"""
+        from unittest import mock
+        from notification import handlers
+        from notification.models import Notification, OutboxMessage
+        self.client.login(username='student0', password='testpass123')
+        self.client.post(reverse('tutoring_sessions:enroll_session', args=[self.session.id]))
+        
+        with mock.patch.object(handlers.NotificationService, 'notify_session_confirmed', side_effect=RuntimeError('down')):
+            self.drain()
+        row = OutboxMessage.objects.get(channel='event')
+        self.assertEqual(row.status, 'pending')
+        self.assertIn('down', row.last_error)
+        
+        OutboxMessage.objects.update(available_at=timezone.now())
+        self.drain()
+        self.drain()
+        self.assertEqual(Notification.objects.filter(user=self.users[0]).count(), 1)
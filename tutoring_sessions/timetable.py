@@ -0,0 +1,153 @@
+import hashlib
+import json
+import time as time_module
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Session, Enrollment, AdvisingSession
+
+
+# Bumped whenever a session, enrollment or advising session changes
+VERSION_KEY = 'timetable:version'
+CACHE_TIMEOUT = 60 * 60
+# A bump reaches other processes only through a shared cache backend; with the
+# default per-process cache the version expires instead, bounding stale timetables
+VERSION_TIMEOUT = 60
+
+
+def _version_timeout():
+    return getattr(settings, 'TIMETABLE_VERSION_TIMEOUT', VERSION_TIMEOUT)
+
+
+def touch_timetables():
+    """Invalidate every cached timetable"""
+    cache.set(VERSION_KEY, time_module.time(), _version_timeout())
+
+
+def get_version():
+    """Current timetable version (a UNIX timestamp of the last change, or of the last expiry)"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time_module.time(), _version_timeout())
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def parse_week(value, today=None):
+    """
+    Return the Monday of the requested week.
+    Accepts an ISO week ("2026-W43"), any date inside the week ("2026-10-21") or nothing (current week).
+    Raises ValueError on anything else.
+    """
+    today = today or date.today()
+    if not value:
+        day = today
+    elif '-W' in value.upper():
+        year, week = value.upper().split('-W')
+        day = date.fromisocalendar(int(year), int(week), 1)
+    else:
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+    return day - timedelta(days=day.weekday())
+
+
+def _session_item(session):
+    return {
+        'kind': 'session',
+        'id': session.id,
+        'class_code': session.class_code,
+        'subject': session.subject.name,
+        'tutor': session.tutor.full_name,
+        'start': session.start_time.strftime('%H:%M'),
+        'end': session.end_time.strftime('%H:%M'),
+        'status': session.status,
+    }
+
+
+def _advising_item(advising):
+    return {
+        'kind': 'advising',
+        'id': advising.id,
+        'class_code': advising.main_session.class_code,
+        'subject': advising.main_session.subject.name,
+        'tutor': advising.tutor.full_name,
+        'start': advising.start_time.strftime('%H:%M'),
+        'end': advising.end_time.strftime('%H:%M'),
+        'location': advising.location,
+        'series_id': advising.series_id,
+    }
+
+
+def build_timetable(user, monday):
+    """
+    Merge weekly sessions and dated advising sessions of a student or tutor into a 7-day view.
+    Two queries: one for recurring sessions, one for advising sessions of the week.
+    """
+    sunday = monday + timedelta(days=6)
+
+    if hasattr(user, 'tutor'):
+        role = 'tutor'
+        sessions = Session.objects.filter(tutor=user.tutor)
+        advising = AdvisingSession.objects.filter(tutor=user.tutor)
+    elif hasattr(user, 'student'):
+        role = 'student'
+        enrolled = Enrollment.objects.filter(student=user.student, is_active=True).values('session_id')
+        sessions = Session.objects.filter(id__in=enrolled)
+        advising = AdvisingSession.objects.filter(main_session_id__in=enrolled)
+    else:
+        return None
+
+    sessions = sessions.filter(
+        status__in=['scheduled', 'ongoing']
+    ).select_related('subject', 'tutor').order_by('start_time')
+    advising = advising.filter(
+        date__gte=monday,
+        date__lte=sunday,
+        is_active=True
+    ).select_related('main_session', 'main_session__subject', 'tutor').order_by('start_time')
+
+    days = [
+        {'date': (monday + timedelta(days=i)).isoformat(), 'weekday': i, 'items': []}
+        for i in range(7)
+    ]
+    for session in sessions:
+        item = _session_item(session)
+        for weekday in session.get_weekdays():
+            days[weekday]['items'].append(item)
+    for item in advising:
+        days[item.date.weekday()]['items'].append(_advising_item(item))
+    for day in days:
+        day['items'].sort(key=lambda item: item['start'])
+
+    year, week, _ = monday.isocalendar()
+    return {
+        'week': f'{year}-W{week:02d}',
+        'start': monday.isoformat(),
+        'end': sunday.isoformat(),
+        'role': role,
+        'days': days,
+    }
+
+
+def get_timetable(user, monday):
+    """
+    Cached timetable for (user, week).
+    Returns a dict with the payload, its ETag and the last-modified datetime, or None
+    when the user is neither a student nor a tutor.
+    """
+    version = get_version()
+    key = f'timetable:{user.pk}:{monday.isoformat()}:{version}'
+    entry = cache.get(key)
+    if entry is None:
+        payload = build_timetable(user, monday)
+        if payload is None:
+            return None
+        body = json.dumps(payload, separators=(',', ':'))
+        entry = {
+            'body': body,
+            'etag': hashlib.md5(body.encode()).hexdigest(),
+            'last_modified': datetime.fromtimestamp(int(version), tz=dt_timezone.utc),
+        }
+        cache.set(key, entry, CACHE_TIMEOUT)
+    return entry
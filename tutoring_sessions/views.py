@@ -1,10 +1,16 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, F
-from .models import Session, Enrollment, SessionMaterial
+from django.db import transaction
+from django.db.models import Q, F, OuterRef, Subquery
+from django.http import JsonResponse, HttpResponse
+from django.views.decorators.http import condition, require_GET
+from .models import Session, Enrollment, SessionMaterial, SessionRecommendation
+from .timetable import parse_week, get_timetable
 from students.models import Student
-from feedback.models import Feedback
+from feedback.models import Feedback, TutorLeaderboardEntry
+from accounts.ratelimit import rate_limit
+from . import events
 
 
 @login_required
@@ -25,11 +31,13 @@ def session_list(request):
 def cancel_enrollment(request, enrollment_id):
     enrollment = get_object_or_404(Enrollment, id=enrollment_id, student=request.user.student)
     session=enrollment.session
-    enrollment.delete()
-    
-    if session.enrolled_count > 0:
-        session.enrolled_count -= 1
-        session.save()
+    with transaction.atomic():
+        events.emit(events.EnrollmentCancelled(enrollment.id, session.id, request.user.id))
+        enrollment.delete()
+        
+        if session.enrolled_count > 0:
+            session.enrolled_count -= 1
+            session.save()
     messages.success(request, f'Successfully canceled enrollment from {session.class_code}.') # Added success message for clarity
     return redirect('students:sessions')
 
@@ -51,6 +59,13 @@ def available_sessions(request):
         id__in=enrolled_session_ids
     ).select_related('subject', 'tutor').order_by('class_code')
     
+    # Tutor rating in the subject of the session, read from the precomputed leaderboard
+    rating = TutorLeaderboardEntry.objects.filter(tutor=OuterRef('tutor_id'), subject=OuterRef('subject_id'))
+    available_sessions = available_sessions.annotate(
+        tutor_score=Subquery(rating.values('score')[:1]),
+        tutor_rating_count=Subquery(rating.values('count')[:1]),
+    )
+    
     # Search functionality
     search_query = request.GET.get('search', '')
     if search_query:
@@ -61,14 +76,27 @@ def available_sessions(request):
             Q(tutor__full_name__icontains=search_query)
         )
     
+    # Precomputed nightly by `manage.py compute_recommendations`
+    recommendations = []
+    if not search_query:
+        recommendations = SessionRecommendation.objects.filter(
+            student=student,
+            session__status='scheduled',
+            session__enrolled_count__lt=F('session__capacity')
+        ).exclude(
+            session_id__in=enrolled_session_ids
+        ).select_related('session', 'session__subject', 'session__tutor').order_by('rank')[:5]
+    
     context = {
         'sessions': available_sessions,
         'search_query': search_query,
+        'recommendations': recommendations,
     }
 
     return render(request, 'students/find_sessions.html', context)
 
 @login_required
+@rate_limit('enroll_session', '20/m')
 def enroll_session(request, session_id):
     """Enroll in a session"""
     if request.method != 'POST':
@@ -92,16 +120,19 @@ def enroll_session(request, session_id):
         messages.warning(request, 'You are already enrolled in this session!')
         return redirect('tutoring_sessions:available_sessions')
     
-    # Create enrollment
-    Enrollment.objects.create(
-        student=student,
-        session=session,
-        is_active=True
-    )
-    
-    # Increment enrolled_count
-    session.enrolled_count += 1
-    session.save()
+    with transaction.atomic():
+        # Create enrollment
+        enrollment = Enrollment.objects.create(
+            student=student,
+            session=session,
+            is_active=True
+        )
+        
+        # Increment enrolled_count
+        session.enrolled_count += 1
+        session.save()
+        
+        events.emit(events.EnrollmentCreated(enrollment.id, session.id, request.user.id))
     
     messages.success(request, f'Successfully enrolled in {session.class_code}!')
     return redirect('students:sessions')
@@ -151,17 +182,20 @@ def reschedule_session(request, enrollment_id):
             return redirect('tutoring_sessions:reschedule_session', enrollment_id=enrollment_id)
         
         # Perform reschedule
-        # Decrement enrolled_count of the old session
-        current_session.enrolled_count -= 1
-        current_session.save()
-        
-        # Update enrollment
-        enrollment.session = new_session
-        enrollment.save()
-        
-        # Increment enrolled_count of the new session
-        new_session.enrolled_count += 1
-        new_session.save()
+        with transaction.atomic():
+            # Decrement enrolled_count of the old session
+            current_session.enrolled_count -= 1
+            current_session.save()
+            
+            # Update enrollment
+            enrollment.session = new_session
+            enrollment.save()
+            
+            # Increment enrolled_count of the new session
+            new_session.enrolled_count += 1
+            new_session.save()
+            
+            events.emit(events.EnrollmentMoved(enrollment.id, current_session.id, new_session.id, request.user.id))
         
         messages.success(request, f'Successfully rescheduled to class {new_session.class_code}!')
         return redirect('students:sessions')
@@ -195,7 +229,12 @@ def tutor_reschedule_session(request, session_id):
         session.days = day_dict.get(selected_value, selected_value)  # e.g., "Monday"
         session.start_time = new_start_time
         session.end_time = new_end_time
-        session.save()
+        with transaction.atomic():
+            session.save()
+            events.emit(events.SessionRescheduled(
+                session.id, session.days, new_start_time, new_end_time,
+                tuple(Enrollment.objects.filter(session=session, is_active=True).values_list('student__user_id', flat=True)),
+            ))
 
         messages.success(request, f'Successfully updated the schedule for class {session.class_code}!')
         return redirect('tutors:sessions')
@@ -231,15 +270,19 @@ def tutor_cancel_session(request, session_id):
     
     # Get list of active enrollments
     active_enrollments = Enrollment.objects.filter(session=session, is_active=True)
-    student_count = active_enrollments.count()
-    
-    # Update session status
-    session.status = 'cancelled'
-    session.enrolled_count = 0  # Reset enrolled count
-    session.save()
+    student_user_ids = list(active_enrollments.values_list('student__user_id', flat=True))
+    student_count = len(student_user_ids)
     
-    # Deactivate all enrollments
-    active_enrollments.update(is_active=False)
+    with transaction.atomic():
+        # Update session status
+        session.status = 'cancelled'
+        session.enrolled_count = 0  # Reset enrolled count
+        session.save()
+        
+        # Deactivate all enrollments
+        active_enrollments.update(is_active=False)
+        
+        events.emit(events.SessionCancelled(session.id, tuple(student_user_ids)))
     
     # Success notification
     if student_count > 0:
@@ -275,4 +318,48 @@ def view_session_students(request, session_id):
         'enrollments': enrollments,
         'search_query': request.GET.get('search', ''),
     }
-    return render(request, 'tutoring_sessions/view_students.html', context)
\ No newline at end of file
+    return render(request, 'tutoring_sessions/view_students.html', context)
+
+
+def _request_timetable(request):
+    """Cached timetable entry for the week in ?week=, or None if unavailable"""
+    if not hasattr(request, '_timetable_entry'):
+        try:
+            monday = parse_week(request.GET.get('week'))
+        except ValueError:
+            request._timetable_entry = None
+        else:
+            request._timetable_entry = get_timetable(request.user, monday)
+    return request._timetable_entry
+
+
+def _timetable_etag(request):
+    entry = _request_timetable(request)
+    return entry['etag'] if entry else None
+
+
+def _timetable_last_modified(request):
+    entry = _request_timetable(request)
+    return entry['last_modified'] if entry else None
+
+
+@login_required
+@require_GET
+@condition(etag_func=_timetable_etag, last_modified_func=_timetable_last_modified)
+def timetable_api(request):
+    """
+    Weekly personal timetable (recurring sessions + advising sessions) as JSON.
+    ?week= accepts an ISO week ("2026-W43") or any date in the week; defaults to the current week.
+    """
+    try:
+        parse_week(request.GET.get('week'))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid week'}, status=400)
+    
+    entry = _request_timetable(request)
+    if entry is None:
+        return JsonResponse({'success': False, 'error': 'Only students and tutors have a timetable'}, status=403)
+    
+    response = HttpResponse(entry['body'], content_type='application/json')
+    response['Cache-Control'] = 'private, no-cache'
+    return response
\ No newline at end of file
@@ -16,4 +16,6 @@ urlpatterns = [
     path('availability/debug/', views.availability_schedule_debug, name='availability_schedule_debug'),
     path('student/<int:student_id>/session/<int:session_id>/progress/', views.student_progress, name='student_progress'),
     path('advising/create/', views.create_advising_session, name='create_advising_session'),
+    path('advising/series/<int:series_id>/edit/', views.edit_advising_series, name='edit_advising_series'),
+    path('advising/series/<int:series_id>/cancel/', views.cancel_advising_series, name='cancel_advising_series'),
 ]
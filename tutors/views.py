@@ -2,11 +2,14 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from .models import Tutor, TutorAvailability
-from tutoring_sessions.models import Session, Enrollment, SessionMaterial, Subject, AdvisingSession
+from tutoring_sessions.models import Session, Enrollment, SessionMaterial, Subject, AdvisingSession, AdvisingSeries
+from tutoring_sessions.advising_service import AdvisingSeriesService
 from .forms import AvatarUpdateForm, ExpertiseUpdateForm
 from feedback.models import StudentProgress
 from students.models import Student
 from django.http import JsonResponse
+from accounts.avatars import schedule_avatar_processing
+from accounts.ratelimit import rate_limit
 from django.contrib import messages
 from datetime import time, date, datetime, timedelta 
 from django.utils import timezone
@@ -118,10 +121,13 @@ def session_materials(request, session_id):
 def update_avatar(request):
     if request.method == 'POST':
         tutor = request.user.tutor
+        old_avatar = tutor.avatar.name
         form = AvatarUpdateForm(request.POST, request.FILES, instance=tutor)
         
         if form.is_valid():
             form.save()
+            # Strip metadata and build the sidebar/profile renditions in the background
+            schedule_avatar_processing(tutor.avatar, old_avatar)
             return JsonResponse({
                 'success': True,
                 'avatar_url': tutor.avatar.url if tutor.avatar else None
@@ -201,6 +207,7 @@ def availability_schedule(request):
     return render(request, 'tutors/availability.html', context)
 
 @login_required
+@rate_limit('set_availability', '30/m', json=True)
 @require_POST
 def set_availability(request):
     """Set or update tutor availability for a specific time slot"""
@@ -374,6 +381,34 @@ def create_advising_session(request):
         
         main_session = get_object_or_404(Session, id=main_session_id, tutor=tutor)
         
+        # Weekly series: expand the rule and create every occurrence at once
+        if request.POST.get('repeat') == 'weekly':
+            until = request.POST.get('until')
+            if not until:
+                messages.error(request, 'Please choose the last date of the series.')
+                return redirect('tutors:create_advising_session')
+            
+            try:
+                series = AdvisingSeriesService.create_series(
+                    main_session=main_session,
+                    start_date=advising_date_obj,
+                    until=datetime.strptime(until, '%Y-%m-%d').date(),
+                    weekdays=request.POST.getlist('weekdays'),
+                    start_time=datetime.strptime(start_time, '%H:%M').time(),
+                    end_time=datetime.strptime(end_time, '%H:%M').time(),
+                    location=location,
+                    notes=notes,
+                )
+            except ValueError as e:
+                messages.error(request, str(e))
+                return redirect('tutors:create_advising_session')
+            
+            messages.success(
+                request,
+                f'Created {series.occurrences.count()} advising sessions for {main_session.class_code}!'
+            )
+            return redirect('tutors:tutor_dashboard')
+        
         # Create advising session
         AdvisingSession.objects.create(
             main_session=main_session,
@@ -390,5 +425,63 @@ def create_advising_session(request):
     
     context = {
         'tutor_sessions': tutor_sessions,
+        'weekdays': Session.DAY_CHOICES,
     }
-    return render(request, 'tutors/create_advising_session.html', context)
\ No newline at end of file
+    return render(request, 'tutors/create_advising_session.html', context)
+
+@login_required
+def edit_advising_series(request, series_id):
+    """Tutor changes time/location/notes of every upcoming session in a series"""
+    if not hasattr(request.user, 'tutor'):
+        messages.error(request, 'You do not have permission to access this page.')
+        return redirect('home')
+    
+    series = get_object_or_404(
+        AdvisingSeries.objects.select_related('main_session', 'main_session__subject'),
+        id=series_id,
+        tutor=request.user.tutor,
+        is_active=True
+    )
+    
+    if request.method == 'POST':
+        start_time = request.POST.get('start_time')
+        end_time = request.POST.get('end_time')
+        
+        if not all([start_time, end_time]):
+            messages.error(request, 'Please fill in all required information.')
+            return redirect('tutors:edit_advising_series', series_id=series.id)
+        
+        try:
+            updated = AdvisingSeriesService.update_series(
+                series,
+                start_time=datetime.strptime(start_time, '%H:%M').time(),
+                end_time=datetime.strptime(end_time, '%H:%M').time(),
+                location=request.POST.get('location', ''),
+                notes=request.POST.get('notes', ''),
+            )
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('tutors:edit_advising_series', series_id=series.id)
+        
+        messages.success(request, f'Updated {updated} upcoming advising sessions of {series.main_session.class_code}!')
+        return redirect('tutors:tutor_dashboard')
+    
+    context = {
+        'series': series,
+        'weekdays': Session.DAY_CHOICES,
+    }
+    return render(request, 'tutors/create_advising_session.html', context)
+
+@login_required
+@require_POST
+def cancel_advising_series(request, series_id):
+    """Tutor cancels every upcoming session in a series"""
+    if not hasattr(request.user, 'tutor'):
+        messages.error(request, 'You do not have permission to perform this action.')
+        return redirect('home')
+    
+    series = get_object_or_404(AdvisingSeries, id=series_id, tutor=request.user.tutor, is_active=True)
+    cancelled = AdvisingSeriesService.cancel_series(series)
+    
+    messages.success(request, f'Cancelled {cancelled} upcoming advising sessions.')
+    return redirect('tutors:tutor_dashboard')